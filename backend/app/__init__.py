@@ -1,5 +1,6 @@
 import os
 import sys
+import weakref
 import flask
 from flask import Flask, jsonify
 from flask_sqlalchemy import SQLAlchemy
@@ -8,24 +9,69 @@ from flask_cors import CORS
 from flask_jwt_extended import JWTManager
 from sqlalchemy.exc import OperationalError
 
-db = SQLAlchemy()
+from .breaker import CircuitOpenError, database_status
+from .replica import RoutingSession
+
+db = SQLAlchemy(session_options={"class_": RoutingSession})
 migrate = Migrate()
 jwt = JWTManager()
 
-def create_app():
+_engines = weakref.WeakSet()
+
+
+def _dispose_engines_after_fork():
+    # Pooled connections inherited from the parent (gunicorn --preload) are still
+    # the parent's; close=False drops them here without closing them for it
+    for engine in list(_engines):
+        engine.dispose(close=False)
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_dispose_engines_after_fork)
+
+def create_app(test_config=None):
     app = Flask(__name__)
 
     # Load config
     from .config import Config
     app.config.from_object(Config)
+    if test_config:
+        app.config.update(test_config)
     
+    if app.config.get("PROXY_FIX_X_FOR"):
+        # request.remote_addr becomes the client address the trusted proxies report
+        from werkzeug.middleware.proxy_fix import ProxyFix
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=app.config["PROXY_FIX_X_FOR"])
+
     print(f"[DEBUG] SQLALCHEMY_DATABASE_URI={app.config.get('SQLALCHEMY_DATABASE_URI')}", file=sys.stderr)
 
     # Init extensions
     db.init_app(app)
+    with app.app_context():
+        _engines.update(db.engines.values())
+    # Optional read replica for GET routes, with read-your-writes stickiness (see app/replica.py)
+    from .replica import init_replica
+    replica = init_replica(app)
+    if replica is not None:
+        _engines.add(replica)
+    # Connections fail fast while the database is unreachable (see app/breaker.py)
+    from .breaker import install_breaker
+    with app.app_context():
+        app.extensions["db_breakers"] = {
+            name: install_breaker(engine, name, app.config)
+            for name, engine in (("primary", db.engine), ("replica", replica)) if engine is not None
+        }
     migrate.init_app(app, db)
     jwt.init_app(app)
 
+    # jsonify() and request.get_json() go through orjson when installed (see app/json_provider.py)
+    from .json_provider import init_json
+    init_json(app)
+
+    # Routes read the caller from flask_jwt_extended.current_user (see app/users.py)
+    from .users import init_user_loader
+    init_user_loader(jwt)
+
     # CORS configuration (specific origins + credentials)
     CORS(
         app,
@@ -42,6 +88,16 @@ def create_app():
         supports_credentials=True  # ✅ Allow Authorization headers
     )
 
+    # Request timing and GET /metrics; registered first so every request is timed
+    from .metrics import init_metrics
+    init_metrics(app)
+    # Per-request query counts, N+1 and slow-query logging (see app/profiling.py)
+    from .profiling import init_profiling
+    init_profiling(app)
+    # gzip/brotli for JSON and text bodies (see app/compression.py)
+    from .compression import init_compression
+    init_compression(app)
+
     # Handle OPTIONS preflight globally
     @app.before_request
     def handle_options():
@@ -56,11 +112,16 @@ def create_app():
     @app.errorhandler(OperationalError)
     def handle_database_error(e):
         db.session.rollback()
-        print(f"[ERROR] Database operational error: {str(e)}", file=sys.stderr)
+        headers = {}
+        if isinstance(e, CircuitOpenError):
+            # The breaker logged the outage once; don't log every request it turns away
+            headers["Retry-After"] = str(max(1, round(e.retry_after)))
+        else:
+            print(f"[ERROR] Database operational error: {str(e)}", file=sys.stderr)
         return jsonify({
             "error": "Database connection error",
             "message": "Unable to connect to database. Please try again later."
-        }), 503
+        }), 503, headers
 
     @app.errorhandler(404)
     def handle_not_found(e):
@@ -72,20 +133,36 @@ def create_app():
         print(f"[ERROR] Unhandled error: {str(e)}", file=sys.stderr)
         return jsonify({"error": "Internal server error"}), 500
 
-    # Health check
+    # Readiness: 503 while the primary database is unreachable, with each database's status and breaker state
     @app.route('/')
     def index():
-        return jsonify({"status": "online", "message": "Flower Delivery API is running"}), 200
+        database, ready = database_status(db.engine, "primary")
+        body = {
+            "status": "online" if ready else "unavailable",
+            "message": "Flower Delivery API is running" if ready else "Database unavailable",
+            "database": database,
+        }
+        if "replica" in app.extensions:
+            body["replica"] = database_status(app.extensions["replica"], "replica")[0]  # reads fall back to the primary
+        return jsonify(body), 200 if ready else 503
 
     # Register blueprints
     from .routes.auth import auth_bp
     from .routes.flowers import flowers_bp
     from .routes.orders import orders_bp
     from .routes.payment import payment_bp
+    from .routes.uploads import uploads_bp
 
     app.register_blueprint(auth_bp, url_prefix="/api/auth")
     app.register_blueprint(flowers_bp, url_prefix="/api/flowers")
     app.register_blueprint(orders_bp)  # Already has url_prefix="/api/orders"
     app.register_blueprint(payment_bp)  # Already has url_prefix="/api/payment"
+    app.register_blueprint(uploads_bp)  # Already has url_prefix="/uploads"
+
+    # CLI: flask payments work, flask seed
+    from .payment_queue import payments_cli
+    from .seeding import seed_command
+    app.cli.add_command(payments_cli)
+    app.cli.add_command(seed_command)
 
     return app
\ No newline at end of file
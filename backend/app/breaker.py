@@ -0,0 +1,167 @@
+"""
+Circuit breaker around database connections, and the readiness check.
+
+Without it, a database outage costs every request a full connect_timeout
+before the OperationalError handler answers 503, and sync workers pile up
+behind it. Each engine gets a breaker on its do_connect hook. After
+DB_BREAKER_FAILURES consecutive failed connection attempts the breaker
+opens. While it is open, new connections fail at once with
+CircuitOpenError (an OperationalError, so the same 503 handler answers it)
+and nothing waits on the network.
+
+A background thread probes the database every DB_BREAKER_RESET_SECONDS
+(half-open: only the probe may connect) and closes the breaker on the
+first success. Connections already in the pool are unaffected; a dead one
+fails its pre-ping and is replaced through the breaker.
+
+Breakers are per process. A forked worker starts its own probe thread when
+its breaker first opens.
+"""
+import sys
+import threading
+import time
+import weakref
+
+from sqlalchemy import event
+from sqlalchemy.exc import OperationalError
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+_breakers = weakref.WeakKeyDictionary()  # engine -> CircuitBreaker
+
+
+def _describe(error):
+    text = str(error).strip()
+    return text.splitlines()[0] if text else type(error).__name__
+
+
+class CircuitOpenError(OperationalError):
+    """Raised instead of connecting while a breaker is open"""
+
+    def __init__(self, name, retry_after):
+        super().__init__(f"circuit open: {name}", None, ConnectionError(f"{name} database unavailable"))
+        self.name = name
+        self.retry_after = retry_after  # seconds until the next probe, at most
+
+
+class CircuitBreaker:
+    def __init__(self, engine, name, failures=3, reset_seconds=5.0):
+        self.engine = engine
+        self.name = name
+        self.failure_threshold = failures
+        self.reset_seconds = reset_seconds
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = None
+        self.last_error = None
+        self._lock = threading.Lock()
+        self._prober = None
+        self._stop = threading.Event()
+
+    @property
+    def is_open(self):
+        return self.state != CLOSED
+
+    def connect(self, dialect, conn_rec, cargs, cparams):
+        """do_connect listener: connect unless open, and count the outcome"""
+        if self.state != CLOSED and threading.current_thread() is not self._prober:
+            raise CircuitOpenError(self.name, self.reset_seconds)
+        try:
+            connection = dialect.connect(*cargs, **cparams)
+        except Exception as e:
+            self.record_failure(e)
+            raise
+        self.record_success()
+        return connection
+
+    def record_failure(self, error):
+        with self._lock:
+            self.failures += 1
+            self.last_error = _describe(error)
+            if self.state == CLOSED and self.failures < self.failure_threshold:
+                return
+            if self.state == CLOSED:
+                self.opened_at = time.time()
+                print(f"[WARN] {self.name} database breaker open after {self.failures} failed connects: "
+                      f"{self.last_error}", file=sys.stderr)
+            self.state = OPEN
+            if self._prober is None or not self._prober.is_alive():
+                self._stop.clear()
+                self._prober = threading.Thread(target=self._probe, name=f"db-breaker-{self.name}", daemon=True)
+                self._prober.start()
+
+    def record_success(self):
+        with self._lock:
+            if self.state != CLOSED:
+                print(f"[INFO] {self.name} database breaker closed after {time.time() - self.opened_at:.1f}s",
+                      file=sys.stderr)
+            self.state = CLOSED
+            self.failures = 0
+            self.opened_at = None
+
+    def _probe(self):
+        while not self._stop.wait(self.reset_seconds):
+            with self._lock:
+                if self.state == CLOSED:
+                    return
+                self.state = HALF_OPEN
+            try:
+                with self.engine.connect() as connection:
+                    connection.exec_driver_sql("SELECT 1")
+            except Exception as e:
+                self.record_failure(e)
+                continue
+            self.record_success()
+            return
+
+    def reset(self):
+        """Close the breaker and stop the probe (tests, manual recovery)"""
+        self._stop.set()
+        self.record_success()
+
+    def stats(self):
+        return {
+            "state": self.state,
+            "consecutive_failures": self.failures,
+            "open_for": round(time.time() - self.opened_at, 3) if self.opened_at else None,
+            "last_error": self.last_error,
+        }
+
+
+def breaker_for(engine):
+    return _breakers.get(engine)
+
+
+def install_breaker(engine, name, config):
+    """Attach a breaker to ``engine`` (once); None when DB_BREAKER_ENABLED is off"""
+    if not config.get("DB_BREAKER_ENABLED", True):
+        return None
+    breaker = _breakers.get(engine)
+    if breaker is None:
+        breaker = _breakers[engine] = CircuitBreaker(engine, name, config.get("DB_BREAKER_FAILURES", 3),
+                                                     config.get("DB_BREAKER_RESET_SECONDS", 5.0))
+        event.listen(engine, "do_connect", breaker.connect)
+    return breaker
+
+
+def database_status(engine, name):
+    """({status, breaker}, ready) for one engine; a SELECT 1 unless its breaker is open.
+
+    The body is served publicly, so it carries only states. Error text goes to the log.
+    """
+    breaker = breaker_for(engine)
+    status = {"breaker": breaker.state if breaker else None}
+    if breaker is not None and breaker.is_open:
+        status["status"] = "unavailable"
+        return status, False
+    started = time.perf_counter()
+    try:
+        with engine.connect() as connection:
+            connection.exec_driver_sql("SELECT 1")
+    except Exception as e:
+        print(f"[WARN] Readiness check failed on {name} database: {_describe(e)}", file=sys.stderr)
+        status["status"] = "error"
+        return status, False
+    status["status"] = "ok"
+    status["latency_ms"] = round((time.perf_counter() - started) * 1000, 2)
+    return status, True
@@ -0,0 +1,179 @@
+"""Versioned response cache for the public flower catalog.
+
+Catalog responses are cached per worker process, keyed by the catalog
+version stored in the ``catalog_state`` table. Writes to flowers call
+:func:`bump_catalog_version` before committing; every worker reads the
+version (one primary-key lookup) on each request, so a stale entry is never
+served once the write has committed, whichever worker handled it.
+
+Cached entries hold the serialized JSON body and, optionally, compressed
+copies (gzip, brotli) made the first time a client asks for each encoding,
+so the compression cost is paid once per catalog version, at a stronger
+level than on-the-fly compression could afford (see app/compression.py).
+Responses carry an ETag and Last-Modified so browsers can revalidate with
+a 304.
+"""
+import hashlib
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from functools import wraps
+from urllib.parse import urlencode
+
+from flask import current_app, request
+from sqlalchemy import select
+
+from . import db
+from .compression import compress, levels, negotiate
+from .models import CatalogState
+
+CATALOG_STATE_ID = 1
+# Query parameters the cached views read; anything else is left out of the
+# cache key, so junk query strings can't each claim an entry. Extend this
+# when a cached view starts reading a new parameter.
+CATALOG_PARAMS = ("limit", "cursor", "sort", "min_price", "max_price", "florist_id", "stock_status", "q")
+
+
+def current_catalog_version():
+    """Return ``(version, changed_at)`` straight from the database."""
+    row = db.session.execute(
+        select(CatalogState.version, CatalogState.updated_at).where(CatalogState.id == CATALOG_STATE_ID)
+    ).first()
+    if row is None:
+        return 0, None
+    return row.version, row.updated_at
+
+
+def bump_catalog_version():
+    """Invalidate cached catalog responses in every worker.
+
+    Must be called inside the transaction that changes the catalog so the
+    new version becomes visible atomically with the change itself.
+    """
+    now = datetime.utcnow()
+    updated = CatalogState.query.filter_by(id=CATALOG_STATE_ID).update(
+        {"version": CatalogState.version + 1, "updated_at": now},
+        synchronize_session=False,
+    )
+    if not updated:
+        db.session.add(CatalogState(id=CATALOG_STATE_ID, version=1, updated_at=now))
+
+
+class _CacheEntry:
+    __slots__ = ("body", "encoded", "last_modified")
+
+    def __init__(self, body, last_modified):
+        self.body = body
+        self.encoded = {}  # encoding -> compressed body
+        self.last_modified = last_modified
+
+    def encode(self, encoding):
+        """The body in ``encoding``, compressed on first use (once per version, whatever its size)"""
+        data = self.encoded.get(encoding)
+        if data is None:
+            # Two threads may both compress on a miss; either result is fine to keep
+            data = self.encoded[encoding] = compress(self.body, encoding, levels(current_app.config, cached=True)[encoding])
+        return data
+
+
+class CatalogCache:
+    """Bounded LRU of serialized responses for a single catalog version."""
+
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self._version = None
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, version, key):
+        with self._lock:
+            if version != self._version:
+                return None
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def put(self, version, key, entry):
+        with self._lock:
+            if version != self._version:
+                # A newer catalog version makes every entry we hold stale
+                self._entries.clear()
+                self._version = version
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._version = None
+
+
+catalog_cache = CatalogCache()
+
+
+def _cached_encoding():
+    """Encoding to serve cached bodies in; None leaves them to the compression hook"""
+    if not current_app.config.get("CATALOG_CACHE_COMPRESS", True):
+        return None
+    return negotiate()
+
+
+def _finish(response, etag, last_modified, encoding):
+    response.set_etag(etag)
+    if last_modified is not None:
+        response.last_modified = last_modified
+    response.headers["Cache-Control"] = f"public, max-age={current_app.config.get('CATALOG_CACHE_MAX_AGE', 0)}, must-revalidate"
+    response.vary.add("Accept-Encoding")
+    if encoding:
+        response.headers["Content-Encoding"] = encoding
+    return response.make_conditional(request)
+
+
+def _cache_key():
+    """Host, path and the catalog parameters present in the request (even empty ones: views test for presence)"""
+    params = [(name, request.args.get(name)) for name in CATALOG_PARAMS if name in request.args]
+    return request.host_url + request.path.lstrip("/") + ("?" + urlencode(params) if params else "")
+
+
+def cached_catalog_response(view):
+    """Serve a public catalog view from the versioned cache.
+
+    The wrapped view may set ``response.last_modified`` (e.g. from
+    ``Flower.updated_at``); otherwise the time of the last catalog write is
+    used. Only 200 responses are cached.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if not current_app.config.get("CATALOG_CACHE_ENABLED", True):
+            return view(*args, **kwargs)
+
+        version, changed_at = current_catalog_version()
+        key = _cache_key()
+        encoding = _cached_encoding()
+        etag = f"catalog-{version}-{hashlib.sha1(key.encode()).hexdigest()[:16]}" + (f"-{encoding}" if encoding else "")
+
+        # Revalidation only needs the version: answer it before touching the cache.
+        # "*" means "any current representation", which a 404 doesn't have: leave it to the view.
+        if not request.if_none_match.star_tag and etag in request.if_none_match:
+            response = current_app.response_class(status=304)
+            return _finish(response, etag, None, None)
+
+        entry = catalog_cache.get(version, key)
+        if entry is None:
+            response = current_app.make_response(view(*args, **kwargs))
+            if response.status_code != 200:
+                return response
+            body = response.get_data()
+            last_modified = response.last_modified or changed_at
+            entry = _CacheEntry(body, last_modified)
+            catalog_cache.put(version, key, entry)
+
+        response = current_app.response_class(
+            entry.encode(encoding) if encoding else entry.body, mimetype="application/json"
+        )
+        return _finish(response, etag, entry.last_modified, encoding)
+
+    return wrapper
@@ -0,0 +1,118 @@
+"""
+Response compression: brotli or gzip, whichever the client prefers.
+
+An after_request hook compresses JSON and text responses of at least
+COMPRESS_MIN_SIZE bytes when the client's Accept-Encoding allows it
+(brotli first when both are acceptable and the brotli package is installed).
+Bodies over COMPRESS_STREAM_SIZE, and responses that are already streamed,
+are compressed chunk by chunk as they are sent, so the worker never holds a
+second full copy and the client starts receiving sooner.
+
+Left alone: responses that already have a Content-Encoding (the catalog
+cache serves its own precompressed copies, see app/cache.py), files served
+by send_file, Server-Sent Events (compressing would buffer the stream),
+partial content and 304s.
+
+Levels trade CPU for bytes. On-the-fly compression runs once per request,
+so it uses cheap levels (COMPRESS_LEVEL, COMPRESS_BR_QUALITY); copies kept
+in a cache are compressed once per content version and use stronger ones
+(COMPRESS_CACHE_LEVEL, COMPRESS_CACHE_BR_QUALITY).
+"""
+import gzip
+import zlib
+
+from flask import request
+
+try:
+    import brotli
+except ImportError:  # optional dependency
+    brotli = None
+
+COMPRESSIBLE_TYPES = ("application/json", "text/html", "text/plain", "text/css", "text/csv", "application/javascript")
+CHUNK_SIZE = 64 * 1024
+
+
+def available_encodings():
+    return ("br", "gzip") if brotli is not None else ("gzip",)
+
+
+def negotiate(accept_encodings=None):
+    """The encoding to send in, from the request's Accept-Encoding, or None for identity"""
+    accept = request.accept_encodings if accept_encodings is None else accept_encodings
+    # Equal q values: prefer brotli, about as small as gzip for less CPU
+    return accept.best_match(available_encodings())
+
+
+def compress(body, encoding, level):
+    """Compress a whole body; ``level`` is the gzip level or the brotli quality"""
+    if encoding == "br":
+        return brotli.compress(body, quality=level)
+    return gzip.compress(body, compresslevel=level, mtime=0)
+
+
+def compress_chunks(chunks, encoding, level):
+    """Compress an iterable of byte chunks, yielding compressed chunks as they fill"""
+    if encoding == "br":
+        compressor = brotli.Compressor(quality=level)
+        process, finish = compressor.process, compressor.finish
+    else:
+        compressor = zlib.compressobj(level, zlib.DEFLATED, 31)  # wbits 31: gzip container
+        process, finish = compressor.compress, compressor.flush
+    for chunk in chunks:
+        if isinstance(chunk, str):
+            chunk = chunk.encode()
+        data = process(chunk)
+        if data:
+            yield data
+    yield finish()
+
+
+def levels(config, cached=False):
+    """{encoding: level} for on-the-fly or cached compression"""
+    if cached:
+        return {"gzip": config.get("COMPRESS_CACHE_LEVEL", 9), "br": config.get("COMPRESS_CACHE_BR_QUALITY", 9)}
+    return {"gzip": config.get("COMPRESS_LEVEL", 6), "br": config.get("COMPRESS_BR_QUALITY", 5)}
+
+
+def _slices(body):
+    for start in range(0, len(body), CHUNK_SIZE):
+        yield body[start:start + CHUNK_SIZE]
+
+
+def init_compression(app):
+    """Register the compression hook; a no-op when COMPRESS_ENABLED is off"""
+    if not app.config.get("COMPRESS_ENABLED", True):
+        return
+
+    @app.after_request
+    def _compress(response):
+        if (response.status_code < 200 or response.status_code in (204, 206, 304)
+                or request.method == "HEAD"
+                or response.direct_passthrough
+                or "Content-Encoding" in response.headers
+                or response.mimetype not in COMPRESSIBLE_TYPES):
+            return response
+        response.vary.add("Accept-Encoding")
+        encoding = negotiate()
+        if encoding is None:
+            return response
+
+        level = levels(app.config)[encoding]
+        if response.is_streamed:
+            response.response = compress_chunks(response.response, encoding, level)
+        else:
+            body = response.get_data()
+            if len(body) < app.config.get("COMPRESS_MIN_SIZE", 1024):
+                return response
+            if len(body) > app.config.get("COMPRESS_STREAM_SIZE", 256 * 1024):
+                response.response = compress_chunks(_slices(body), encoding, level)
+            else:
+                response.set_data(compress(body, encoding, level))
+        if response.is_streamed:
+            response.headers.pop("Content-Length", None)
+        response.headers["Content-Encoding"] = encoding
+        # A strong validator names one representation; each encoding is another
+        etag, weak = response.get_etag()
+        if etag:
+            response.set_etag(f"{etag}-{encoding}", weak)
+        return response
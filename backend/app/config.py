@@ -4,6 +4,39 @@ from urllib.parse import urlparse, urlunparse, parse_qs, urlencode
 
 basedir = os.path.abspath(os.path.dirname(__file__))
 
+
+def _database_uri(database_url):
+    """SQLAlchemy URI for a DATABASE_URL-style setting"""
+    # Normalize postgres:// to postgresql://
+    if database_url.startswith("postgres://"):
+        database_url = database_url.replace("postgres://", "postgresql://", 1)
+    if not database_url.startswith("postgresql"):
+        return database_url
+
+    # Parse the URL to add/modify SSL parameters
+    parsed = urlparse(database_url)
+
+    # Parse query parameters
+    params = parse_qs(parsed.query, keep_blank_values=True)
+
+    # Add sslmode if not already present
+    if 'sslmode' not in params:
+        params['sslmode'] = ['prefer']  # Prefer SSL but fallback to non-SSL
+
+    # Reconstruct query string
+    new_query = urlencode([(k, v[0] if isinstance(v, list) else v) for k, v in params.items()], doseq=True)
+
+    # Reconstruct the URL with the new query string
+    return urlunparse((
+        parsed.scheme,
+        parsed.netloc,
+        parsed.path,
+        parsed.params,
+        new_query,
+        parsed.fragment
+    ))
+
+
 class Config:
     # Use environment variable or a strong default for development
     SECRET_KEY = os.getenv("SECRET_KEY", "dev-secret-key-replace-in-prod")
@@ -15,33 +48,13 @@ class Config:
     if not database_url:
         SQLALCHEMY_DATABASE_URI = f"sqlite:///{os.path.join(basedir, 'app.db')}"
     else:
-        # Normalize postgres:// to postgresql://
-        if database_url.startswith("postgres://"):
-            database_url = database_url.replace("postgres://", "postgresql://", 1)
-        
-        # Parse the URL to add/modify SSL parameters
-        parsed = urlparse(database_url)
-        
-        # Parse query parameters
-        params = parse_qs(parsed.query, keep_blank_values=True)
-        
-        # Add sslmode if not already present
-        if 'sslmode' not in params:
-            params['sslmode'] = ['prefer']  # Prefer SSL but fallback to non-SSL
-        
-        # Reconstruct query string
-        new_query = urlencode([(k, v[0] if isinstance(v, list) else v) for k, v in params.items()], doseq=True)
-        
-        # Reconstruct the URL with the new query string
-        SQLALCHEMY_DATABASE_URI = urlunparse((
-            parsed.scheme,
-            parsed.netloc,
-            parsed.path,
-            parsed.params,
-            new_query,
-            parsed.fragment
-        ))
-    
+        SQLALCHEMY_DATABASE_URI = _database_uri(database_url)
+
+    # Read replica for the GET routes marked @read_replica (see app/replica.py); unset = primary only
+    replica_url = os.getenv("DATABASE_REPLICA_URL", "").strip()
+    SQLALCHEMY_REPLICA_URI = _database_uri(replica_url) if replica_url else None
+    DB_REPLICA_STICKY_SECONDS = float(os.getenv("DB_REPLICA_STICKY_SECONDS", "5"))  # reads stay on the primary this long after a write
+
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     
     # Connection pooling settings - vary by database type
@@ -59,14 +72,46 @@ class Config:
             "pool_size": 10,
             "max_overflow": 20,
             "connect_args": {
-                "connect_timeout": 10,
+                "connect_timeout": int(os.getenv("DB_CONNECT_TIMEOUT", "10")),
                 "options": "-c statement_timeout=30000"  # 30 second timeout
             }
         }
+    # Pool per process; gunicorn_config.py sizes it to the worker's concurrency profile
+    if os.getenv("DB_POOL_SIZE"):
+        SQLALCHEMY_ENGINE_OPTIONS["pool_size"] = int(os.getenv("DB_POOL_SIZE"))
+        SQLALCHEMY_ENGINE_OPTIONS["max_overflow"] = int(os.getenv("DB_MAX_OVERFLOW", "0"))
+        SQLALCHEMY_ENGINE_OPTIONS["pool_timeout"] = int(os.getenv("DB_POOL_TIMEOUT", "10"))  # seconds a request waits for a connection
     
+    # Database circuit breaker (see app/breaker.py)
+    DB_BREAKER_ENABLED = os.getenv("DB_BREAKER_ENABLED", "true").lower() == "true"
+    DB_BREAKER_FAILURES = int(os.getenv("DB_BREAKER_FAILURES", "3"))  # consecutive failed connects that open it
+    DB_BREAKER_RESET_SECONDS = float(os.getenv("DB_BREAKER_RESET_SECONDS", "5"))  # probe interval while open
+
+    # Prometheus request metrics at GET /metrics (see app/metrics.py)
+    METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+    METRICS_PATH = os.getenv("METRICS_PATH", "/metrics")
+    METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")  # scrapers sending "Authorization: Bearer <token>" are let in
+    METRICS_ALLOWED_IPS = os.getenv("METRICS_ALLOWED_IPS", "")  # client addresses/CIDRs let in without a token
+    # Proxies in front of the app that append to X-Forwarded-For (nginx: 1); 0 trusts no forwarded address
+    PROXY_FIX_X_FOR = int(os.getenv("PROXY_FIX_X_FOR", "0"))
+
+    # SQL profiling per request (see app/profiling.py)
+    SQL_PROFILE_ENABLED = os.getenv("SQL_PROFILE_ENABLED", "true").lower() == "true"
+    SQL_REPEAT_THRESHOLD = int(os.getenv("SQL_REPEAT_THRESHOLD", "5"))  # same statement more often than this = N+1 warning
+    SQL_SLOW_QUERY_MS = float(os.getenv("SQL_SLOW_QUERY_MS", "200"))  # statements at least this slow are logged with their plan
+    SQL_SLOW_QUERY_LOG = os.getenv("SQL_SLOW_QUERY_LOG") or None  # file for N+1/slow-query entries (default: stderr)
+    SQL_PROFILE_HEADERS = os.getenv("SQL_PROFILE_HEADERS", "").lower() == "true" or None  # X-DB-Queries/Server-Timing; default: debug mode only
+
+    # Password hashing (see app/passwords.py)
+    PASSWORD_HASH_METHOD = os.getenv("PASSWORD_HASH_METHOD", "scrypt:32768:8:1")  # werkzeug method and cost
+    PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "2"))  # hashing processes per web process (0 = inline)
+
     JWT_SECRET_KEY = os.getenv("JWT_SECRET_KEY", "jwt-secret-key-replace-in-prod")
     from datetime import timedelta
     JWT_ACCESS_TOKEN_EXPIRES = timedelta(days=1)
+    # Users behind JWTs (see app/users.py); other workers see profile changes after at most the TTL
+    USER_CACHE_TTL = int(os.getenv("USER_CACHE_TTL", "30"))  # seconds (0 = no cache, one lookup per request)
+    USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", "1024"))  # users kept per worker process
         # CORS: Load from env or use defaults
     CORS_ORIGINS = os.getenv(
             "CORS_ORIGINS",
@@ -74,7 +119,47 @@ class Config:
         ).split(",")
     
 
+    # Catalog response cache (see app/cache.py)
+    CATALOG_CACHE_ENABLED = os.getenv("CATALOG_CACHE_ENABLED", "true").lower() == "true"
+    # Keep compressed copies of cached bodies (CATALOG_CACHE_GZIP is the old name)
+    CATALOG_CACHE_COMPRESS = os.getenv("CATALOG_CACHE_COMPRESS", os.getenv("CATALOG_CACHE_GZIP", "true")).lower() == "true"
+    CATALOG_CACHE_MAX_AGE = int(os.getenv("CATALOG_CACHE_MAX_AGE", "0"))  # seconds browsers may skip revalidation
+
+    # Response compression (see app/compression.py); brotli needs the Brotli package
+    COMPRESS_ENABLED = os.getenv("COMPRESS_ENABLED", "true").lower() == "true"
+    COMPRESS_MIN_SIZE = int(os.getenv("COMPRESS_MIN_SIZE", "1024"))  # bytes; smaller bodies are sent as is
+    COMPRESS_STREAM_SIZE = int(os.getenv("COMPRESS_STREAM_SIZE", str(256 * 1024)))  # larger bodies are compressed while sent
+    COMPRESS_LEVEL = int(os.getenv("COMPRESS_LEVEL", "6"))  # gzip, per request
+    COMPRESS_BR_QUALITY = int(os.getenv("COMPRESS_BR_QUALITY", "5"))  # brotli, per request (4 is ~20% larger on the catalog)
+    COMPRESS_CACHE_LEVEL = int(os.getenv("COMPRESS_CACHE_LEVEL", "9"))  # gzip, once per cached catalog version
+    COMPRESS_CACHE_BR_QUALITY = int(os.getenv("COMPRESS_CACHE_BR_QUALITY", "9"))  # brotli, once per version (11: ~15% smaller, ~20x slower)
+
     # File Uploads
-    # We use 'static/uploads' so Flask can serve them automatically via /static/
-    UPLOAD_FOLDER = os.path.join(basedir, "static", "uploads")
-    MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB limit
\ No newline at end of file
+    # Stored in 'static/uploads' (older image URLs point at /static/uploads/); new URLs use /uploads/
+    UPLOAD_FOLDER = os.getenv("UPLOAD_FOLDER", os.path.join(basedir, "static", "uploads"))
+    # Who sends upload bytes: "direct" (the app, via sendfile), "x-accel" (nginx) or "x-sendfile" (Apache/lighttpd)
+    UPLOAD_SERVE_MODE = os.getenv("UPLOAD_SERVE_MODE", "direct")
+    UPLOAD_ACCEL_PREFIX = os.getenv("UPLOAD_ACCEL_PREFIX", "/protected-uploads")  # nginx internal location
+    MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB limit
+    IMAGE_WORKERS = int(os.getenv("IMAGE_WORKERS", "2"))  # threads resizing uploads per worker process (0 = inline)
+
+    # M-Pesa STK push queue (see app/payment_queue.py)
+    # Who sends queued pushes: "threads" (each web process), "worker" (`flask payments work`) or "inline" (the request)
+    PAYMENT_DISPATCH = os.getenv("PAYMENT_DISPATCH", "threads")
+    PAYMENT_WORKERS = int(os.getenv("PAYMENT_WORKERS", "4"))  # dispatcher threads per web process
+    PAYMENT_POLL_INTERVAL = float(os.getenv("PAYMENT_POLL_INTERVAL", "2"))  # seconds between queue scans
+    PAYMENT_MAX_TRIES = int(os.getenv("PAYMENT_MAX_TRIES", "3"))  # pushes that never reached Daraja are retried
+    PAYMENT_SEND_TIMEOUT = int(os.getenv("PAYMENT_SEND_TIMEOUT", "120"))  # seconds before a claimed push counts as lost
+
+    # Order status streams (see app/events.py, GET /api/orders/<id>/events)
+    ORDER_EVENTS_POLL_INTERVAL = float(os.getenv("ORDER_EVENTS_POLL_INTERVAL", "0.5"))  # seconds between tails of order_events
+    ORDER_EVENTS_HEARTBEAT = int(os.getenv("ORDER_EVENTS_HEARTBEAT", "15"))  # seconds between keep-alive comments
+    ORDER_EVENTS_TOKEN_TTL = int(os.getenv("ORDER_EVENTS_TOKEN_TTL", "60"))  # seconds a stream token can open its stream
+    ORDER_EVENTS_STREAM_TIMEOUT = int(os.getenv("ORDER_EVENTS_STREAM_TIMEOUT", "300"))  # seconds before a stream is recycled
+    ORDER_EVENTS_RETENTION = int(os.getenv("ORDER_EVENTS_RETENTION", "86400"))  # seconds events are kept
+
+    # Reconciliation of lost callbacks (see app/reconciliation.py, `flask payments reconcile`)
+    RECONCILE_AFTER = int(os.getenv("RECONCILE_AFTER", "120"))  # seconds a push may stay pending before it is queried
+    RECONCILE_CONCURRENCY = int(os.getenv("RECONCILE_CONCURRENCY", "8"))  # parallel STK queries
+    RECONCILE_RATE = float(os.getenv("RECONCILE_RATE", "20"))  # STK queries per second, across the pool
+    RECONCILE_BATCH = int(os.getenv("RECONCILE_BATCH", "500"))  # attempts settled per transaction
\ No newline at end of file
@@ -0,0 +1,214 @@
+"""
+Order status events, streamed to browsers with Server-Sent Events.
+
+Writers call record_order_events() inside the transaction that changes an
+order, so an event exists exactly when its change is committed. Each worker
+process runs one broker thread that tails the order_events table by id and
+hands new rows to that process's subscribers. Fan-out across gunicorn
+workers therefore goes through the database: one indexed range query per
+tick per process, however many streams are open. On Postgres the writers
+also NOTIFY, which wakes the brokers at commit instead of on the next tick.
+"""
+import os
+import queue
+import select
+import sys
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, func, insert, select as sql_select, text
+
+from . import db
+from .models import Order, OrderEvent, PaymentAttempt
+
+NOTIFY_CHANNEL = "order_events"
+SUBSCRIBER_BACKLOG = 50  # events buffered per stream before a slow client starts missing them
+LOOKBACK = 100  # ids re-read each tick: a lower id can commit after a higher one
+PRUNE_EVERY = 600  # seconds between deletions of events older than ORDER_EVENTS_RETENTION
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def events_scope(order_id):
+    """The ``scope`` claim of a token that opens only this order's event stream"""
+    return f"order_events:{order_id}"
+
+
+def order_event(order, payment_status=None, message=None):
+    """Event describing ``order``'s current state, for record_order_events()"""
+    return {
+        "order_id": order.id,
+        "status": order.status,
+        "paid": bool(order.paid),
+        "payment_status": payment_status,
+        "message": (message or "")[:255] or None,
+    }
+
+
+def record_order_events(events):
+    """Append events built by order_event(); the caller commits."""
+    if not events:
+        return
+    now = datetime.utcnow()
+    db.session.execute(insert(OrderEvent), [dict(event, created_at=now) for event in events])
+    if db.engine.dialect.name == "postgresql":
+        # Delivered when the transaction commits
+        db.session.execute(text("SELECT pg_notify(:channel, '')"), {"channel": NOTIFY_CHANNEL})
+
+
+def order_snapshot(order_id):
+    """(latest event id, current state) of an order: the first message of every stream"""
+    order = db.session.get(Order, order_id)
+    attempt = (PaymentAttempt.query.filter_by(order_id=order_id)
+               .order_by(PaymentAttempt.id.desc()).first())
+    last_event_id = db.session.execute(
+        sql_select(func.max(OrderEvent.id)).where(OrderEvent.order_id == order_id)
+    ).scalar() or 0
+    snapshot = order_event(order, payment_status=attempt.status if attempt else None,
+                           message=attempt.error if attempt else None)
+    return last_event_id, snapshot
+
+
+class OrderEventBroker:
+    """One per worker process: tails order_events and feeds in-process subscriber queues"""
+
+    def __init__(self, app):
+        self.app = app
+        self.pid = os.getpid()
+        self.poll_interval = app.config.get("ORDER_EVENTS_POLL_INTERVAL", 0.5)
+        self.retention = app.config.get("ORDER_EVENTS_RETENTION", 86400)
+        self.subscribers = defaultdict(set)
+        self.lock = threading.Lock()
+        self.last_id = None  # None while nobody is listening
+        self.delivered = set()  # ids inside the lookback window already handed out
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self._run, name="order-events", daemon=True)
+        self.thread.start()
+
+    def subscribe(self, order_id):
+        """
+        Register a stream. Call inside an app context, before reading the
+        order's snapshot, so no event committed after the snapshot is missed.
+        """
+        subscription = queue.Queue(maxsize=SUBSCRIBER_BACKLOG)
+        with self.lock:
+            if self.last_id is None:
+                self.last_id = db.session.execute(sql_select(func.max(OrderEvent.id))).scalar() or 0
+            self.subscribers[order_id].add(subscription)
+        return subscription
+
+    def unsubscribe(self, order_id, subscription):
+        with self.lock:
+            streams = self.subscribers.get(order_id)
+            if streams is not None:
+                streams.discard(subscription)
+                if not streams:
+                    del self.subscribers[order_id]
+
+    def stop(self):
+        self.stopped.set()
+
+    def _dispatch(self):
+        with self.lock:
+            if not self.subscribers:
+                self.last_id = None
+                self.delivered.clear()
+                return
+            after = self.last_id
+
+        rows = db.session.execute(
+            sql_select(OrderEvent).where(OrderEvent.id > max(after - LOOKBACK, 0)).order_by(OrderEvent.id)
+        ).scalars().all()
+        db.session.commit()
+
+        with self.lock:
+            for row in rows:
+                if row.id in self.delivered:
+                    continue
+                self.delivered.add(row.id)
+                for subscription in self.subscribers.get(row.order_id, ()):
+                    try:
+                        subscription.put_nowait((row.id, row.to_dict()))
+                    except queue.Full:
+                        pass  # the client reconnects and gets a fresh snapshot
+            if rows and self.last_id is not None:
+                self.last_id = max(self.last_id, rows[-1].id)
+                floor = self.last_id - LOOKBACK
+                self.delivered = {event_id for event_id in self.delivered if event_id > floor}
+
+    def _prune(self):
+        cutoff = datetime.utcnow() - timedelta(seconds=self.retention)
+        db.session.execute(delete(OrderEvent).where(OrderEvent.created_at < cutoff))
+        db.session.commit()
+
+    def _listen(self):
+        """A raw connection LISTENing for writers' NOTIFY, on Postgres only"""
+        if db.engine.dialect.name != "postgresql":
+            return None
+        try:
+            connection = db.engine.raw_connection()
+            driver = connection.driver_connection
+            driver.autocommit = True
+            driver.cursor().execute(f"LISTEN {NOTIFY_CHANNEL}")
+            return connection
+        except Exception as e:
+            print(f"[WARN] Order events falling back to polling: {e}", file=sys.stderr)
+            return None
+
+    def _wait(self, listener):
+        if listener is None:
+            self.stopped.wait(self.poll_interval)
+            return
+        driver = listener.driver_connection
+        # The timeout still bounds latency if a notification is lost
+        select.select([driver], [], [], self.poll_interval)
+        driver.poll()
+        driver.notifies.clear()
+
+    def _run(self):
+        with self.app.app_context():
+            listener = self._listen()
+            next_prune = time.monotonic()
+            while not self.stopped.is_set():
+                try:
+                    self._dispatch()
+                    if time.monotonic() >= next_prune:
+                        self._prune()
+                        next_prune = time.monotonic() + PRUNE_EVERY
+                except Exception as e:
+                    db.session.rollback()
+                    print(f"[ERROR] Order events: {e}", file=sys.stderr)
+                try:
+                    self._wait(listener)
+                except Exception as e:
+                    # The LISTEN connection dropped (restart, failover): poll one tick, then listen again
+                    print(f"[WARN] Order events listener lost, reconnecting: {e}", file=sys.stderr)
+                    self._close(listener)
+                    self.stopped.wait(self.poll_interval)
+                    listener = self._listen()
+            self._close(listener)
+            db.session.remove()
+
+    @staticmethod
+    def _close(listener):
+        if listener is None:
+            return
+        try:
+            listener.close()
+        except Exception:
+            pass  # already dead
+
+
+def get_broker(app):
+    """This process's broker, started on first use and again after a fork (gunicorn preload) or if its thread died."""
+    global _broker
+    with _broker_lock:
+        if (_broker is None or _broker.pid != os.getpid() or _broker.app is not app
+                or not _broker.thread.is_alive()):
+            if _broker is not None and _broker.pid == os.getpid():
+                _broker.stop()
+            _broker = OrderEventBroker(app)
+        return _broker
@@ -0,0 +1,169 @@
+"""Content-addressed storage and background resizing for flower photos.
+
+Uploads are streamed to ``UPLOAD_FOLDER`` under the SHA-256 of their bytes,
+so two florists uploading the same photo store it once and different photos
+never overwrite each other. A per-process worker pool then writes resized
+JPEG variants next to the original:
+
+    <digest>.<ext>          original
+    <digest>_thumb.jpg      list thumbnails
+    <digest>_card.jpg       catalog cards
+    <digest>_detail.jpg     flower detail page
+
+Variants are advertised in API responses only once they exist on disk.
+"""
+import hashlib
+import os
+import re
+import sys
+import tempfile
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from PIL import Image, ImageOps
+
+# Longest edge in pixels for each variant
+IMAGE_VARIANTS = {
+    "thumb": 200,
+    "card": 600,
+    "detail": 1200,
+}
+VARIANT_QUALITY = 82
+CHUNK_SIZE = 64 * 1024
+READY_DIGESTS_MAX = 10000  # digests remembered as fully resized, per process
+
+CONTENT_ADDRESSED_NAME = re.compile(r"^([0-9a-f]{64})\.[a-z0-9]+$")
+# Originals and their variants: the bytes behind these names never change
+IMMUTABLE_NAME = re.compile(r"^[0-9a-f]{64}(_[a-z]+)?\.[a-z0-9]+$")
+
+_executor = None
+_executor_pid = None
+_executor_lock = threading.Lock()
+_ready_digests = OrderedDict()  # digest -> None, least recently seen first
+_ready_lock = threading.Lock()
+
+
+def store_upload(file_storage, upload_folder, extension):
+    """Stream an uploaded file to disk under its content hash; return the stored filename."""
+    os.makedirs(upload_folder, exist_ok=True)
+    digest = hashlib.sha256()
+    fd, tmp_path = tempfile.mkstemp(dir=upload_folder, prefix=".upload-")
+    try:
+        with os.fdopen(fd, "wb") as out:
+            while True:
+                chunk = file_storage.stream.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                digest.update(chunk)
+                out.write(chunk)
+
+        filename = f"{digest.hexdigest()}.{extension.lower()}"
+        final_path = os.path.join(upload_folder, filename)
+        if os.path.exists(final_path):
+            os.remove(tmp_path)  # identical image already stored
+        else:
+            os.replace(tmp_path, final_path)
+        return filename
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def is_immutable(filename):
+    return bool(IMMUTABLE_NAME.match(filename or ""))
+
+
+def variant_filename(filename, variant):
+    match = CONTENT_ADDRESSED_NAME.match(filename or "")
+    if not match:
+        return None
+    return f"{match.group(1)}_{variant}.jpg"
+
+
+def variants_ready(filename, upload_folder):
+    """True once every variant of a content-addressed upload has been written."""
+    match = CONTENT_ADDRESSED_NAME.match(filename or "")
+    if not match:
+        return False
+    digest = match.group(1)
+    with _ready_lock:
+        if digest in _ready_digests:
+            _ready_digests.move_to_end(digest)
+            return True
+    # The detail variant is written last, so its presence implies the others
+    if not os.path.exists(os.path.join(upload_folder, variant_filename(filename, "detail"))):
+        return False
+    with _ready_lock:
+        _ready_digests[digest] = None
+        while len(_ready_digests) > READY_DIGESTS_MAX:
+            _ready_digests.popitem(last=False)
+    return True
+
+
+def generate_variants(source_path):
+    """Write every missing resized variant of ``source_path``. Safe to run twice."""
+    folder, filename = os.path.split(source_path)
+    targets = [(name, os.path.join(folder, variant_filename(filename, name)), size)
+               for name, size in sorted(IMAGE_VARIANTS.items(), key=lambda item: item[1])]
+    if all(os.path.exists(path) for _, path, _ in targets):
+        return False
+
+    with Image.open(source_path) as original:
+        image = ImageOps.exif_transpose(original).convert("RGB")
+        for _, path, size in targets:
+            if os.path.exists(path):
+                continue
+            variant = image.copy()
+            variant.thumbnail((size, size), Image.LANCZOS)
+            # Write to a unique temp name first so readers never see a half-written file
+            fd, tmp_path = tempfile.mkstemp(dir=folder, prefix=".variant-")
+            try:
+                with os.fdopen(fd, "wb") as out:
+                    variant.save(out, "JPEG", quality=VARIANT_QUALITY, optimize=True, progressive=True)
+                os.replace(tmp_path, path)
+            except BaseException:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                raise
+    return True
+
+
+def _get_executor(max_workers):
+    """Lazily create the worker pool, recreating it after a fork (gunicorn preload)."""
+    global _executor, _executor_pid
+    with _executor_lock:
+        if _executor is None or _executor_pid != os.getpid():
+            _executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="image-variants")
+            _executor_pid = os.getpid()
+        return _executor
+
+
+def _process(app, source_path):
+    try:
+        if generate_variants(source_path):
+            # New variant URLs change catalog responses; drop cached copies in every worker
+            with app.app_context():
+                from . import db
+                from .cache import bump_catalog_version
+                bump_catalog_version()
+                db.session.commit()
+    except Exception as e:
+        print(f"[ERROR] Image variant generation failed for {source_path}: {e}", file=sys.stderr)
+
+
+def schedule_variants(app, filename):
+    """Queue variant generation for a stored upload; returns a Future.
+
+    With ``IMAGE_WORKERS = 0`` the work runs inline, which tests and
+    single-threaded tooling rely on.
+    """
+    source_path = os.path.join(app.config["UPLOAD_FOLDER"], filename)
+    workers = app.config.get("IMAGE_WORKERS", 2)
+    if workers <= 0:
+        future = Future()
+        _process(app, source_path)
+        future.set_result(None)
+        return future
+    return _get_executor(workers).submit(_process, app, source_path)
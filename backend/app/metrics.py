@@ -0,0 +1,224 @@
+"""
+Request metrics in Prometheus format, served at GET /metrics (METRICS_PATH).
+
+Every request is timed by a WSGI wrapper and recorded per route template
+(``/api/orders/<int:order_id>/status``, not the raw path, so label values
+stay bounded):
+
+  http_request_duration_seconds  histogram by method and route
+  http_requests_total            counter by method, route and status code
+  http_requests_in_progress      gauge by method and route
+
+and the connection pool of each database engine (primary, replica):
+
+  db_pool_size, db_pool_checked_out, db_pool_overflow   gauges by database
+
+Pool gauges are refreshed after each request and on every scrape, and only
+written when a value changed.
+
+Each gunicorn worker has its own counters. When PROMETHEUS_MULTIPROC_DIR
+is set (gunicorn_config.py sets it up) workers write their samples to
+memory-mapped files in that directory, and /metrics sums them all, so a
+scrape sees the whole server whichever worker answers it.
+
+The endpoint answers only requests sending METRICS_TOKEN as a bearer token
+or coming from METRICS_ALLOWED_IPS (empty by default); everyone else gets
+403. Behind a reverse proxy every client arrives from the proxy's address,
+so a request carrying X-Forwarded-For is let in by address only when
+PROXY_FIX_X_FOR resolves the real client.
+
+prometheus_client is optional: without it neither the timing nor /metrics
+is installed.
+"""
+import hmac
+import ipaddress
+import os
+import sys
+import time
+
+from flask import jsonify, request
+
+try:
+    from prometheus_client import (CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge,
+                                   Histogram, generate_latest, multiprocess)
+except ImportError:  # optional dependency
+    Histogram = None
+
+# Seconds; finer at the low end, where most API calls land
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.25, 0.5, 0.75, 1.0, 2.5, 5.0, 10.0)
+UNMATCHED = "<unmatched>"  # 404s for arbitrary paths share one label value
+SERIES_KEY = "flora.metrics_series"  # WSGI environ key
+
+_metrics = None
+_pool_metrics = None
+_series = {}  # (method, route) -> labelled children, so requests skip labels() lookups
+_pool_seen = {}  # database -> last published pool stats
+
+
+class _Series:
+    __slots__ = ("latency", "in_progress", "by_status", "method", "route")
+
+    def __init__(self, method, route):
+        latency, _, in_progress = _get_metrics()
+        self.method, self.route = method, route
+        self.latency = latency.labels(method, route)
+        self.in_progress = in_progress.labels(method, route)
+        self.by_status = {}
+
+    def count(self, status):
+        counter = self.by_status.get(status)
+        if counter is None:
+            counter = self.by_status[status] = _get_metrics()[1].labels(self.method, self.route, status)
+        counter.inc()
+
+
+def _get_metrics():
+    """Create the metric objects once per process"""
+    global _metrics
+    if _metrics is None:
+        _metrics = (
+            Histogram("http_request_duration_seconds", "Time spent handling requests",
+                      ["method", "route"], buckets=LATENCY_BUCKETS),
+            Counter("http_requests_total", "Requests handled", ["method", "route", "status"]),
+            Gauge("http_requests_in_progress", "Requests being handled", ["method", "route"],
+                  multiprocess_mode="livesum"),
+        )
+    return _metrics
+
+
+def _get_pool_metrics():
+    global _pool_metrics
+    if _pool_metrics is None:
+        _pool_metrics = {
+            name: Gauge(metric, documentation, ["database"], multiprocess_mode="livesum")
+            for name, metric, documentation in (
+                ("size", "db_pool_size", "Connections the pool keeps open"),
+                ("checkedout", "db_pool_checked_out", "Pooled connections in use"),
+                ("overflow", "db_pool_overflow", "Connections open beyond the pool size"),
+            )
+        }
+    return _pool_metrics
+
+
+def _pool_stats(engine):
+    """Size and usage of a QueuePool; other pool classes have none"""
+    pool = engine.pool
+    stats = {}
+    for name in ("size", "checkedout", "overflow"):
+        method = getattr(pool, name, None)
+        if method is not None:
+            stats[name] = max(method(), 0)  # QueuePool counts unused overflow slots as negative
+    return stats
+
+
+def _record_pools(pools):
+    """Publish the pool stats of each (database, engine) that changed since the last call"""
+    for database, engine in pools:
+        stats = _pool_stats(engine)
+        if _pool_seen.get(database) == stats:
+            continue
+        _pool_seen[database] = stats
+        gauges = _get_pool_metrics()
+        for name, value in stats.items():
+            gauges[name].labels(database).set(value)
+
+
+def _request_series():
+    route = request.url_rule.rule if request.url_rule is not None else UNMATCHED
+    key = (request.method, route)
+    series = _series.get(key)
+    if series is None:
+        series = _series[key] = _Series(*key)
+    return series
+
+
+class _TimingMiddleware:
+    """
+    Times the whole request and records it under the route the before_request
+    hook found. Living outside Flask's hook chain keeps the per-request cost
+    to one hook call; streamed bodies are timed up to their first byte.
+    """
+
+    def __init__(self, wsgi_app, pools=()):
+        self.wsgi_app = wsgi_app
+        self.pools = pools  # (database, engine) pairs whose pool gauges follow each request
+
+    def __call__(self, environ, start_response):
+        started = time.perf_counter()
+        status = []
+
+        def _start_response(status_line, headers, exc_info=None):
+            status.append(status_line[:3])
+            return start_response(status_line, headers, exc_info)
+
+        try:
+            return self.wsgi_app(environ, _start_response)
+        finally:
+            series = environ.get(SERIES_KEY)
+            if series is not None:
+                series.latency.observe(time.perf_counter() - started)
+                series.count(status[0] if status else "500")
+                series.in_progress.dec()
+            _record_pools(self.pools)
+
+
+def _allowed_networks(setting):
+    networks = []
+    for entry in filter(None, (part.strip() for part in setting.split(","))):
+        try:
+            networks.append(ipaddress.ip_network(entry, strict=False))
+        except ValueError:
+            print(f"[WARN] Ignoring invalid METRICS_ALLOWED_IPS entry: {entry}", file=sys.stderr)
+    return networks
+
+
+def _scrape_allowed(networks, token):
+    if token:
+        sent = request.headers.get("Authorization", "")
+        if hmac.compare_digest(sent.encode(), f"Bearer {token}".encode()):
+            return True
+    if "X-Forwarded-For" in request.headers and "werkzeug.proxy_fix.orig" not in request.environ:
+        return False  # proxied, and remote_addr is the proxy
+    try:
+        address = ipaddress.ip_address(request.remote_addr or "")
+    except ValueError:
+        return False
+    return any(address in network for network in networks)
+
+
+def init_metrics(app):
+    """Register the timing hooks and GET /metrics; a no-op when disabled or prometheus_client is missing"""
+    if not app.config.get("METRICS_ENABLED", True):
+        return
+    if Histogram is None:
+        print("[WARN] prometheus_client not installed: /metrics disabled", file=sys.stderr)
+        return
+    _get_metrics()
+    with app.app_context():
+        from . import db
+        pools = [("primary", db.engine)]
+    if app.extensions.get("replica") is not None:
+        pools.append(("replica", app.extensions["replica"]))
+    app.wsgi_app = _TimingMiddleware(app.wsgi_app, pools)
+
+    @app.before_request
+    def _start_series():
+        # The route is only known once the URL has been matched
+        series = _request_series()
+        series.in_progress.inc()
+        request.environ[SERIES_KEY] = series
+
+    networks = _allowed_networks(app.config.get("METRICS_ALLOWED_IPS", ""))
+    token = app.config.get("METRICS_TOKEN", "")
+
+    @app.route(app.config.get("METRICS_PATH", "/metrics"))
+    def metrics():
+        if not _scrape_allowed(networks, token):
+            return jsonify({"error": "Forbidden"}), 403
+        _record_pools(pools)
+        if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+            registry = CollectorRegistry()
+            multiprocess.MultiProcessCollector(registry)
+        else:
+            registry = REGISTRY
+        return generate_latest(registry), 200, {"Content-Type": CONTENT_TYPE_LATEST}
@@ -1,6 +1,6 @@
 from datetime import datetime
-from werkzeug.security import generate_password_hash, check_password_hash
 from . import db 
+from .passwords import hash_password, needs_rehash, verify_password
 
 class User(db.Model):
     __tablename__ = "users"
@@ -26,10 +26,14 @@ class User(db.Model):
     )
 
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = hash_password(password)
 
     def check_password(self, password):
-        return check_password_hash(self.password_hash, password)
+        return verify_password(self.password_hash, password)
+
+    def password_needs_rehash(self):
+        """Stored hash predates the current PASSWORD_HASH_METHOD"""
+        return needs_rehash(self.password_hash)
 
     def __repr__(self):
         return f"<User {self.email} - {self.role}>"
@@ -56,10 +60,48 @@ class Flower(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
+    # Composite indexes backing the keyset-paginated catalog (see routes/flowers.py).
+    # Every index ends in id so "WHERE (key) > (cursor) ORDER BY key LIMIT n" is a range scan.
+    __table_args__ = (
+        db.Index("ix_flowers_price_id", "price", "id"),
+        db.Index("ix_flowers_florist_id_id", "florist_id", "id"),
+        db.Index("ix_flowers_stock_status_id", "stock_status", "id"),
+        db.Index("ix_flowers_stock_status_price_id", "stock_status", "price", "id"),
+    )
+
     def __repr__(self):
         return f"<Flower {self.name} - ${self.price}>"
 
 
+class CatalogState(db.Model):
+    """Single-row table holding the catalog version.
+
+    Every flower write bumps ``version`` in the same transaction, so all
+    gunicorn workers see a new version - and drop their cached catalog
+    responses - the moment the write commits.
+    """
+    __tablename__ = "catalog_state"
+
+    id = db.Column(db.Integer, primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<CatalogState v{self.version}>"
+
+
+class PrimaryRead(db.Model):
+    """Users whose reads stay on the primary until ``until``, after a write.
+
+    Lives on the primary so every worker sees the window (see app/replica.py).
+    One row per user who has written, updated in place.
+    """
+    __tablename__ = "primary_reads"
+
+    user_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    until = db.Column(db.DateTime, nullable=False)
+
+
 class Order(db.Model):
     __tablename__ = "orders"
     
@@ -82,6 +124,14 @@ class Order(db.Model):
     # Relationships
     buyer = db.relationship("User", backref="orders", foreign_keys=[buyer_id])
     items = db.relationship("OrderItem", backref="order", lazy=True, cascade="all, delete-orphan")
+
+    # Keyset pagination of order lists by (created_at, id), overall and per buyer;
+    # payment callbacks resolve an order by its checkout reference
+    __table_args__ = (
+        db.Index("ix_orders_created_at_id", "created_at", "id"),
+        db.Index("ix_orders_buyer_id_created_at_id", "buyer_id", "created_at", "id"),
+        db.Index("ix_orders_pesapal_reference", "pesapal_reference", unique=True),
+    )
     
     def __repr__(self):
         return f"<Order #{self.id} - {self.buyer_email}>"
@@ -105,6 +155,97 @@ class OrderItem(db.Model):
     # Relationships
     flower = db.relationship("Flower")
     florist = db.relationship("User", backref="items_sold", foreign_keys=[florist_id])
+
+    # Florist inbox: find a florist's orders, and load one page's items by order_id
+    __table_args__ = (
+        db.Index("ix_order_items_florist_id_order_id", "florist_id", "order_id"),
+        db.Index("ix_order_items_order_id", "order_id"),
+    )
     
     def __repr__(self):
-        return f"<OrderItem {self.flower_name} x{self.quantity}>"
\ No newline at end of file
+        return f"<OrderItem {self.flower_name} x{self.quantity}>"
+
+class PaymentAttempt(db.Model):
+    """
+    One STK push for an order. Queued attempts are the payment job queue
+    (app/payment_queue.py); once sent, the attempt is keyed by the
+    CheckoutRequestID Daraja returned.
+    """
+    __tablename__ = "payment_attempts"
+
+    id = db.Column(db.Integer, primary_key=True)
+    checkout_request_id = db.Column(db.String(100), nullable=True)  # set once Daraja accepts the push
+    order_id = db.Column(db.Integer, db.ForeignKey("orders.id"), nullable=False, index=True)
+    amount = db.Column(db.Float, nullable=False)
+    status = db.Column(db.String(20), nullable=False, default="pending")  # queued, sending, pending, succeeded, failed, error
+    result_code = db.Column(db.Integer, nullable=True)
+    result_desc = db.Column(db.String(255), nullable=True)
+    mpesa_receipt = db.Column(db.String(50), nullable=True)
+
+    # Dispatch bookkeeping
+    tries = db.Column(db.Integer, nullable=False, default=0)
+    error = db.Column(db.String(255), nullable=True)
+    run_after = db.Column(db.DateTime, nullable=True)
+    claimed_at = db.Column(db.DateTime, nullable=True)
+
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    completed_at = db.Column(db.DateTime, nullable=True)
+
+    order = db.relationship("Order", backref=db.backref("payment_attempts", lazy=True))
+
+    # Callbacks are matched (and replays detected) by a single unique-index probe;
+    # dispatchers find the next due job by (status, run_after); reconciliation
+    # pages through old pending attempts by (status, created_at, id); an order
+    # has at most one push queued or being sent (payment_queue.IN_FLIGHT)
+    __table_args__ = (
+        db.Index("ix_payment_attempts_checkout_request_id", "checkout_request_id", unique=True),
+        db.Index("uq_payment_attempts_order_in_flight", "order_id", unique=True,
+                 sqlite_where=db.text("status IN ('queued', 'sending')"),
+                 postgresql_where=db.text("status IN ('queued', 'sending')")),
+        db.Index("ix_payment_attempts_status_run_after", "status", "run_after"),
+        db.Index("ix_payment_attempts_status_created_at_id", "status", "created_at", "id"),
+    )
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "status": self.status,
+            "checkout_request_id": self.checkout_request_id,
+            "tries": self.tries,
+            "error": self.error,
+            "result_desc": self.result_desc,
+            "created_at": self.created_at.isoformat() if self.created_at else None,
+        }
+
+    def __repr__(self):
+        return f"<PaymentAttempt {self.id} {self.checkout_request_id} - {self.status}>"
+
+
+class OrderEvent(db.Model):
+    """
+    Append-only log of order and payment status changes, written in the same
+    transaction as the change. Every worker process tails it to push updates
+    to its SSE subscribers (see app/events.py).
+    """
+    __tablename__ = "order_events"
+
+    id = db.Column(db.Integer, primary_key=True)
+    order_id = db.Column(db.Integer, db.ForeignKey("orders.id"), nullable=False)
+    status = db.Column(db.String(50), nullable=True)
+    paid = db.Column(db.Boolean, nullable=True)
+    payment_status = db.Column(db.String(20), nullable=True)  # status of the payment attempt, if one changed
+    message = db.Column(db.String(255), nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+
+    __table_args__ = (
+        db.Index("ix_order_events_order_id_id", "order_id", "id"),
+    )
+
+    def to_dict(self):
+        return {
+            "order_id": self.order_id,
+            "status": self.status,
+            "paid": self.paid,
+            "payment_status": self.payment_status,
+            "message": self.message,
+        }
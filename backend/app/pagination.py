@@ -0,0 +1,72 @@
+"""Helpers for keyset (cursor) pagination.
+
+A cursor is an opaque, URL-safe token holding the sort key of the last row
+on the previous page. The next page is fetched with a ``WHERE (key) > (last)``
+predicate instead of ``OFFSET``, so every page costs one index range scan no
+matter how deep the client has scrolled.
+"""
+import base64
+import json
+import math
+from datetime import datetime
+
+DEFAULT_PAGE_SIZE = 24
+MAX_PAGE_SIZE = 100
+
+
+class InvalidPageRequest(ValueError):
+    """Raised when a client sends a malformed cursor or page size."""
+
+
+def encode_cursor(values):
+    raw = json.dumps(list(values), separators=(",", ":"), default=str).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(token):
+    if not token:
+        return None
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, TypeError):
+        raise InvalidPageRequest("Invalid cursor")
+    if not isinstance(values, list):
+        raise InvalidPageRequest("Invalid cursor")
+    return values
+
+
+def _cursor_value(value, kind):
+    if isinstance(value, bool):
+        raise InvalidPageRequest("Invalid cursor")
+    if kind is datetime and isinstance(value, str):
+        try:
+            return datetime.fromisoformat(value)
+        except ValueError:
+            raise InvalidPageRequest("Invalid cursor")
+    if kind is int and isinstance(value, int):
+        return value
+    if kind is float and isinstance(value, (int, float)) and math.isfinite(value):
+        return float(value)
+    raise InvalidPageRequest("Invalid cursor")
+
+
+def cursor_values(cursor, types):
+    """Check a decoded cursor against the sort key's Python types (int, float, datetime); returns a tuple."""
+    if cursor is None:
+        return None
+    if len(cursor) != len(types):
+        raise InvalidPageRequest("Invalid cursor")
+    return tuple(_cursor_value(value, kind) for value, kind in zip(cursor, types))
+
+
+def parse_limit(value, default=DEFAULT_PAGE_SIZE, maximum=MAX_PAGE_SIZE):
+    if value in (None, ""):
+        return default
+    try:
+        limit = int(value)
+    except (TypeError, ValueError):
+        raise InvalidPageRequest("limit must be an integer")
+    if limit < 1:
+        raise InvalidPageRequest("limit must be positive")
+    return min(limit, maximum)
@@ -0,0 +1,85 @@
+"""
+Password hashing off the request path.
+
+scrypt and PBKDF2 are slow on purpose: about 100 ms of CPU per hash at the
+default cost. Computed inline, every login or registration holds the GIL
+for that long, and under the gevent worker it blocks the whole event loop,
+so a burst of logins stalls every other request in the process. Hashes are
+instead computed by a small pool of worker processes per web process; the
+request only waits for the result.
+
+PASSWORD_HASH_METHOD sets the cost using werkzeug's method syntax, e.g.
+"scrypt:32768:8:1" or "pbkdf2:sha256:600000". Stored hashes made with other
+parameters keep working. They are replaced with the current method the next
+time their owner logs in (see User.password_needs_rehash).
+"""
+import multiprocessing
+import os
+import sys
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from flask import current_app, has_app_context
+from werkzeug.security import check_password_hash, generate_password_hash
+
+DEFAULT_METHOD = "scrypt:32768:8:1"  # werkzeug's own default, so existing hashes stay current
+# Parameters werkzeug fills in when a method leaves them out
+_METHOD_DEFAULTS = {"scrypt": ["32768", "8", "1"], "pbkdf2": ["sha256", "600000"]}
+
+_pool = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+
+
+def _config(key, default):
+    return current_app.config.get(key, default) if has_app_context() else default
+
+
+def _normalize(method):
+    """Spell out defaulted parameters so "scrypt" and "scrypt:32768:8:1" compare equal"""
+    name, *params = method.split(":")
+    defaults = _METHOD_DEFAULTS.get(name, [])
+    return ":".join([name] + params + defaults[len(params):])
+
+
+def _get_pool(workers):
+    """Lazily start the hashing processes, again after a fork (gunicorn preload)."""
+    global _pool, _pool_pid
+    with _pool_lock:
+        if _pool is None or _pool_pid != os.getpid():
+            # spawn: forking a web worker would copy its threads, sockets and DB connections
+            _pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+            _pool_pid = os.getpid()
+        return _pool
+
+
+def _run(function, *args):
+    workers = _config("PASSWORD_HASH_WORKERS", 2)
+    if workers <= 0:
+        return function(*args)
+    try:
+        return _get_pool(workers).submit(function, *args).result()
+    except BrokenProcessPool as e:
+        # A hashing process died (OOM killer, signal); start a new pool next time
+        global _pool
+        with _pool_lock:
+            _pool = None
+        print(f"[WARN] Password hashing pool failed, hashing inline: {e}", file=sys.stderr)
+        return function(*args)
+
+
+def hash_password(password):
+    return _run(generate_password_hash, password, _config("PASSWORD_HASH_METHOD", DEFAULT_METHOD))
+
+
+def verify_password(pwhash, password):
+    if not pwhash or password is None:
+        return False
+    return _run(check_password_hash, pwhash, password)
+
+
+def needs_rehash(pwhash):
+    """True when ``pwhash`` was made with other parameters than PASSWORD_HASH_METHOD"""
+    stored = (pwhash or "").split("$", 1)[0]
+    return _normalize(stored) != _normalize(_config("PASSWORD_HASH_METHOD", DEFAULT_METHOD))
@@ -1,8 +1,36 @@
 import requests
 import os
 import base64
+import hashlib
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
 from datetime import datetime
 import json
+import uuid
+
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import ConnectTimeoutError
+from urllib3.util.retry import Retry
+
+try:
+    import fcntl
+except ImportError:  # Windows: token refresh is single-flight per process only
+    fcntl = None
+
+# Refresh the OAuth token this long before Safaricom says it expires
+TOKEN_REFRESH_MARGIN = 60
+
+def _never_sent(error):
+    """True when a request failed before any connection was made, so Daraja cannot have seen it"""
+    if isinstance(error, requests.exceptions.ConnectTimeout):
+        return True
+    # Connect failures surface as ConnectionError(MaxRetryError(reason=NewConnectionError/ConnectTimeoutError));
+    # a connection dropped after sending is a ConnectionError too, but without that reason
+    reason = getattr(error.args[0], "reason", None) if error.args else None
+    return isinstance(error, requests.exceptions.ConnectionError) and isinstance(reason, ConnectTimeoutError)
+
 
 class DarajaPayment:
     """M-Pesa Daraja API Integration for Flora X"""
@@ -17,7 +45,21 @@ class DarajaPayment:
         
         # Determine Environment
         self.is_sandbox = os.getenv("DARAJA_MODE", "sandbox").lower() == "sandbox"
-        self.base_url = "https://sandbox.safaricom.co.ke" if self.is_sandbox else "https://api.safaricom.co.ke"
+        self.base_url = os.getenv("DARAJA_BASE_URL") or (
+            "https://sandbox.safaricom.co.ke" if self.is_sandbox else "https://api.safaricom.co.ke"
+        )
+
+        # OAuth tokens live ~1h; every gunicorn worker on the host shares one
+        # through this file instead of fetching its own before each push.
+        cache_key = hashlib.sha1(f"{self.base_url}|{self.consumer_key}".encode()).hexdigest()[:12]
+        self.token_cache_path = os.getenv("DARAJA_TOKEN_CACHE") or os.path.join(
+            tempfile.gettempdir(), f"florax-daraja-token-{cache_key}.json"
+        )
+        self.pool_size = int(os.getenv("DARAJA_POOL_SIZE", 10))
+        self._token = None  # (access_token, expires_at)
+        self._token_lock = threading.Lock()
+        self._session = None
+        self._session_pid = None
 
         # Check for Mock Mode if keys are missing
         self.mock_mode = not all([self.consumer_key, self.consumer_secret, self.passkey])
@@ -33,39 +75,140 @@ class DarajaPayment:
             return "254" + phone
         return phone
 
-    def get_access_token(self):
-        """Get OAuth2 token from Safaricom"""
-        if self.mock_mode: return "mock_access_token"
-        
-        url = f"{self.base_url}/oauth/v1/generate?grant_type=client_credentials"
+    def _get_session(self):
+        """
+        Keep-alive connection pool to Daraja, created per process so forked
+        workers never share sockets. Only connection failures and GETs are
+        retried: re-sending an STK push POST could prompt the customer twice.
+        """
+        if self._session is None or self._session_pid != os.getpid():
+            retry = Retry(
+                total=3, connect=3, read=0, status=2, backoff_factor=0.3,
+                status_forcelist=(429, 500, 502, 503, 504),
+                allowed_methods=frozenset({"GET"}), raise_on_status=False,
+            )
+            adapter = HTTPAdapter(pool_connections=2, pool_maxsize=self.pool_size, max_retries=retry)
+            session = requests.Session()
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            self._session = session
+            self._session_pid = os.getpid()
+        return self._session
+
+    def _cached_token(self):
+        """A still-fresh token from this process, or from the file shared by all workers"""
+        now = time.time()
+        if self._token and self._token[1] - TOKEN_REFRESH_MARGIN > now:
+            return self._token[0]
         try:
-            response = requests.get(url, auth=(self.consumer_key, self.consumer_secret), timeout=10)
-            response.raise_for_status()
-            return response.json().get("access_token")
-        except Exception as e:
-            print(f"Daraja Token Error: {e}")
+            with open(self.token_cache_path) as f:
+                cached = json.load(f)
+        except (OSError, ValueError):
             return None
+        if cached.get("expires_at", 0) - TOKEN_REFRESH_MARGIN > now and cached.get("access_token"):
+            self._token = (cached["access_token"], cached["expires_at"])
+            return self._token[0]
+        return None
+
+    def _store_token(self, token, expires_at):
+        self._token = (token, expires_at)
+        tmp_path = f"{self.token_cache_path}.{os.getpid()}.tmp"
+        try:
+            fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(fd, "w") as f:
+                json.dump({"access_token": token, "expires_at": expires_at}, f)
+            os.replace(tmp_path, self.token_cache_path)
+        except OSError as e:
+            print(f"Daraja Token Cache Error: {e}")
+
+    @contextmanager
+    def _refresh_lock(self):
+        """Serialize token refreshes across threads and, where flock exists, processes"""
+        with self._token_lock:
+            if fcntl is None:
+                yield
+                return
+            with open(f"{self.token_cache_path}.lock", "a") as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def invalidate_token(self, token):
+        """Forget a token Daraja rejected, unless another worker already replaced it"""
+        if self._token and self._token[0] == token:
+            self._token = None
+        try:
+            with open(self.token_cache_path) as f:
+                if json.load(f).get("access_token") == token:
+                    os.remove(self.token_cache_path)
+        except (OSError, ValueError):
+            pass
+
+    def get_access_token(self):
+        """Get OAuth2 token from Safaricom, reusing a cached one until shortly before expiry"""
+        if self.mock_mode: return "mock_access_token"
+
+        token = self._cached_token()
+        if token:
+            return token
+
+        with self._refresh_lock():
+            # Whoever held the lock before us has probably refreshed already
+            token = self._cached_token()
+            if token:
+                return token
+
+            url = f"{self.base_url}/oauth/v1/generate?grant_type=client_credentials"
+            try:
+                response = self._get_session().get(url, auth=(self.consumer_key, self.consumer_secret), timeout=10)
+                response.raise_for_status()
+                data = response.json()
+            except Exception as e:
+                print(f"Daraja Token Error: {e}")
+                return None
+
+            token = data.get("access_token")
+            if token:
+                self._store_token(token, time.time() + int(data.get("expires_in") or 3599))
+            return token
+
+    def _password(self):
+        """Password = Base64(ShortCode + Passkey + Timestamp); returns (password, timestamp)"""
+        timestamp = datetime.now().strftime('%Y%m%d%H%M%S')
+        password_str = f"{self.shortcode}{self.passkey}{timestamp}"
+        return base64.b64encode(password_str.encode()).decode(), timestamp
+
+    def _post(self, path, payload, timeout=15):
+        """POST to Daraja with the shared token; a token revoked before its expiry gets one refresh"""
+        url = f"{self.base_url}{path}"
+        response = None
+        for _ in range(2):
+            token = self.get_access_token()
+            if not token:
+                return None
+            headers = {"Authorization": f"Bearer {token}", "Content-Type": "application/json"}
+            response = self._get_session().post(url, json=payload, headers=headers, timeout=timeout)
+            if response.status_code != 401:
+                break
+            self.invalidate_token(token)
+        return response
 
     def trigger_stk_push(self, phone, amount, order_id):
         """
-        Initiates the STK Push (M-Pesa PIN prompt)
+        Initiates the STK Push (M-Pesa PIN prompt). Failures carry
+        ``reached``: False only when Daraja cannot have received the push
+        (no token, no connection), which is the only case safe to resend.
         """
         if self.mock_mode:
-            return {"success": True, "CheckoutRequestID": "MOCK_LNM_123", "CustomerMessage": "Mock Push Sent"}
-
-        token = self.get_access_token()
-        if not token:
-            return {"success": False, "error": "Authentication failed"}
+            # Checkout IDs are unique per push, mock ones included
+            checkout_id = f"MOCK_LNM_{order_id}_{uuid.uuid4().hex[:12]}"
+            return {"success": True, "CheckoutRequestID": checkout_id, "CustomerMessage": "Mock Push Sent"}
 
         formatted_phone = self._sanitize_phone(phone)
-        timestamp = datetime.now().strftime('%Y%m%d%H%M%S')
-        
-        # Password = Base64(ShortCode + Passkey + Timestamp)
-        password_str = f"{self.shortcode}{self.passkey}{timestamp}"
-        password = base64.b64encode(password_str.encode()).decode()
+        password, timestamp = self._password()
 
-        headers = {"Authorization": f"Bearer {token}", "Content-Type": "application/json"}
-        
         payload = {
             "BusinessShortCode": self.shortcode,
             "Password": password,
@@ -81,20 +224,61 @@ class DarajaPayment:
         }
 
         try:
-            url = f"{self.base_url}/mpesa/stkpush/v1/processrequest"
-            response = requests.post(url, json=payload, headers=headers, timeout=15)
+            response = self._post("/mpesa/stkpush/v1/processrequest", payload)
+            if response is None:
+                return {"success": False, "error": "Authentication failed", "reached": False}
+        except Exception as e:
+            return {"success": False, "error": str(e), "reached": not _never_sent(e)}
+
+        # Daraja got the request from here on: timeouts and errors above are the only resendable cases
+        try:
             response.raise_for_status()
             res_data = response.json()
-            
-            # ResponseCode "0" means the prompt was successfully sent to the phone
+        except Exception as e:
+            return {"success": False, "error": str(e), "reached": True}
+
+        # ResponseCode "0" means the prompt was successfully sent to the phone
+        return {
+            "success": res_data.get("ResponseCode") == "0",
+            "CheckoutRequestID": res_data.get("CheckoutRequestID"),
+            "CustomerMessage": res_data.get("CustomerMessage"),
+            "raw_response": res_data,
+            "reached": True,
+        }
+
+    def query_stk_status(self, checkout_request_id):
+        """
+        Ask Daraja how an STK push ended (STK Push Query), for pushes whose
+        callback never arrived. Returns {"done": False} while the customer has
+        not finished or the query itself failed, otherwise
+        {"done": True, "ResultCode": int, "ResultDesc": str}.
+        """
+        if self.mock_mode:
+            # Mock pushes never reach a phone; leave them for a real callback
+            return {"done": False, "error": "Mock mode"}
+
+        password, timestamp = self._password()
+        payload = {
+            "BusinessShortCode": self.shortcode,
+            "Password": password,
+            "Timestamp": timestamp,
+            "CheckoutRequestID": checkout_request_id,
+        }
+        try:
+            response = self._post("/mpesa/stkpushquery/v1/query", payload, timeout=10)
+            if response is None:
+                return {"done": False, "error": "Authentication failed"}
+            res_data = response.json()
+            # Daraja answers 500 "The transaction is being processed" until the customer acts
+            if response.status_code != 200 or res_data.get("ResponseCode") != "0":
+                return {"done": False, "error": res_data.get("errorMessage") or f"HTTP {response.status_code}"}
             return {
-                "success": res_data.get("ResponseCode") == "0",
-                "CheckoutRequestID": res_data.get("CheckoutRequestID"),
-                "CustomerMessage": res_data.get("CustomerMessage"),
-                "raw_response": res_data
+                "done": True,
+                "ResultCode": int(res_data.get("ResultCode")),
+                "ResultDesc": res_data.get("ResultDesc"),
             }
         except Exception as e:
-            return {"success": False, "error": str(e)}
+            return {"done": False, "error": str(e)}
 
 # Singleton instance
 daraja = DarajaPayment()
\ No newline at end of file
@@ -0,0 +1,330 @@
+"""
+Durable queue for M-Pesa STK pushes.
+
+initialize_daraja_payment only records a "queued" PaymentAttempt and returns.
+Dispatcher threads in each web process (or separate ``flask payments work``
+processes) claim queued attempts from the database, call Daraja and record
+the outcome. The queue is the payment_attempts table itself, so jobs survive
+restarts and any process can pick them up.
+
+Attempt lifecycle:
+  queued   -> waiting for a dispatcher (again after a transient failure)
+  sending  -> claimed, STK push in flight
+  pending  -> push accepted, waiting for the customer and the callback
+  succeeded / failed -> callback received (see routes/payment.py)
+  error    -> push rejected, retries exhausted or interrupted
+"""
+import os
+import queue
+import sys
+import threading
+import time
+from datetime import datetime, timedelta
+
+import click
+from flask.cli import AppGroup
+from sqlalchemy import select, update
+
+from . import db
+from .events import order_event, record_order_events
+from .models import Order, PaymentAttempt
+from .payment import daraja
+
+IN_FLIGHT = ("queued", "sending")
+CLAIM_BATCH = 10
+RETRY_BACKOFF = 5  # seconds before the first retry, doubled on each further one
+
+_dispatcher = None
+_dispatcher_lock = threading.Lock()
+_last_expiry = 0.0
+_expiry_lock = threading.Lock()
+
+
+def enqueue_stk_push(order):
+    """Queue an STK push for ``order``; the caller commits. Returns the attempt."""
+    attempt = PaymentAttempt(order_id=order.id, amount=order.total_price, status="queued",
+                             run_after=datetime.utcnow())
+    db.session.add(attempt)
+    return attempt
+
+
+def in_flight_attempt(order_id):
+    """A push already queued or being sent for this order, so double submits reuse it"""
+    return (PaymentAttempt.query
+            .filter(PaymentAttempt.order_id == order_id, PaymentAttempt.status.in_(IN_FLIGHT))
+            .order_by(PaymentAttempt.id.desc())
+            .first())
+
+
+def _claim(attempt_id=None):
+    """
+    Move one due attempt from queued to sending. The conditional UPDATE is the
+    lock: when dispatchers race for a row only one of them changes it.
+    """
+    now = datetime.utcnow()
+    if attempt_id is not None:
+        candidates = [attempt_id]
+    else:
+        candidate_query = (select(PaymentAttempt.id)
+                           .where(PaymentAttempt.status == "queued", PaymentAttempt.run_after <= now)
+                           .order_by(PaymentAttempt.run_after, PaymentAttempt.id)
+                           .limit(CLAIM_BATCH))
+        if db.engine.dialect.name == "postgresql":
+            candidate_query = candidate_query.with_for_update(skip_locked=True)
+        candidates = db.session.execute(candidate_query).scalars().all()
+
+    for candidate in candidates:
+        claimed = db.session.execute(
+            update(PaymentAttempt)
+            .where(PaymentAttempt.id == candidate, PaymentAttempt.status == "queued")
+            .values(status="sending", claimed_at=now, tries=PaymentAttempt.tries + 1)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        db.session.commit()
+        if claimed:
+            return db.session.get(PaymentAttempt, candidate)
+    db.session.commit()
+    return None
+
+
+def _send(attempt, max_tries):
+    order = attempt.order
+    attempt_id, phone, amount, order_id = attempt.id, order.buyer_phone, attempt.amount, order.id
+    # The claim is committed; end this read too, so no connection or lock is held during the HTTP call
+    db.session.commit()
+    result = daraja.trigger_stk_push(phone, amount, order_id)
+
+    # Apply the outcome in a new, short transaction
+    attempt = db.session.get(PaymentAttempt, attempt_id)
+    order = attempt.order
+    if result.get("success"):
+        attempt.checkout_request_id = result.get("CheckoutRequestID") or result.get("reference")
+        attempt.status = "pending"
+        attempt.error = None
+        order.payment_method = "mpesa"
+        order.pesapal_reference = attempt.checkout_request_id
+    elif result.get("reached") is False and attempt.tries < max_tries:
+        # Never reached Daraja (no connection, no token): safe to try the push again
+        attempt.status = "queued"
+        attempt.run_after = datetime.utcnow() + timedelta(seconds=RETRY_BACKOFF * 2 ** (attempt.tries - 1))
+        attempt.error = str(result.get("error") or "STK push failed")[:255]
+    else:
+        # Rejected, or possibly delivered (read timeout, HTTP error): resending could prompt twice
+        attempt.status = "error"
+        attempt.error = str(result.get("error") or result.get("CustomerMessage") or "STK push failed")[:255]
+    record_order_events([order_event(order, payment_status=attempt.status, message=attempt.error)])
+    db.session.commit()
+
+
+def _expire_stale_sends(timeout):
+    """
+    Give up on pushes whose dispatcher died mid-request. Whether Daraja got
+    the push is unknown, so rather than risk prompting the customer twice
+    the attempt is closed and the buyer can start a new one. Each closed
+    attempt gets an order event, so open streams hear about it.
+    """
+    global _last_expiry
+    with _expiry_lock:
+        if time.monotonic() - _last_expiry < min(timeout, 30):
+            return
+        _last_expiry = time.monotonic()
+    cutoff = datetime.utcnow() - timedelta(seconds=timeout)
+    stale = db.session.execute(
+        select(PaymentAttempt.id).where(PaymentAttempt.status == "sending", PaymentAttempt.claimed_at < cutoff)
+    ).scalars().all()
+    message = "Payment request was interrupted, please try again"
+    expired = []
+    for attempt_id in stale:
+        # Conditional, like _claim: a dispatcher finishing the push meanwhile wins
+        if db.session.execute(
+            update(PaymentAttempt)
+            .where(PaymentAttempt.id == attempt_id, PaymentAttempt.status == "sending")
+            .values(status="error", error=message)
+            .execution_options(synchronize_session=False)
+        ).rowcount:
+            expired.append(attempt_id)
+    if expired:
+        orders = db.session.execute(
+            select(Order.id, Order.status, Order.paid)
+            .join(PaymentAttempt, PaymentAttempt.order_id == Order.id)
+            .where(PaymentAttempt.id.in_(expired))
+        ).all()
+        record_order_events([order_event(order, payment_status="error", message=message) for order in orders])
+    db.session.commit()
+
+
+def process_queued_pushes(app, attempt_id=None, limit=None):
+    """Send due STK pushes until the queue is empty (or ``limit``); returns how many were sent."""
+    _expire_stale_sends(app.config.get("PAYMENT_SEND_TIMEOUT", 120))
+    max_tries = app.config.get("PAYMENT_MAX_TRIES", 3)
+    sent = 0
+    while limit is None or sent < limit:
+        attempt = _claim(attempt_id)
+        if attempt is None:
+            break
+        try:
+            _send(attempt, max_tries)
+        except Exception as e:
+            db.session.rollback()
+            print(f"[ERROR] STK push for attempt {attempt.id} failed: {e}", file=sys.stderr)
+            db.session.execute(
+                update(PaymentAttempt).where(PaymentAttempt.id == attempt.id)
+                .values(status="error", error=str(e)[:255])
+                .execution_options(synchronize_session=False)
+            )
+            db.session.commit()
+        sent += 1
+        if attempt_id is not None:
+            break
+    return sent
+
+
+def settle_attempts(outcomes):
+    """
+    Record how sent pushes ended. ``outcomes`` are dicts with attempt_id,
+    order_id, result_code, result_desc and an optional receipt. Each attempt
+    is claimed with a conditional update, so a result that arrives twice (a
+    replayed callback, or a callback racing reconciliation) is applied once;
+    the affected orders are then updated in bulk and an order event is
+    recorded for each settled attempt. The caller commits.
+    Returns the ids of the attempts settled by this call.
+    """
+    now = datetime.utcnow()
+    settled, paid_orders, failed_orders = [], set(), set()
+    for outcome in outcomes:
+        succeeded = outcome["result_code"] == 0
+        claimed = db.session.execute(
+            update(PaymentAttempt)
+            .where(PaymentAttempt.id == outcome["attempt_id"], PaymentAttempt.status == "pending")
+            .values(
+                status="succeeded" if succeeded else "failed",
+                result_code=outcome["result_code"],
+                result_desc=(outcome.get("result_desc") or "")[:255] or None,
+                mpesa_receipt=outcome.get("receipt") if succeeded else None,
+                completed_at=now,
+            )
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        if claimed:
+            settled.append(outcome)
+            (paid_orders if succeeded else failed_orders).add(outcome["order_id"])
+
+    if paid_orders:
+        db.session.execute(
+            update(Order).where(Order.id.in_(paid_orders))
+            .values(paid=True, status="paid")
+            .execution_options(synchronize_session=False)
+        )
+    failed_orders -= paid_orders
+    if failed_orders:
+        # A failed retry must not undo an earlier successful attempt
+        db.session.execute(
+            update(Order).where(Order.id.in_(failed_orders), Order.paid.isnot(True))
+            .values(status="failed")
+            .execution_options(synchronize_session=False)
+        )
+
+    if settled:
+        orders = {order.id: order for order in db.session.execute(
+            select(Order.id, Order.status, Order.paid).where(Order.id.in_({o["order_id"] for o in settled}))
+        )}
+        record_order_events([
+            order_event(orders[outcome["order_id"]],
+                        payment_status="succeeded" if outcome["result_code"] == 0 else "failed",
+                        message=outcome.get("result_desc"))
+            for outcome in settled
+        ])
+    return [outcome["attempt_id"] for outcome in settled]
+
+
+class PaymentDispatcher:
+    """
+    Daemon threads draining the queue. Local enqueues wake a thread at once;
+    the first thread also polls, for jobs queued by other processes or left
+    over from a restart.
+    """
+
+    def __init__(self, app, workers, poll_interval):
+        self.app = app
+        self.pid = os.getpid()
+        self.wakeups = queue.Queue()
+        self.threads = [
+            threading.Thread(target=self._run, args=(poll_interval if i == 0 else None,),
+                             name=f"payment-dispatch-{i}", daemon=True)
+            for i in range(max(workers, 1))
+        ]
+        for thread in self.threads:
+            thread.start()
+
+    def notify(self):
+        self.wakeups.put(None)
+
+    def _run(self, poll_interval):
+        while True:
+            try:
+                self.wakeups.get(timeout=poll_interval)
+            except queue.Empty:
+                pass
+            with self.app.app_context():
+                try:
+                    process_queued_pushes(self.app)
+                except Exception as e:
+                    db.session.rollback()
+                    print(f"[ERROR] Payment dispatcher: {e}", file=sys.stderr)
+                finally:
+                    db.session.remove()
+
+
+def get_dispatcher(app):
+    """Start this process's dispatcher on first use, again after a fork (gunicorn preload)."""
+    global _dispatcher
+    if app.config.get("PAYMENT_DISPATCH", "threads") != "threads":
+        return None
+    with _dispatcher_lock:
+        if _dispatcher is None or _dispatcher.pid != os.getpid():
+            _dispatcher = PaymentDispatcher(app, app.config.get("PAYMENT_WORKERS", 4),
+                                            app.config.get("PAYMENT_POLL_INTERVAL", 2.0))
+        return _dispatcher
+
+
+payments_cli = AppGroup("payments", help="M-Pesa payment queue.")
+
+
+@payments_cli.command("work")
+@click.option("--once", is_flag=True, help="Drain the queue and exit instead of polling.")
+def work_command(once):
+    """Run a dedicated STK push worker (use with PAYMENT_DISPATCH=worker)."""
+    from flask import current_app
+    app = current_app._get_current_object()
+    poll_interval = app.config.get("PAYMENT_POLL_INTERVAL", 2.0)
+    while True:
+        sent = process_queued_pushes(app)
+        if sent:
+            click.echo(f"Sent {sent} STK push(es)")
+        if once:
+            break
+        db.session.remove()
+        time.sleep(poll_interval)
+
+
+@payments_cli.command("reconcile")
+@click.option("--older-than", type=int, default=None, help="Seconds a push must have been pending (RECONCILE_AFTER).")
+@click.option("--every", type=float, default=0, help="Repeat every N seconds instead of running once.")
+@click.option("--limit", type=int, default=None, help="Query at most this many attempts per run.")
+def reconcile_command(older_than, every, limit):
+    """Query Daraja for pushes whose callback never arrived and settle them."""
+    from flask import current_app
+    from .reconciliation import reconcile_pending
+    if daraja.mock_mode:
+        # Mock queries report every push as still running, so nothing would ever settle
+        raise click.ClickException("Daraja credentials are not set (DARAJA_KEY, DARAJA_SECRET, DARAJA_PASSKEY)")
+    app = current_app._get_current_object()
+    while True:
+        started = time.perf_counter()
+        stats = reconcile_pending(app, older_than=older_than, limit=limit)
+        click.echo(", ".join(f"{key} {value}" for key, value in stats.items())
+                   + f" in {time.perf_counter() - started:.1f}s")
+        if not every:
+            break
+        db.session.remove()
+        time.sleep(every)
@@ -0,0 +1,122 @@
+"""
+Per-request SQL profiling: query counts, database time, N+1 and slow queries.
+
+Engine events time every statement a request executes. At the end of the
+request:
+
+  * statements run more than SQL_REPEAT_THRESHOLD times with the same SQL
+    (usually a lazy load in a loop, the N+1 pattern) are logged once each,
+    with the route and the count,
+  * statements slower than SQL_SLOW_QUERY_MS are written to the slow-query
+    log (SQL_SLOW_QUERY_LOG, default stderr) with their EXPLAIN plan, taken
+    on a separate connection after the response is built. Only SELECTs log
+    their parameters; writes carry password hashes, phones and emails,
+  * with SQL_PROFILE_HEADERS (default: in debug mode) the response carries
+    X-DB-Queries and a Server-Timing "db" entry for browser dev tools.
+
+Statements executed outside a request (dispatcher and broker threads, CLI
+commands) are not profiled.
+"""
+import logging
+import time
+from collections import Counter
+
+from flask import current_app, g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from . import db
+
+logger = logging.getLogger(__name__)
+EXPLAINABLE = ("SELECT", "WITH")
+
+_listening = False
+
+
+class QueryProfile:
+    __slots__ = ("count", "seconds", "statements", "slow")
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self.statements = Counter()
+        self.slow = []  # (seconds, statement, parameters)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if has_request_context() and current_app.config.get("SQL_PROFILE_ENABLED", True):
+        if "_sql_profile" not in g:
+            g._sql_profile = QueryProfile()
+        context._sql_profile_started = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    profile = g.get("_sql_profile") if has_request_context() else None
+    started = getattr(context, "_sql_profile_started", None)
+    if profile is None or started is None:
+        return
+    elapsed = time.perf_counter() - started
+    profile.count += 1
+    profile.seconds += elapsed
+    profile.statements[statement] += 1
+    if elapsed * 1000 >= current_app.config.get("SQL_SLOW_QUERY_MS", 200) and not executemany:
+        profile.slow.append((elapsed, statement, parameters))
+
+
+def _is_select(statement):
+    return statement.lstrip().upper().startswith(EXPLAINABLE)
+
+
+def _explain(statement, parameters):
+    """The plan for a slow SELECT, or None for other statements"""
+    if not _is_select(statement):
+        return None
+    prefix = "EXPLAIN QUERY PLAN " if db.engine.dialect.name == "sqlite" else "EXPLAIN "
+    try:
+        with db.engine.connect() as connection:
+            rows = connection.exec_driver_sql(prefix + statement, parameters).all()
+        return "\n".join(" | ".join(str(value) for value in row) for row in rows)
+    except Exception as e:
+        return f"(EXPLAIN failed: {e})"
+
+
+def _report(profile):
+    route = f"{request.method} {request.url_rule.rule if request.url_rule else request.path}"
+    threshold = current_app.config.get("SQL_REPEAT_THRESHOLD", 5)
+    for statement, times in profile.statements.items():
+        if times > threshold:
+            logger.warning("[N+1] %s ran the same statement %d times: %s", route, times, " ".join(statement.split()))
+    for elapsed, statement, parameters in profile.slow:
+        shown = repr(parameters) if _is_select(statement) else "(redacted)"
+        logger.warning("[SLOW] %s %.1f ms: %s\nparameters: %s\nplan:\n%s", route, elapsed * 1000,
+                       " ".join(statement.split()), shown, _explain(statement, parameters))
+
+
+def init_profiling(app):
+    """Register the engine events (once per process) and the after_request hook"""
+    global _listening
+    if not app.config.get("SQL_PROFILE_ENABLED", True):
+        return
+    if not _listening:
+        # Engine class: covers every engine the process creates
+        event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+        _listening = True
+
+    path = app.config.get("SQL_SLOW_QUERY_LOG")
+    if path and not any(getattr(h, "baseFilename", None) == path for h in logger.handlers):
+        handler = logging.FileHandler(path)
+        handler.setFormatter(logging.Formatter("%(asctime)s %(process)d %(message)s"))
+        logger.addHandler(handler)
+
+    @app.after_request
+    def _finish_profile(response):
+        # Created by the first statement the request runs
+        profile = g.pop("_sql_profile", None) or QueryProfile()
+        headers = app.config.get("SQL_PROFILE_HEADERS")
+        if app.debug if headers is None else headers:
+            response.headers["X-DB-Queries"] = str(profile.count)
+            response.headers.add("Server-Timing", f'db;dur={profile.seconds * 1000:.1f};desc="{profile.count} queries"')
+        if profile.count:
+            _report(profile)
+        return response
@@ -0,0 +1,115 @@
+"""
+Reconciliation of STK pushes whose callback never arrived.
+
+Daraja delivers each result once to the callback URL; if that request is
+lost the attempt (and its order) would stay "pending" forever. The
+reconciler walks pending attempts older than RECONCILE_AFTER seconds,
+asks Daraja for their outcome with the STK Push Query API from a bounded
+thread pool under a shared rate limit, and settles each page of results
+in a single transaction through the same path as the callback.
+
+Run it on a schedule with ``flask payments reconcile`` (see render.yaml).
+"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from sqlalchemy import select, tuple_
+
+from . import db
+from .models import PaymentAttempt
+from .payment import daraja
+from .payment_queue import settle_attempts
+
+
+class RateLimiter:
+    """Spaces calls at least 1/rate seconds apart, across all threads"""
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate and rate > 0 else 0
+        self.next_slot = time.monotonic()
+        self.lock = threading.Lock()
+
+    def wait(self):
+        if not self.interval:
+            return
+        with self.lock:
+            now = time.monotonic()
+            slot = max(self.next_slot, now)
+            self.next_slot = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+def _pending_page(cutoff, after, batch_size):
+    """The next page of reconcilable attempts, keyset-ordered by (created_at, id)"""
+    query = (select(PaymentAttempt.id, PaymentAttempt.order_id, PaymentAttempt.checkout_request_id,
+                    PaymentAttempt.created_at)
+             .where(PaymentAttempt.status == "pending",
+                    PaymentAttempt.created_at < cutoff,
+                    PaymentAttempt.checkout_request_id.isnot(None))
+             .order_by(PaymentAttempt.created_at, PaymentAttempt.id)
+             .limit(batch_size))
+    if after is not None:
+        query = query.where(tuple_(PaymentAttempt.created_at, PaymentAttempt.id) > tuple_(*after))
+    return db.session.execute(query).all()
+
+
+def reconcile_pending(app, older_than=None, concurrency=None, rate=None, batch_size=None, limit=None):
+    """
+    Query Daraja for every pending attempt older than ``older_than`` seconds
+    and settle the finished ones. Returns counts: checked, paid, failed,
+    unresolved (still processing or the query failed) and already_settled
+    (a callback got there first).
+    """
+    config = app.config
+    older_than = config.get("RECONCILE_AFTER", 120) if older_than is None else older_than
+    concurrency = concurrency or config.get("RECONCILE_CONCURRENCY", 8)
+    rate = config.get("RECONCILE_RATE", 20) if rate is None else rate
+    batch_size = batch_size or config.get("RECONCILE_BATCH", 500)
+
+    cutoff = datetime.utcnow() - timedelta(seconds=older_than)
+    limiter = RateLimiter(rate)
+    stats = {"checked": 0, "paid": 0, "failed": 0, "unresolved": 0, "already_settled": 0}
+
+    def query(row):
+        limiter.wait()
+        return row, daraja.query_stk_status(row.checkout_request_id)
+
+    after = None
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="reconcile") as pool:
+        while limit is None or stats["checked"] < limit:
+            size = batch_size if limit is None else min(batch_size, limit - stats["checked"])
+            rows = _pending_page(cutoff, after, size)
+            # Release the read transaction while the pool waits on Daraja
+            db.session.commit()
+            if not rows:
+                break
+            after = (rows[-1].created_at, rows[-1].id)
+
+            outcomes = []
+            for row, result in pool.map(query, rows):
+                if not result.get("done"):
+                    stats["unresolved"] += 1
+                    continue
+                outcomes.append({
+                    "attempt_id": row.id,
+                    "order_id": row.order_id,
+                    "result_code": result["ResultCode"],
+                    "result_desc": result.get("ResultDesc"),
+                })
+
+            # One transaction per page
+            settled = set(settle_attempts(outcomes))
+            db.session.commit()
+
+            stats["checked"] += len(rows)
+            for outcome in outcomes:
+                if outcome["attempt_id"] not in settled:
+                    stats["already_settled"] += 1
+                elif outcome["result_code"] == 0:
+                    stats["paid"] += 1
+                else:
+                    stats["failed"] += 1
+    return stats
@@ -0,0 +1,132 @@
+"""
+Read-replica routing for read-only GET routes.
+
+With DATABASE_REPLICA_URL set, init_replica() creates a second engine for
+it (same engine options as the primary) and routes decorated with
+@read_replica run their SELECTs against it. Everything else (writes,
+flushes, routes without the decorator, background workers) uses the
+primary. Without a replica the decorator does nothing.
+
+Replicas lag. So that users see their own writes, a successful POST, PUT,
+PATCH or DELETE by a signed-in user stamps their row in primary_reads, and
+their @read_replica requests read from the primary until the stamp is
+DB_REPLICA_STICKY_SECONDS old. The stamp lives on the primary, so every
+worker sees it. Checking it costs one primary-key lookup per signed-in read;
+anonymous reads skip it.
+
+A replica-routed request reads the catalog version and the rows from the
+same database, so the catalog cache never stores a body under a version it
+was not built from.
+"""
+import sys
+from datetime import datetime, timedelta
+from functools import wraps
+
+from flask import current_app, g, has_app_context, request
+from flask_jwt_extended import get_jwt_identity, verify_jwt_in_request
+from flask_sqlalchemy.session import Session
+from sqlalchemy import create_engine, insert, select, update
+from sqlalchemy.exc import IntegrityError
+
+from .breaker import breaker_for
+
+WRITE_METHODS = ("POST", "PUT", "PATCH", "DELETE")
+
+
+class RoutingSession(Session):
+    """Session that sends SELECTs to the replica while a @read_replica route runs"""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if (bind is None and not self._flushing and getattr(clause, "is_select", False)
+                and has_app_context() and g.get("_db_read_replica")):
+            engine = current_app.extensions.get("replica")
+            breaker = breaker_for(engine) if engine is not None else None
+            # With the replica's breaker open, reads fall back to the primary
+            if engine is not None and not (breaker and breaker.is_open):
+                return engine
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+def _identity(optional=False):
+    """JWT identity of the request; with ``optional``, verify a token the route did not require"""
+    try:
+        return get_jwt_identity()
+    except RuntimeError:  # no @jwt_required on this route
+        pass
+    if not optional:
+        return None
+    try:
+        verify_jwt_in_request(optional=True)
+        return get_jwt_identity()
+    except Exception:  # a bad token is the route's business, not ours
+        return None
+
+
+def mark_writer(user_id, seconds):
+    """Keep ``user_id``'s reads on the primary for ``seconds``.
+
+    Runs in its own transaction on the primary, so whatever the request's
+    session holds is neither committed nor rolled back here.
+    """
+    from . import db
+    from .models import PrimaryRead
+
+    until = datetime.utcnow() + timedelta(seconds=seconds)
+    stamp = update(PrimaryRead).where(PrimaryRead.user_id == user_id).values(until=until)
+    try:
+        with db.engine.begin() as connection:
+            if connection.execute(stamp).rowcount == 0:
+                connection.execute(insert(PrimaryRead).values(user_id=user_id, until=until))
+    except IntegrityError:  # another worker inserted it first
+        with db.engine.begin() as connection:
+            connection.execute(stamp)
+
+
+def _sticky():
+    from . import db
+    from .models import PrimaryRead
+
+    identity = _identity(optional=True)
+    if identity is None:
+        return False
+    until = db.session.execute(select(PrimaryRead.until).where(PrimaryRead.user_id == int(identity))).scalar()
+    return until is not None and until > datetime.utcnow()
+
+
+def read_replica(view):
+    """Run the view's reads on the replica, unless this client wrote recently"""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if current_app.extensions.get("replica") is None or _sticky():
+            return view(*args, **kwargs)
+        g._db_read_replica = True
+        try:
+            return view(*args, **kwargs)
+        finally:
+            g.pop("_db_read_replica", None)
+
+    return wrapper
+
+
+def init_replica(app):
+    """Create the replica engine and start the primary window after writes; None without a replica"""
+    uri = app.config.get("SQLALCHEMY_REPLICA_URI")
+    if not uri:
+        return None
+    engine = app.extensions["replica"] = create_engine(uri, **app.config.get("SQLALCHEMY_ENGINE_OPTIONS", {}))
+
+    @app.after_request
+    def _stick_to_primary(response):
+        if request.method not in WRITE_METHODS or response.status_code >= 400:
+            return response
+        identity = _identity()
+        if identity is None:
+            return response
+        try:
+            mark_writer(int(identity), app.config.get("DB_REPLICA_STICKY_SECONDS", 5))
+        except Exception as e:
+            # The write itself succeeded; the worst case is a stale read from the replica
+            print(f"[WARN] Could not record primary read window for user {identity}: {e}", file=sys.stderr)
+        return response
+
+    return engine
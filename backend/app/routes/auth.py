@@ -2,6 +2,7 @@ from flask import Blueprint, request, jsonify
 from flask_jwt_extended import create_access_token
 from sqlalchemy.exc import OperationalError
 from ..models import User
+from ..serializers import user_json
 from .. import db
 
 auth_bp = Blueprint("auth_bp", __name__)
@@ -50,18 +51,16 @@ def login():
         if not user or not user.check_password(data.get("password")):
             return jsonify({"error": "Invalid email or password"}), 401
 
+        # Upgrade hashes made with an older cost while the plaintext is at hand
+        if user.password_needs_rehash():
+            user.set_password(data.get("password"))
+            db.session.commit()
+
         access_token = create_access_token(identity=str(user.id))
 
         return jsonify({
             "token": access_token,
-            "user": {
-                "id": user.id,
-                "name": user.name,
-                "email": user.email,
-                "role": user.role,
-                "shop_name": getattr(user, 'shop_name', None),
-                "shop_address": getattr(user, 'shop_address', None)
-            }
+            "user": user_json(user)
         }), 200
     
     except Exception as e:
@@ -1,8 +1,15 @@
-from flask import Blueprint, request, jsonify, current_app, url_for
-from flask_jwt_extended import jwt_required, get_jwt_identity
-from werkzeug.utils import secure_filename
-import os
+from flask import Blueprint, request, jsonify, current_app
+from flask_jwt_extended import current_user, jwt_required, get_jwt_identity
+from sqlalchemy import tuple_
 from ..models import db, Flower, User
+from ..images import schedule_variants, store_upload
+from ..cache import bump_catalog_version, cached_catalog_response
+from ..pagination import InvalidPageRequest, cursor_values, decode_cursor, encode_cursor, parse_limit
+from ..replica import read_replica
+from ..search import apply_search, search_terms
+from ..serializers import (FLORIST_FLOWER_COLUMNS, FLOWER_CATALOG_COLUMNS, ImageUrls, catalog_flower_json,
+                           florist_flower_json, flower_detail_json)
+from ..users import invalidate_user
 
 flowers_bp = Blueprint("flowers", __name__)
 
@@ -11,6 +18,25 @@ ALLOWED_EXTENSIONS = {"png", "jpg", "jpeg", "gif"}
 def allowed_file(filename):
     return "." in filename and filename.rsplit(".", 1)[1].lower() in ALLOWED_EXTENSIONS
 
+SHOP_FIELDS = ("shop_name", "shop_address", "shop_contact")
+
+def _update_shop_details():
+    """Save shop fields sent with a flower form onto the florist; True if any were sent.
+
+    Every submitted field is written: current_user may be a stale cached
+    snapshot, so it can't tell what is already stored. The caller commits,
+    then calls invalidate_user() so the cached user sees the change.
+    """
+    changes = {field: request.form.get(field) for field in SHOP_FIELDS if request.form.get(field)}
+    if changes:
+        User.query.filter_by(id=current_user.id).update(changes, synchronize_session=False)
+    return bool(changes)
+
+def _save_image(file):
+    """Store an uploaded image under its content hash and return the stored filename."""
+    extension = file.filename.rsplit(".", 1)[1]
+    return store_upload(file, current_app.config["UPLOAD_FOLDER"], extension)
+
 # URL: POST /api/flowers
 @flowers_bp.route("", methods=["POST"])
 @jwt_required()
@@ -35,18 +61,11 @@ def add_flower():
         image_url = image_url or payload.get("image_url")
 
     saved_path = None
+    uploaded = None
 
     if file and allowed_file(file.filename):
-        filename = secure_filename(file.filename)
-        # Ensure directory exists
-        os.makedirs(current_app.config["UPLOAD_FOLDER"], exist_ok=True)
-        file.save(os.path.join(current_app.config["UPLOAD_FOLDER"], filename))
-        # Use absolute URL so frontend (hosted elsewhere) can load the image
-        try:
-            saved_path = url_for('static', filename=f'uploads/{filename}', _external=True)
-        except Exception:
-            # Fallback: construct using request.url_root
-            saved_path = request.url_root.rstrip('/') + f"/static/uploads/{filename}"
+        # Stored as a bare filename; responses turn it into an absolute URL
+        saved_path = uploaded = _save_image(file)
     elif image_url:
         saved_path = image_url
     else:
@@ -62,49 +81,147 @@ def add_flower():
     db.session.add(new_flower)
     
     # NEW: Update shop details for the florist
-    florist = User.query.get(florist_id)
-    if florist:
-        florist.shop_name = request.form.get("shop_name") or florist.shop_name
-        florist.shop_address = request.form.get("shop_address") or florist.shop_address
-        florist.shop_contact = request.form.get("shop_contact") or florist.shop_contact
+    shop_changed = _update_shop_details()
     
+    bump_catalog_version()
     db.session.commit()
+    if shop_changed:
+        invalidate_user(florist_id)
+    if uploaded:
+        schedule_variants(current_app._get_current_object(), uploaded)
     return jsonify({"message": "Flower added and shop updated", "id": new_flower.id}), 201
 
+def _catalog_query():
+    """Flower columns needed by the catalog plus the florist name, in one joined SELECT."""
+    return db.session.query(
+        *FLOWER_CATALOG_COLUMNS,
+        User.name.label("florist_name"),
+    ).outerjoin(User, User.id == Flower.florist_id)
+
+# Sort orders accepted by GET /api/flowers. Each one ends with Flower.id so the
+# keyset is unique, and every column in a key sorts in the same direction so
+# the cursor predicate is a single row-value comparison.
+CATALOG_SORTS = {
+    "newest": ("desc", (Flower.id,)),
+    "oldest": ("asc", (Flower.id,)),
+    "price_asc": ("asc", (Flower.price, Flower.id)),
+    "price_desc": ("desc", (Flower.price, Flower.id)),
+}
+
+def _parse_number(name, cast):
+    value = request.args.get(name)
+    if value in (None, ""):
+        return None
+    try:
+        return cast(value)
+    except ValueError:
+        raise InvalidPageRequest(f"{name} must be a number")
+
+def _filtered_catalog_query():
+    """Apply the price, florist and stock filters from the query string."""
+    query = _catalog_query()
+    min_price = _parse_number("min_price", float)
+    max_price = _parse_number("max_price", float)
+    florist_id = _parse_number("florist_id", int)
+    stock_status = request.args.get("stock_status")
+
+    if min_price is not None:
+        query = query.filter(Flower.price >= min_price)
+    if max_price is not None:
+        query = query.filter(Flower.price <= max_price)
+    if florist_id is not None:
+        query = query.filter(Flower.florist_id == florist_id)
+    if stock_status:
+        query = query.filter(Flower.stock_status == stock_status)
+    return query
+
+def _catalog_ordering(sort):
+    direction, columns = CATALOG_SORTS[sort]
+    return [c.desc() if direction == "desc" else c.asc() for c in columns]
+
+def _keyset_page(query, sort, cursor, limit):
+    """Return one page of ``query`` ordered by ``sort``, starting after ``cursor``."""
+    direction, columns = CATALOG_SORTS[sort]
+    cursor = cursor_values(cursor, [c.type.python_type for c in columns])
+    if cursor is not None:
+        key = tuple_(*columns) if len(columns) > 1 else columns[0]
+        last = tuple_(*cursor) if len(columns) > 1 else cursor[0]
+        query = query.filter(key < last if direction == "desc" else key > last)
+    # Fetch one extra row to learn whether another page exists
+    rows = query.order_by(*_catalog_ordering(sort)).limit(limit + 1).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(getattr(rows[-1], c.key) for c in columns)
+    return rows, next_cursor
+
 # URL: GET /api/flowers
+# Optional filters: min_price, max_price, florist_id, stock_status, sort.
+# Passing limit and/or cursor returns {"items", "next_cursor"} pages instead of
+# the legacy full array.
 @flowers_bp.route("", methods=["GET"])
+@read_replica
+@cached_catalog_response
 def get_flowers():
-    flowers = Flower.query.all()
-    return jsonify([{
-        "id": f.id,
-        "name": f.name,
-        "price": f.price,
-        "image_url": (f.image_url if (f.image_url and f.image_url.startswith('http')) else (request.url_root.rstrip('/') + f.image_url if f.image_url and f.image_url.startswith('/') else (request.url_root.rstrip('/') + '/static/uploads/' + f.image_url if f.image_url else None))),
-        "description": f.description,
-        "shop_name": User.query.get(f.florist_id).name if User.query.get(f.florist_id) else "Unknown",
-        "florist_id": f.florist_id  # NEW: Added for buyers to fetch shop details
-    } for f in flowers]), 200
+    images = ImageUrls()
+    paginated = "limit" in request.args or "cursor" in request.args
+    sort = request.args.get("sort") or ("newest" if paginated else "oldest")
+    if sort not in CATALOG_SORTS:
+        return jsonify({"error": f"sort must be one of {', '.join(CATALOG_SORTS)}"}), 400
+
+    try:
+        query = _filtered_catalog_query()
+        if not paginated:
+            rows = query.order_by(*_catalog_ordering(sort)).all()
+            return jsonify([catalog_flower_json(f, images) for f in rows]), 200
+
+        limit = parse_limit(request.args.get("limit"))
+        rows, next_cursor = _keyset_page(query, sort, decode_cursor(request.args.get("cursor")), limit)
+    except InvalidPageRequest as e:
+        return jsonify({"error": str(e)}), 400
+
+    return jsonify({
+        "items": [catalog_flower_json(f, images) for f in rows],
+        "next_cursor": next_cursor,
+        "limit": limit
+    }), 200
+
+# URL: GET /api/flowers/search?q=red ro&limit=20
+# Ranked full-text search over flower name, description and the florist's shop.
+# Every word is matched as a prefix, so it also serves typeahead.
+@flowers_bp.route("/search", methods=["GET"])
+@read_replica
+@cached_catalog_response
+def search_flowers():
+    terms = search_terms(request.args.get("q"))
+    if not terms:
+        return jsonify({"error": "Search query is required"}), 400
+    try:
+        limit = parse_limit(request.args.get("limit"), default=20, maximum=50)
+    except InvalidPageRequest as e:
+        return jsonify({"error": str(e)}), 400
+
+    query = apply_search(_catalog_query(), Flower.id, terms, db.engine.dialect.name, limit)
+    images = ImageUrls()
+    return jsonify({
+        "query": request.args.get("q"),
+        "items": [catalog_flower_json(f, images) for f in query.all()]
+    }), 200
 
 # NEW: URL: GET /api/flowers/<int:flower_id>
 # Allows buyers (and anyone) to view details of a specific flower, including the florist's uploaded image
 @flowers_bp.route("/<int:flower_id>", methods=["GET"])
+@read_replica
+@cached_catalog_response
 def get_flower(flower_id):
-    flower = Flower.query.get(flower_id)
+    flower = _catalog_query().filter(Flower.id == flower_id).first()
     if not flower:
         return jsonify({"error": "Flower not found"}), 404
     
-    # Construct image URL for buyers to see
-    image_url = (flower.image_url if (flower.image_url and flower.image_url.startswith('http')) else (request.url_root.rstrip('/') + flower.image_url if flower.image_url and flower.image_url.startswith('/') else (request.url_root.rstrip('/') + '/static/uploads/' + flower.image_url if flower.image_url else None)))
-    
-    return jsonify({
-        "id": flower.id,
-        "name": flower.name,
-        "price": flower.price,
-        "image_url": image_url,  # Buyers can now see the florist's image here
-        "description": flower.description,
-        "shop_name": User.query.get(flower.florist_id).name if User.query.get(flower.florist_id) else "Unknown",
-        "stock_status": getattr(flower, "stock_status", "in_stock")
-    }), 200
+    # Buyers see the florist's uploaded image here
+    response = jsonify(flower_detail_json(flower, ImageUrls()))
+    response.last_modified = flower.updated_at
+    return response, 200
 
 # URL: GET /api/flowers/florist/my-flowers
 # Returns flowers belonging to the authenticated florist
@@ -116,18 +233,11 @@ def get_my_flowers():
         return jsonify({"message": "OK"}), 200
 
     florist_id = get_jwt_identity()
-    my_flowers = Flower.query.filter_by(florist_id=florist_id).all()
-    result = []
-    for f in my_flowers:
-        result.append({
-            "id": f.id,
-            "name": f.name,
-            "price": f.price,
-            "image_url": (f.image_url if (f.image_url and f.image_url.startswith('http')) else (request.url_root.rstrip('/') + f.image_url if f.image_url and f.image_url.startswith('/') else (request.url_root.rstrip('/') + '/static/uploads/' + f.image_url if f.image_url else None))),
-            "description": f.description,
-            "stock_status": getattr(f, "stock_status", "in_stock")
-        })
-    return jsonify(result), 200
+    my_flowers = db.session.execute(
+        db.select(*FLORIST_FLOWER_COLUMNS).where(Flower.florist_id == florist_id).order_by(Flower.id)
+    ).all()
+    images = ImageUrls()
+    return jsonify([florist_flower_json(f, images) for f in my_flowers]), 200
 
 # URL: PUT /api/flowers/<id>
 # Update a flower (florist only)
@@ -147,6 +257,9 @@ def update_flower(flower_id):
     if flower.florist_id != int(florist_id):
         return jsonify({"error": "Unauthorized"}), 403
     
+    uploaded = None
+    shop_changed = False
+
     # Update fields from form/JSON
     if request.form:
         # Handle multipart/form-data (file upload)
@@ -162,20 +275,10 @@ def update_flower(flower_id):
         # Handle file upload
         file = request.files.get("image_file")
         if file and allowed_file(file.filename):
-            filename = secure_filename(file.filename)
-            os.makedirs(current_app.config["UPLOAD_FOLDER"], exist_ok=True)
-            file.save(os.path.join(current_app.config["UPLOAD_FOLDER"], filename))
-            try:
-                flower.image_url = url_for('static', filename=f'uploads/{filename}', _external=True)
-            except Exception:
-                flower.image_url = request.url_root.rstrip('/') + f"/static/uploads/{filename}"
+            flower.image_url = uploaded = _save_image(file)
         
         # NEW: Update shop details for the florist
-        florist = User.query.get(florist_id)
-        if florist:
-            florist.shop_name = request.form.get("shop_name") or florist.shop_name
-            florist.shop_address = request.form.get("shop_address") or florist.shop_address
-            florist.shop_contact = request.form.get("shop_contact") or florist.shop_contact
+        shop_changed = _update_shop_details()
     else:
         # Handle JSON request body
         data = request.get_json() or {}
@@ -188,7 +291,12 @@ def update_flower(flower_id):
         if data.get("stock_status"):
             flower.stock_status = data["stock_status"]
     
+    bump_catalog_version()
     db.session.commit()
+    if shop_changed:
+        invalidate_user(florist_id)
+    if uploaded:
+        schedule_variants(current_app._get_current_object(), uploaded)
     return jsonify({"message": "Flower and shop updated", "id": flower.id}), 200
 
 # URL: DELETE /api/flowers/<id>
@@ -210,5 +318,6 @@ def delete_flower(flower_id):
         return jsonify({"error": "Unauthorized"}), 403
     
     db.session.delete(flower)
+    bump_catalog_version()
     db.session.commit()
     return jsonify({"message": "Flower deleted"}), 200
\ No newline at end of file
@@ -1,8 +1,20 @@
-from flask import Blueprint, request, jsonify
-from flask_jwt_extended import jwt_required, get_jwt_identity
+import json
+import queue
+import time
+
+from flask import Blueprint, Response, current_app, request, jsonify
+from flask_jwt_extended import create_access_token, current_user, get_jwt, jwt_required, get_jwt_identity
+from datetime import datetime, timedelta
+from sqlalchemy import func, insert, select, tuple_
+from sqlalchemy.orm import load_only, selectinload
 # Use the db instance from your extensions/init file
 from .. import db 
+from ..events import events_scope, get_broker, order_event, order_snapshot, record_order_events
 from ..models import Order, OrderItem, Flower, User
+from ..pagination import InvalidPageRequest, cursor_values, decode_cursor, encode_cursor, parse_limit
+from ..replica import read_replica
+from ..serializers import (BUYER_ITEM_COLUMNS, BUYER_ORDER_COLUMNS, FLORIST_ITEM_COLUMNS, FLORIST_ORDER_COLUMNS,
+                           buyer_order_json, florist_order_json)
 
 orders_bp = Blueprint("orders", __name__, url_prefix="/api/orders")
 
@@ -20,23 +32,42 @@ def create_order():
     if not buyer_name or not buyer_phone or not delivery_address or not items:
         return jsonify({"error": "Missing required fields"}), 400
     
-    buyer = User.query.get(buyer_id)
-    if not buyer:
-        return jsonify({"error": "Buyer not found"}), 404
-    
-    total_price = 0
-    order_items_data = []
+    buyer = current_user
     
+    # Validate the cart shape before touching the database
+    cart = []
     for item in items:
-        flower_id = item.get("flower_id")
-        quantity = item.get("quantity", 1)
-        
-        flower = Flower.query.get(flower_id)
-        if not flower:
-            return jsonify({"error": f"Flower {flower_id} not found"}), 404
-        
-        total_price += (flower.price * quantity)
-        order_items_data.append({"flower": flower, "quantity": quantity})
+        try:
+            flower_id = int(item.get("flower_id"))
+            quantity = int(item.get("quantity", 1))
+        except (TypeError, ValueError):
+            return jsonify({"error": "Each item needs a numeric flower_id and quantity"}), 400
+        if quantity < 1:
+            return jsonify({"error": f"Invalid quantity for flower {flower_id}"}), 400
+        cart.append((flower_id, quantity))
+    
+    # Resolve every flower and its florist in one query, whatever the cart size
+    flower_ids = {flower_id for flower_id, _ in cart}
+    flowers = {
+        row.id: row for row in db.session.query(
+            Flower.id,
+            Flower.name,
+            Flower.price,
+            Flower.stock_status,
+            Flower.florist_id,
+            func.coalesce(User.shop_name, User.name).label("florist_name"),
+        ).join(User, User.id == Flower.florist_id).filter(Flower.id.in_(flower_ids))
+    }
+    
+    missing = sorted(flower_ids - flowers.keys())
+    if missing:
+        return jsonify({"error": f"Flower {', '.join(map(str, missing))} not found", "missing": missing}), 404
+    out_of_stock = sorted(fid for fid in flower_ids if flowers[fid].stock_status == "out_of_stock")
+    if out_of_stock:
+        names = ", ".join(flowers[fid].name for fid in out_of_stock)
+        return jsonify({"error": f"Out of stock: {names}", "out_of_stock": out_of_stock}), 409
+    
+    total_price = sum(flowers[flower_id].price * quantity for flower_id, quantity in cart)
     
     order = Order(
         buyer_id=buyer_id,
@@ -51,58 +82,134 @@ def create_order():
     db.session.add(order)
     db.session.flush() 
     
-    for item_data in order_items_data:
-        flower = item_data["flower"]
-        florist = User.query.get(flower.florist_id)
-        
-        order_item = OrderItem(
-            order_id=order.id,
-            flower_id=flower.id,
-            florist_id=flower.florist_id,
-            flower_name=flower.name,
-            florist_name=florist.shop_name or florist.name,
-            quantity=item_data["quantity"],
-            unit_price=flower.price
-        )
-        db.session.add(order_item)
+    # One executemany for all line items instead of an INSERT per item
+    db.session.execute(insert(OrderItem), [{
+        "order_id": order.id,
+        "flower_id": flower_id,
+        "florist_id": flowers[flower_id].florist_id,
+        "flower_name": flowers[flower_id].name,
+        "florist_name": flowers[flower_id].florist_name,
+        "quantity": quantity,
+        "unit_price": flowers[flower_id].price
+    } for flower_id, quantity in cart])
     
     db.session.commit()
     return jsonify({"message": "Order created!", "order_id": order.id}), 201
 
+def _decode_order_cursor(token):
+    """Cursor for newest-first order lists: the (created_at, id) of the last order seen."""
+    return cursor_values(decode_cursor(token), (datetime, int))
+
+def _order_page(query, cursor, limit):
+    """One newest-first keyset page of ``query``; returns (orders, next_cursor)."""
+    if cursor is not None:
+        query = query.filter(tuple_(Order.created_at, Order.id) < cursor)
+    orders = query.order_by(Order.created_at.desc(), Order.id.desc()).limit(limit + 1).all()
+    next_cursor = None
+    if len(orders) > limit:
+        orders = orders[:limit]
+        next_cursor = encode_cursor([orders[-1].created_at.isoformat(), orders[-1].id])
+    return orders, next_cursor
+
+# URL: GET /api/orders/buyer
+# Passing limit and/or cursor returns newest-first {"items", "next_cursor"} pages
+# instead of the legacy full array. Items are loaded with one select per page.
 @orders_bp.route("/buyer", methods=["GET"]) # Removed OPTIONS
 @jwt_required()
+@read_replica
 def get_buyer_orders():
-    buyer_id = get_jwt_identity()
-    orders = Order.query.filter_by(buyer_id=buyer_id).order_by(Order.created_at.desc()).all()
-    
-    return jsonify([{
-        "id": o.id,
-        "total_price": o.total_price,
-        "status": o.status,
-        "paid": o.paid,
-        "created_at": o.created_at.isoformat(),
-        "items": [{"flower_name": i.flower_name, "quantity": i.quantity} for i in o.items]
-    } for o in orders]), 200
+    buyer_id = int(get_jwt_identity())
+    query = Order.query.filter_by(buyer_id=buyer_id).options(
+        load_only(*BUYER_ORDER_COLUMNS), selectinload(Order.items).load_only(*BUYER_ITEM_COLUMNS)
+    )
+
+    if "limit" not in request.args and "cursor" not in request.args:
+        orders = query.order_by(Order.created_at.desc(), Order.id.desc()).all()
+        return jsonify([buyer_order_json(o) for o in orders]), 200
+
+    try:
+        limit = parse_limit(request.args.get("limit"), default=20)
+        orders, next_cursor = _order_page(query, _decode_order_cursor(request.args.get("cursor")), limit)
+    except InvalidPageRequest as e:
+        return jsonify({"error": str(e)}), 400
+
+    return jsonify({
+        "items": [buyer_order_json(o) for o in orders],
+        "next_cursor": next_cursor
+    }), 200
+
+ORDER_STATUSES = ("pending", "paid", "processing", "delivered", "failed")
+
+def _florist_orders_query(florist_id):
+    """Orders containing at least one item sold by this florist, with only those items eager-loaded."""
+    owns_item = select(OrderItem.id).where(
+        OrderItem.order_id == Order.id, OrderItem.florist_id == florist_id
+    ).exists()
+    return Order.query.filter(owns_item).options(
+        load_only(*FLORIST_ORDER_COLUMNS),
+        selectinload(Order.items.and_(OrderItem.florist_id == florist_id)).load_only(*FLORIST_ITEM_COLUMNS),
+    )
+
+def _parse_paid(value):
+    if value is None or value == "":
+        return None
+    if value.lower() in ("true", "1", "yes"):
+        return True
+    if value.lower() in ("false", "0", "no"):
+        return False
+    raise InvalidPageRequest("paid must be true or false")
 
 @orders_bp.route("/florist", methods=["GET"]) # Removed OPTIONS
 @jwt_required()
+@read_replica
 def get_florist_orders():
-    florist_id = get_jwt_identity()
-    
-    # Efficiently get orders belonging to this florist
-    orders = Order.query.join(OrderItem).filter(OrderItem.florist_id == florist_id).distinct().all()
-    
-    result = []
-    for order in orders:
-        florist_items = [i for i in order.items if i.florist_id == florist_id]
-        result.append({
-            "id": order.id,
-            "buyer_name": order.buyer_name,
-            "status": order.status,
-            "items": [{"flower_name": i.flower_name, "quantity": i.quantity} for i in florist_items]
-        })
-    
-    return jsonify(result), 200
+    florist_id = int(get_jwt_identity())
+    orders = _florist_orders_query(florist_id).order_by(Order.created_at.desc(), Order.id.desc()).all()
+    return jsonify([florist_order_json(order) for order in orders]), 200
+
+# URL: GET /api/orders/florist/inbox?status=pending&paid=true&limit=20&cursor=...
+# Newest-first page of the florist's orders plus per-status counts and sales totals for the dashboard tabs.
+@orders_bp.route("/florist/inbox", methods=["GET"])
+@jwt_required()
+@read_replica
+def get_florist_inbox():
+    florist_id = int(get_jwt_identity())
+    status = request.args.get("status")
+    try:
+        paid = _parse_paid(request.args.get("paid"))
+        limit = parse_limit(request.args.get("limit"), default=20)
+        cursor = _decode_order_cursor(request.args.get("cursor"))
+    except InvalidPageRequest as e:
+        return jsonify({"error": str(e)}), 400
+
+    # Per-status order counts and this florist's sales, in one grouped query.
+    # They ignore the status filter so every tab shows its own total.
+    summary = db.session.query(
+        Order.status,
+        func.count(func.distinct(OrderItem.order_id)),
+        func.sum(OrderItem.unit_price * OrderItem.quantity),
+    ).join(Order, Order.id == OrderItem.order_id).filter(OrderItem.florist_id == florist_id)
+    if paid is not None:
+        summary = summary.filter(Order.paid == paid)
+    counts = dict.fromkeys(ORDER_STATUSES, 0)
+    totals = dict.fromkeys(ORDER_STATUSES, 0)
+    for row_status, count, total in summary.group_by(Order.status):
+        counts[row_status] = count
+        totals[row_status] = total or 0
+
+    query = _florist_orders_query(florist_id)
+    if paid is not None:
+        query = query.filter(Order.paid == paid)
+    if status:
+        query = query.filter(Order.status == status)
+    orders, next_cursor = _order_page(query, cursor, limit)
+
+    return jsonify({
+        "items": [florist_order_json(order) for order in orders],
+        "next_cursor": next_cursor,
+        "counts": counts,
+        "totals": totals
+    }), 200
 
 @orders_bp.route("/<int:order_id>/status", methods=["PUT"]) # Removed OPTIONS
 @jwt_required()
@@ -120,5 +227,87 @@ def update_order_status(order_id):
         return jsonify({"error": "Unauthorized"}), 403
     
     order.status = data.get("status", "pending")
+    record_order_events([order_event(order)])
     db.session.commit()
-    return jsonify({"message": "Status updated", "status": order.status}), 200
\ No newline at end of file
+    return jsonify({"message": "Status updated", "status": order.status}), 200
+
+def _sse(event_id, payload):
+    return f"id: {event_id}\nevent: status\ndata: {json.dumps(payload)}\n\n"
+
+
+def _follow_order(order_id, user_id):
+    """(order, None) if the user is its buyer or one of its florists, else (None, error response)"""
+    order = Order.query.get(order_id)
+    if not order:
+        return None, (jsonify({"error": "Order not found"}), 404)
+    if order.buyer_id != user_id and not OrderItem.query.filter_by(order_id=order_id, florist_id=user_id).first():
+        return None, (jsonify({"error": "Unauthorized"}), 403)
+    return order, None
+
+
+# URL: POST /api/orders/<id>/events/token
+# EventSource cannot set headers, so the stream takes its token in the URL, where it ends up in
+# access logs. This issues one valid for ORDER_EVENTS_TOKEN_TTL seconds and for this stream only.
+@orders_bp.route("/<int:order_id>/events/token", methods=["POST"])
+@jwt_required()
+def order_events_token(order_id):
+    user_id = int(get_jwt_identity())
+    _, error = _follow_order(order_id, user_id)
+    if error:
+        return error
+    ttl = current_app.config.get("ORDER_EVENTS_TOKEN_TTL", 60)
+    token = create_access_token(identity=str(user_id), expires_delta=timedelta(seconds=ttl),
+                                additional_claims={"scope": events_scope(order_id)})
+    return jsonify({"token": token, "expires_in": ttl}), 200
+
+
+@orders_bp.route("/<int:order_id>/events", methods=["GET"])
+@jwt_required(locations=["query_string"])  # ?jwt=<token from POST .../events/token>
+def order_events(order_id):
+    """
+    Server-Sent Events stream of an order's status for its buyer or florists.
+
+    The first message is the current state; after that one message per
+    committed change (payment sent, paid/failed, florist status updates).
+    The stream ends after ORDER_EVENTS_STREAM_TIMEOUT seconds and the
+    browser reconnects, so sync workers are never held indefinitely.
+    """
+    if get_jwt().get("scope") != events_scope(order_id):
+        return jsonify({"error": "Use a stream token from POST /api/orders/<id>/events/token"}), 403
+    _, error = _follow_order(order_id, int(get_jwt_identity()))
+    if error:
+        return error
+
+    app = current_app._get_current_object()
+    broker = get_broker(app)
+    # Subscribe before reading the snapshot so nothing committed in between is lost
+    subscription = broker.subscribe(order_id)
+    try:
+        snapshot_id, snapshot = order_snapshot(order_id)
+    except Exception:
+        broker.unsubscribe(order_id, subscription)
+        raise
+
+    heartbeat = app.config.get("ORDER_EVENTS_HEARTBEAT", 15)
+    deadline = time.monotonic() + app.config.get("ORDER_EVENTS_STREAM_TIMEOUT", 300)
+
+    # Runs after the request context (and its DB session) is gone
+    def stream():
+        try:
+            yield "retry: 3000\n\n"
+            yield _sse(snapshot_id, snapshot)
+            while time.monotonic() < deadline:
+                try:
+                    event_id, payload = subscription.get(timeout=min(heartbeat, max(deadline - time.monotonic(), 0.01)))
+                except queue.Empty:
+                    yield ": keep-alive\n\n"  # also how a dropped client is noticed
+                    continue
+                if event_id > snapshot_id:
+                    yield _sse(event_id, payload)
+        finally:
+            broker.unsubscribe(order_id, subscription)
+
+    response = Response(stream(), mimetype="text/event-stream")
+    response.headers["Cache-Control"] = "no-cache"
+    response.headers["X-Accel-Buffering"] = "no"  # nginx: do not buffer the stream
+    return response
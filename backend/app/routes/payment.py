@@ -2,11 +2,14 @@
 Payment routes for handling M-Pesa Daraja integration
 """
 
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, current_app, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
+from sqlalchemy.exc import IntegrityError
 from app import db
-from app.models import Order, User
-from app.payment import daraja
+from app.models import Order, PaymentAttempt
+from app.payment_queue import (
+    IN_FLIGHT, enqueue_stk_push, get_dispatcher, in_flight_attempt, process_queued_pushes, settle_attempts,
+)
 
 payment_bp = Blueprint("payment", __name__, url_prefix="/api/payment")
 
@@ -15,7 +18,8 @@ def _get_order_for_buyer(order_id, buyer_id):
     order = Order.query.get(order_id)
     if not order:
         return None, (jsonify({"error": "Order not found"}), 404)
-    if order.buyer_id != buyer_id:
+    # JWT identities are strings, buyer_id is an integer column
+    if str(order.buyer_id) != str(buyer_id):
         return None, (jsonify({"error": "Unauthorized"}), 403)
     return order, None
 
@@ -35,25 +39,50 @@ def initialize_daraja_payment():
     if error:
         return error
 
-    buyer = User.query.get(buyer_id)
-    if not buyer:
-        return jsonify({"error": "Buyer not found"}), 404
-
-    result = daraja.trigger_stk_push(order.buyer_phone, order.total_price, order.id)
-
-    if not result.get("success"):
-        return jsonify({"error": result.get("error", "STK push failed")}), 500
-
-    order.payment_method = "mpesa"
-    order.pesapal_reference = result.get("CheckoutRequestID") or result.get("reference")
-    db.session.commit()
+    if order.paid:
+        return jsonify({"error": "Order is already paid"}), 400
+
+    # The STK push itself runs on a dispatcher (app/payment_queue.py) so a
+    # slow Daraja never holds this worker; a double submit reuses the job.
+    attempt = in_flight_attempt(order.id)
+    if not attempt:
+        try:
+            attempt = enqueue_stk_push(order)
+            db.session.commit()
+        except IntegrityError:
+            # A concurrent request queued one first (uq_payment_attempts_order_in_flight)
+            db.session.rollback()
+            attempt = in_flight_attempt(order.id)
+            if not attempt:
+                return jsonify({"error": "A payment for this order is already in progress"}), 409
+
+    app = current_app._get_current_object()
+    if app.config.get("PAYMENT_DISPATCH") == "inline":
+        process_queued_pushes(app, attempt_id=attempt.id)
+        db.session.refresh(attempt)
+        if attempt.status == "error":
+            return jsonify({"error": attempt.error or "STK push failed"}), 500
+        return jsonify({
+            "success": True,
+            "message": "STK Push initiated",
+            "attempt_id": attempt.id,
+            "status": attempt.status,
+            "checkout_request_id": attempt.checkout_request_id,
+            "order_id": order.id
+        }), 200
+
+    dispatcher = get_dispatcher(app)
+    if dispatcher:
+        dispatcher.notify()
 
     return jsonify({
         "success": True,
-        "message": result.get("CustomerMessage", "STK Push initiated"),
-        "checkout_request_id": result.get("CheckoutRequestID"),
+        "message": "Sending the M-Pesa prompt to your phone",
+        "attempt_id": attempt.id,
+        "status": attempt.status,
+        "checkout_request_id": attempt.checkout_request_id,
         "order_id": order.id
-    }), 200
+    }), 202
 
 
 @payment_bp.route("/daraja/check-status/<int:order_id>", methods=["GET"])
@@ -66,19 +95,77 @@ def check_daraja_status(order_id):
     if error:
         return error
 
+    # Progress of the latest STK push: queued -> sending -> pending -> succeeded/failed (or error)
+    attempt = (PaymentAttempt.query.filter_by(order_id=order.id)
+               .order_by(PaymentAttempt.id.desc()).first())
+    if attempt and attempt.status in IN_FLIGHT:
+        # Keeps jobs moving in processes that have not enqueued anything since a restart
+        get_dispatcher(current_app._get_current_object())
+
     return jsonify({
         "order_id": order.id,
         "paid": order.paid,
         "status": order.status,
         "payment_method": order.payment_method,
         "payment_reference": order.pesapal_reference,
+        "payment_attempt": attempt.to_dict() if attempt else None,
         "total_price": order.total_price
     }), 200
 
 
+def _callback_receipt(stk_callback):
+    """Pull MpesaReceiptNumber out of a successful callback's metadata"""
+    items = (stk_callback.get("CallbackMetadata") or {}).get("Item") or []
+    for item in items:
+        if item.get("Name") == "MpesaReceiptNumber":
+            return item.get("Value")
+    return None
+
+
+def _callback_response(attempt, order, duplicate):
+    return jsonify({
+        "success": True,
+        "duplicate": duplicate,
+        "result_code": attempt.result_code,
+        "result_desc": attempt.result_desc,
+        "order_id": attempt.order_id,
+        "status": order.status,
+    }), 200
+
+
+def _attempt_for_checkout(checkout_id):
+    """
+    Resolve the payment attempt a callback belongs to. Pushes made before
+    attempts were recorded only live on the order, so adopt those on first sight.
+    """
+    attempt = PaymentAttempt.query.filter_by(checkout_request_id=checkout_id).first()
+    if attempt:
+        return attempt
+
+    order = Order.query.filter_by(pesapal_reference=checkout_id).first()
+    if not order:
+        return None
+    attempt = PaymentAttempt(checkout_request_id=checkout_id, order_id=order.id, amount=order.total_price)
+    db.session.add(attempt)
+    try:
+        db.session.commit()
+    except IntegrityError:
+        # A concurrent delivery of the same callback adopted it first
+        db.session.rollback()
+        attempt = PaymentAttempt.query.filter_by(checkout_request_id=checkout_id).first()
+    return attempt
+
+
 @payment_bp.route("/daraja/callback", methods=["POST"])
 def daraja_callback():
-    """Handle M-Pesa Daraja callback (STK Push result)"""
+    """
+    Handle M-Pesa Daraja callback (STK Push result).
+
+    Daraja retries callbacks it considers undelivered, so the same result can
+    arrive many times. Only the first delivery for a CheckoutRequestID moves
+    the attempt out of "pending" and touches the order; later ones are
+    acknowledged from the attempt row without any writes.
+    """
     data = request.get_json() or {}
 
     body = data.get("Body") or {}
@@ -89,28 +176,31 @@ def daraja_callback():
     checkout_id = stk_callback.get("CheckoutRequestID")
     result_code = stk_callback.get("ResultCode")
     result_desc = stk_callback.get("ResultDesc")
+    if not checkout_id:
+        return jsonify({"error": "CheckoutRequestID is required"}), 400
 
-    order = Order.query.filter_by(pesapal_reference=checkout_id).first()
-    if not order:
+    attempt = _attempt_for_checkout(checkout_id)
+    if not attempt:
         return jsonify({"error": "Order not found for callback"}), 404
 
-    if result_code == 0:
-        order.paid = True
-        order.status = "paid"
-    else:
-        order.status = "failed"
+    if attempt.status != "pending":
+        return _callback_response(attempt, attempt.order, duplicate=True)
 
-    # keep latest payment reference and status
-    order.pesapal_reference = checkout_id
-    db.session.commit()
+    try:
+        result_code = int(result_code)
+    except (TypeError, ValueError):
+        return jsonify({"error": "Invalid ResultCode"}), 400
 
-    return jsonify({
-        "success": True,
+    # Of several deliveries racing in different workers, exactly one settles the attempt
+    settled = settle_attempts([{
+        "attempt_id": attempt.id,
+        "order_id": attempt.order_id,
         "result_code": result_code,
         "result_desc": result_desc,
-        "order_id": order.id,
-        "status": order.status
-    }), 200
+        "receipt": _callback_receipt(stk_callback),
+    }])
+    db.session.commit()
+    return _callback_response(attempt, attempt.order, duplicate=not settled)
 
 
 @payment_bp.route("/daraja/verify", methods=["POST"])
@@ -0,0 +1,66 @@
+"""
+Serving of uploaded flower photos.
+
+Content-addressed uploads (see app/images.py) never change, so they are sent
+with a one-year "immutable" Cache-Control and the digest as a strong ETag.
+Range and conditional requests are handled by werkzeug, and full-file
+responses go out through the WSGI file wrapper, which gunicorn turns into
+sendfile(2).
+
+UPLOAD_SERVE_MODE picks who moves the bytes:
+  - "direct"     : the app streams the file (default)
+  - "x-accel"    : nginx, via X-Accel-Redirect to UPLOAD_ACCEL_PREFIX
+  - "x-sendfile" : Apache/lighttpd, via X-Sendfile with the absolute path
+In the proxy modes a worker only stats the file and returns headers.
+"""
+import os
+
+from flask import Blueprint, current_app, jsonify, send_from_directory
+from werkzeug.security import safe_join
+
+from ..images import is_immutable
+
+uploads_bp = Blueprint("uploads", __name__, url_prefix="/uploads")
+
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+MUTABLE_MAX_AGE = 3600  # legacy uploads stored under client filenames can be overwritten
+
+
+def upload_url(url_root, filename):
+    """Public URL of a stored upload."""
+    return f"{url_root}/uploads/{filename}"
+
+
+@uploads_bp.route("/<path:filename>", methods=["GET"])
+def serve_upload(filename):
+    folder = current_app.config["UPLOAD_FOLDER"]
+    path = safe_join(folder, filename)
+    if path is None or not os.path.isfile(path):
+        return jsonify({"error": "Not found"}), 404
+
+    immutable = is_immutable(filename)
+    mode = current_app.config.get("UPLOAD_SERVE_MODE", "direct")
+
+    if mode in ("x-accel", "x-sendfile"):
+        response = current_app.response_class(mimetype=None)
+        if mode == "x-accel":
+            prefix = current_app.config.get("UPLOAD_ACCEL_PREFIX", "/protected-uploads").rstrip("/")
+            response.headers["X-Accel-Redirect"] = f"{prefix}/{filename}"
+        else:
+            response.headers["X-Sendfile"] = path
+        # Let the proxy pick Content-Type, Range and Last-Modified from the file
+        del response.headers["Content-Type"]
+    else:
+        response = send_from_directory(
+            folder,
+            filename,
+            conditional=True,
+            etag=filename.split(".", 1)[0] if immutable else True,
+            max_age=IMMUTABLE_MAX_AGE if immutable else MUTABLE_MAX_AGE,
+        )
+
+    response.cache_control.public = True
+    response.cache_control.max_age = IMMUTABLE_MAX_AGE if immutable else MUTABLE_MAX_AGE
+    if immutable:
+        response.cache_control.immutable = True
+    return response
@@ -0,0 +1,222 @@
+"""Full-text search over the flower catalog.
+
+The search index lives in a side table named ``flower_search`` and is kept in
+sync by database triggers, so every write path (routes, seed scripts, bulk
+inserts) updates it inside the same transaction:
+
+* SQLite (dev): an FTS5 virtual table keyed by ``rowid = flowers.id`` with
+  prefix indexes for typeahead, ranked with ``bm25``.
+* PostgreSQL (production): a ``tsvector`` column with a GIN index, ranked
+  with ``ts_rank``.
+
+Name matches weigh most, then the florist's shop name, then the description.
+Other databases have no index; search falls back to ``LIKE`` word-prefix
+matching over the same columns with the same weights.
+"""
+import re
+
+from sqlalchemy import Float, Integer, and_, case, column, func, literal, or_, select, table, text
+
+# Limit the number of terms so a pasted paragraph can't build a huge query
+MAX_QUERY_TERMS = 8
+
+SQLITE_DDL = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS flower_search USING fts5(
+        name, description, shop_name,
+        tokenize = 'unicode61 remove_diacritics 2',
+        prefix = '2 3'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS flower_search_ai AFTER INSERT ON flowers BEGIN
+        INSERT INTO flower_search (rowid, name, description, shop_name)
+        VALUES (new.id, new.name, new.description,
+                (SELECT coalesce(shop_name, name) FROM users WHERE id = new.florist_id));
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS flower_search_au AFTER UPDATE OF name, description, florist_id ON flowers BEGIN
+        DELETE FROM flower_search WHERE rowid = old.id;
+        INSERT INTO flower_search (rowid, name, description, shop_name)
+        VALUES (new.id, new.name, new.description,
+                (SELECT coalesce(shop_name, name) FROM users WHERE id = new.florist_id));
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS flower_search_ad AFTER DELETE ON flowers BEGIN
+        DELETE FROM flower_search WHERE rowid = old.id;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS flower_search_shop_au AFTER UPDATE OF shop_name, name ON users BEGIN
+        UPDATE flower_search SET shop_name = coalesce(new.shop_name, new.name)
+        WHERE rowid IN (SELECT id FROM flowers WHERE florist_id = new.id);
+    END
+    """,
+]
+
+SQLITE_REBUILD = """
+    INSERT INTO flower_search (rowid, name, description, shop_name)
+    SELECT f.id, f.name, f.description, coalesce(u.shop_name, u.name)
+    FROM flowers f LEFT JOIN users u ON u.id = f.florist_id
+"""
+
+POSTGRES_DDL = [
+    """
+    CREATE TABLE IF NOT EXISTS flower_search (
+        flower_id INTEGER PRIMARY KEY REFERENCES flowers (id) ON DELETE CASCADE,
+        document TSVECTOR NOT NULL
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS ix_flower_search_document ON flower_search USING GIN (document)",
+    """
+    CREATE OR REPLACE FUNCTION flower_search_document(flower_name TEXT, flower_description TEXT, shop TEXT)
+    RETURNS TSVECTOR AS $$
+        SELECT setweight(to_tsvector('simple', coalesce(flower_name, '')), 'A')
+            || setweight(to_tsvector('simple', coalesce(shop, '')), 'B')
+            || setweight(to_tsvector('simple', coalesce(flower_description, '')), 'C')
+    $$ LANGUAGE sql IMMUTABLE
+    """,
+    """
+    CREATE OR REPLACE FUNCTION flower_search_sync() RETURNS TRIGGER AS $$
+    BEGIN
+        INSERT INTO flower_search (flower_id, document)
+        VALUES (NEW.id, flower_search_document(
+            NEW.name, NEW.description,
+            (SELECT coalesce(shop_name, name) FROM users WHERE id = NEW.florist_id)))
+        ON CONFLICT (flower_id) DO UPDATE SET document = EXCLUDED.document;
+        RETURN NEW;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    "DROP TRIGGER IF EXISTS flower_search_sync ON flowers",
+    """
+    CREATE TRIGGER flower_search_sync AFTER INSERT OR UPDATE OF name, description, florist_id ON flowers
+    FOR EACH ROW EXECUTE FUNCTION flower_search_sync()
+    """,
+    """
+    CREATE OR REPLACE FUNCTION flower_search_shop_sync() RETURNS TRIGGER AS $$
+    BEGIN
+        UPDATE flower_search s
+        SET document = flower_search_document(f.name, f.description, coalesce(NEW.shop_name, NEW.name))
+        FROM flowers f
+        WHERE f.id = s.flower_id AND f.florist_id = NEW.id;
+        RETURN NEW;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    "DROP TRIGGER IF EXISTS flower_search_shop_sync ON users",
+    """
+    CREATE TRIGGER flower_search_shop_sync AFTER UPDATE OF shop_name, name ON users
+    FOR EACH ROW EXECUTE FUNCTION flower_search_shop_sync()
+    """,
+]
+
+POSTGRES_REBUILD = """
+    INSERT INTO flower_search (flower_id, document)
+    SELECT f.id, flower_search_document(f.name, f.description, coalesce(u.shop_name, u.name))
+    FROM flowers f LEFT JOIN users u ON u.id = f.florist_id
+    ON CONFLICT (flower_id) DO UPDATE SET document = EXCLUDED.document
+"""
+
+postgres_index = table("flower_search", column("flower_id"), column("document"))
+flowers = table("flowers", column("id"), column("name"), column("description"), column("florist_id"))
+users = table("users", column("id"), column("name"), column("shop_name"))
+
+def install_search_index(connection, rebuild=True):
+    """Create the search table and its sync triggers for this connection's dialect."""
+    dialect = connection.dialect.name
+    if dialect == "sqlite":
+        ddl, rebuild_sql = SQLITE_DDL, SQLITE_REBUILD
+    elif dialect == "postgresql":
+        ddl, rebuild_sql = POSTGRES_DDL, POSTGRES_REBUILD
+    else:
+        return
+    for statement in ddl:
+        connection.execute(text(statement))
+    if rebuild:
+        if dialect == "sqlite":
+            connection.execute(text("DELETE FROM flower_search"))
+        connection.execute(text(rebuild_sql))
+
+
+def drop_search_index(connection):
+    dialect = connection.dialect.name
+    if dialect == "sqlite":
+        for trigger in ("flower_search_ai", "flower_search_au", "flower_search_ad", "flower_search_shop_au"):
+            connection.execute(text(f"DROP TRIGGER IF EXISTS {trigger}"))
+    elif dialect == "postgresql":
+        connection.execute(text("DROP TRIGGER IF EXISTS flower_search_sync ON flowers"))
+        connection.execute(text("DROP TRIGGER IF EXISTS flower_search_shop_sync ON users"))
+        connection.execute(text("DROP FUNCTION IF EXISTS flower_search_shop_sync()"))
+        connection.execute(text("DROP FUNCTION IF EXISTS flower_search_sync()"))
+    else:
+        return
+    connection.execute(text("DROP TABLE IF EXISTS flower_search"))
+    if dialect == "postgresql":
+        connection.execute(text("DROP FUNCTION IF EXISTS flower_search_document(TEXT, TEXT, TEXT)"))
+
+
+def search_terms(query):
+    """Split free text into lowercase word terms, safe to embed in a match expression."""
+    return re.findall(r"\w+", (query or "").lower())[:MAX_QUERY_TERMS]
+
+
+def _top_matches(terms, dialect, limit):
+    """Subquery of ``(flower_id, score)`` for the best ``limit`` flowers matching every term as a word prefix.
+
+    Every hit is ranked inside the index query and only the winners are
+    joined back to flowers, so an old exact match outranks newer weak ones.
+    """
+    if dialect == "sqlite":
+        # Quote each term so FTS5 operators typed by users are taken literally
+        match = " ".join(f'"{t}"*' for t in terms)
+        return text(
+            "SELECT rowid AS flower_id, -bm25(flower_search, 10.0, 1.0, 4.0) AS score"
+            " FROM flower_search WHERE flower_search MATCH :match"
+            " ORDER BY score DESC, flower_id DESC LIMIT :limit"
+        ).bindparams(match=match, limit=limit).columns(
+            column("flower_id", Integer), column("score", Float)
+        ).subquery("matches")
+
+    if dialect == "postgresql":
+        tsquery = func.to_tsquery("simple", " & ".join(f"{t}:*" for t in terms))
+        score = func.ts_rank(postgres_index.c.document, tsquery).label("score")
+        return (select(postgres_index.c.flower_id, score)
+                .where(postgres_index.c.document.op("@@")(tsquery))
+                .order_by(score.desc(), postgres_index.c.flower_id.desc())
+                .limit(limit)
+                .subquery("matches"))
+
+    return _like_matches(terms, limit)
+
+
+def _word_prefix(field, term):
+    """``field`` has a word starting with ``term`` (terms are \\w+, so only ``_`` needs escaping)."""
+    pattern = term.replace("_", "\\_")
+    return or_(field.ilike(f"{pattern}%", escape="\\"), field.ilike(f"% {pattern}%", escape="\\"))
+
+
+def _like_matches(terms, limit):
+    """Unindexed fallback for databases without a search index; same weights as the FTS ranking."""
+    fields = ((flowers.c.name, 10.0), (func.coalesce(users.c.shop_name, users.c.name), 4.0),
+              (flowers.c.description, 1.0))
+    score = literal(0.0)
+    for term in terms:
+        for field, weight in fields:
+            score = score + case((_word_prefix(field, term), weight), else_=0.0)
+    score = score.label("score")
+    return (select(flowers.c.id.label("flower_id"), score)
+            .select_from(flowers.outerjoin(users, users.c.id == flowers.c.florist_id))
+            .where(and_(*(or_(*(_word_prefix(field, t) for field, _ in fields)) for t in terms)))
+            .order_by(score.desc(), flowers.c.id.desc())
+            .limit(limit)
+            .subquery("matches"))
+
+
+def apply_search(query, flower_id_column, terms, dialect, limit):
+    """Restrict ``query`` to the ``limit`` flowers best matching ``terms``, best first."""
+    matches = _top_matches(terms, dialect, limit)
+    return (query.join(matches, matches.c.flower_id == flower_id_column)
+                 .order_by(matches.c.score.desc(), flower_id_column.desc()))
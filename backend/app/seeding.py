@@ -0,0 +1,264 @@
+"""
+Synthetic data for development and benchmarks: ``flask seed``.
+
+Generates buyers, florists with shops, flowers, orders with their items and
+M-Pesa payment attempts, with the skew real traffic has: a few florists own
+most of the catalog, a few flowers get most of the orders, repeat buyers
+place many orders, and most orders have one or two items.
+
+Everything is drawn from one random.Random(--seed), and timestamps count
+back from midnight UTC of --until, so the same options produce the same
+rows. Rows are written with Core executemany inserts and explicit ids (so
+items can point at their order without reading ids back), committing every
+--batch-size orders. Ids continue from the largest id already in each
+table, so a second run adds to the data instead of colliding with it.
+
+Every generated user's password is "password123".
+"""
+import itertools
+import random
+import string
+import time
+from datetime import datetime, timedelta
+
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import func, select, text
+
+from . import db
+from .cache import bump_catalog_version
+from .models import Flower, Order, OrderItem, PaymentAttempt, User
+from .passwords import hash_password
+
+PASSWORD = "password123"
+
+FIRST_NAMES = ["Wanjiru", "Achieng", "Kamau", "Otieno", "Njeri", "Mwangi", "Akinyi", "Kiprop", "Wambui", "Omondi",
+               "Chebet", "Mutua", "Nyambura", "Wafula", "Atieno", "Kariuki", "Jepkosgei", "Ndungu", "Auma", "Kibet"]
+LAST_NAMES = ["Kimani", "Odhiambo", "Mwangi", "Ochieng", "Njoroge", "Wekesa", "Kiptoo", "Muthoni", "Onyango",
+              "Githinji", "Korir", "Maina", "Owino", "Nduta", "Rotich", "Waweru"]
+AREAS = ["Westlands", "Kilimani", "Karen", "Lavington", "Kileleshwa", "Parklands", "South B", "Langata",
+         "Runda", "Gigiri", "Upper Hill", "Ngong Road", "Kasarani", "Embakasi", "Ruaka", "Syokimau"]
+SHOP_WORDS = ["Blooms", "Petals", "Garden", "Florals", "Stems", "Bouquets", "Flower House", "Roses"]
+COLOURS = ["Red", "White", "Pink", "Yellow", "Purple", "Peach", "Blush", "Ivory", "Coral", "Lilac"]
+STEMS = ["Rose", "Lily", "Tulip", "Orchid", "Peony", "Sunflower", "Carnation", "Daisy", "Hydrangea", "Gerbera"]
+FORMS = ["Bouquet", "Basket", "Vase", "Bunch", "Box", "Wreath", "Posy", "Arrangement"]
+WORDS = ["fresh", "seasonal", "fragrant", "hand-tied", "garden", "long-stem", "luxury", "classic", "wedding",
+         "birthday", "anniversary", "sympathy", "valentine", "same-day", "delivery", "wrapped"]
+
+# Share of orders in each payment state
+PAYMENT_MIX = {"paid": 0.70, "failed": 0.10, "pending": 0.05, "unpaid": 0.15}
+# Where paid orders are in fulfilment
+PAID_STATUSES = (["paid", "processing", "delivered"], [2, 1, 5])
+QUANTITIES = ([1, 2, 3, 5], [70, 20, 7, 3])
+FAILURES = [(1032, "Request cancelled by user"), (1037, "DS timeout user cannot be reached"),
+            (1, "The balance is insufficient for the transaction")]
+RECEIPT_CHARS = string.ascii_uppercase + string.digits
+
+
+def _zipf_weights(count, exponent):
+    """Cumulative weights ranking item i at 1 / (i + 1) ** exponent"""
+    return list(itertools.accumulate(1 / (rank + 1) ** exponent for rank in range(count)))
+
+
+def _next_id(model):
+    return (db.session.execute(select(func.max(model.id))).scalar() or 0) + 1
+
+
+def _insert(model, rows):
+    if rows:
+        db.session.execute(model.__table__.insert(), rows)
+
+
+def _sync_sequences(models):
+    """Explicit ids leave PostgreSQL sequences behind; move them past the new rows"""
+    if db.engine.dialect.name != "postgresql":
+        return
+    for model in models:
+        table = model.__tablename__
+        db.session.execute(text(
+            f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), (SELECT max(id) FROM {table}))"
+        ))
+
+
+def generate(buyers, florists, flowers, orders, max_items=8, seed=42, batch_size=5000, days=180, until=None,
+             progress=None):
+    """Insert the requested volumes; returns row counts per table"""
+    rng = random.Random(seed)
+    end = datetime.combine(until or datetime.utcnow().date(), datetime.min.time())
+    start = end - timedelta(days=days)
+    password_hash = hash_password(PASSWORD)  # one hash for everyone: hashing a million would take hours
+    counts = {"users": 0, "flowers": 0, "orders": 0, "order_items": 0, "payment_attempts": 0}
+
+    def _when():
+        return start + timedelta(seconds=rng.uniform(0, days * 86400))
+
+    # Users: florists first, then buyers
+    first_user = _next_id(User)
+    florist_ids = list(range(first_user, first_user + florists))
+    buyer_ids = list(range(first_user + florists, first_user + florists + buyers))
+    shop_names = {}
+    users = []
+    for user_id in florist_ids:
+        name = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+        shop_names[user_id] = f"{name.split()[0]}'s {rng.choice(SHOP_WORDS)}"
+        users.append({
+            "id": user_id, "name": name, "email": f"florist{user_id}@seed.local", "password_hash": password_hash,
+            "role": "florist", "shop_name": shop_names[user_id],
+            "shop_address": f"{rng.randint(1, 400)} {rng.choice(AREAS)} Road, Nairobi",
+            "shop_contact": f"+2547{rng.randint(0, 99999999):08d}", "created_at": _when(),
+        })
+    buyer_names = {}
+    for user_id in buyer_ids:
+        buyer_names[user_id] = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+        users.append({
+            "id": user_id, "name": buyer_names[user_id], "email": f"buyer{user_id}@seed.local",
+            "password_hash": password_hash, "role": "buyer", "shop_name": None, "shop_address": None,
+            "shop_contact": None, "created_at": _when(),
+        })
+    for offset in range(0, len(users), batch_size):
+        _insert(User, users[offset:offset + batch_size])
+    db.session.commit()
+    counts["users"] = len(users)
+    del users
+
+    # Flowers: a few florists own most of the catalog; ~10% are sold out
+    first_flower = _next_id(Flower)
+    flower_ids = list(range(first_flower, first_flower + flowers))
+    flower_names, flower_prices, flower_florists = [], [], []
+    if florists:
+        florist_weights = _zipf_weights(florists, 0.8)
+        batch = []
+        for flower_id in flower_ids:
+            florist_id = rng.choices(florist_ids, cum_weights=florist_weights)[0]
+            name = f"{rng.choice(COLOURS)} {rng.choice(STEMS)} {rng.choice(FORMS)}"
+            price = float(rng.randrange(500, 15000, 50))
+            created_at = _when()
+            flower_names.append(name)
+            flower_prices.append(price)
+            flower_florists.append(florist_id)
+            batch.append({
+                "id": flower_id, "name": name, "price": price, "florist_id": florist_id,
+                "description": " ".join(rng.choice(WORDS) for _ in range(rng.randint(6, 14))),
+                "stock_status": "out_of_stock" if rng.random() < 0.1 else "in_stock",
+                "created_at": created_at, "updated_at": created_at,
+            })
+            if len(batch) == batch_size:
+                _insert(Flower, batch)
+                batch = []
+        _insert(Flower, batch)
+        bump_catalog_version()
+        db.session.commit()
+        counts["flowers"] = flowers
+
+    # Orders: repeat buyers and best sellers are Zipf-distributed, item counts fall off as 1/k²
+    if not (buyers and flowers and orders):
+        _sync_sequences([User, Flower])
+        db.session.commit()
+        return counts
+    buyer_weights = _zipf_weights(buyers, 1.0)
+    flower_weights = _zipf_weights(flowers, 1.1)
+    flower_positions = range(flowers)
+    item_counts = range(1, max_items + 1)
+    item_count_weights = _zipf_weights(max_items, 2.0)
+    states = list(PAYMENT_MIX)
+    state_weights = list(itertools.accumulate(PAYMENT_MIX.values()))
+    first_order, first_item, first_attempt = _next_id(Order), _next_id(OrderItem), _next_id(PaymentAttempt)
+    item_id, attempt_id = first_item, first_attempt
+    step = days * 86400 / orders
+
+    for chunk_start in range(0, orders, batch_size):
+        order_rows, item_rows, attempt_rows = [], [], []
+        for index in range(chunk_start, min(chunk_start + batch_size, orders)):
+            order_id = first_order + index
+            buyer_id = rng.choices(buyer_ids, cum_weights=buyer_weights)[0]
+            # Ids grow with time, as they do in production
+            created_at = start + timedelta(seconds=(index + rng.random()) * step)
+            count = rng.choices(item_counts, cum_weights=item_count_weights)[0]
+            picked = set(rng.choices(flower_positions, cum_weights=flower_weights, k=count))
+            total = 0.0
+            for position in sorted(picked):
+                quantity = rng.choices(*QUANTITIES)[0]
+                price = flower_prices[position]
+                total += price * quantity
+                florist_id = flower_florists[position]
+                item_rows.append({
+                    "id": item_id, "order_id": order_id, "flower_id": flower_ids[position],
+                    "florist_id": florist_id, "flower_name": flower_names[position],
+                    "florist_name": shop_names[florist_id], "quantity": quantity, "unit_price": price,
+                    "created_at": created_at,
+                })
+                item_id += 1
+
+            state = rng.choices(states, cum_weights=state_weights)[0]
+            status, paid, reference = "pending", False, None
+            if state != "unpaid":
+                reference = f"ws_CO_{seed}_{order_id:010d}"
+                sent_at = created_at + timedelta(seconds=rng.uniform(1, 30))
+                attempt = {
+                    "id": attempt_id, "checkout_request_id": reference, "order_id": order_id, "amount": total,
+                    "status": "pending", "result_code": None, "result_desc": None, "mpesa_receipt": None,
+                    "tries": 1, "created_at": sent_at, "completed_at": None,
+                }
+                if state == "paid":
+                    status, paid = rng.choices(*PAID_STATUSES)[0], True
+                    attempt.update(status="succeeded", result_code=0,
+                                   result_desc="The service request is processed successfully.",
+                                   mpesa_receipt="".join(rng.choices(RECEIPT_CHARS, k=10)),
+                                   completed_at=sent_at + timedelta(seconds=rng.uniform(5, 60)))
+                elif state == "failed":
+                    code, desc = rng.choice(FAILURES)
+                    attempt.update(status="failed", result_code=code, result_desc=desc,
+                                   completed_at=sent_at + timedelta(seconds=rng.uniform(5, 60)))
+                attempt_rows.append(attempt)
+                attempt_id += 1
+
+            order_rows.append({
+                "id": order_id, "buyer_id": buyer_id, "buyer_name": buyer_names[buyer_id],
+                "buyer_email": f"buyer{buyer_id}@seed.local", "buyer_phone": f"07{rng.randint(0, 99999999):08d}",
+                "delivery_address": f"{rng.randint(1, 400)} {rng.choice(AREAS)}, Nairobi",
+                "total_price": total, "status": status, "paid": paid, "payment_method": "mpesa",
+                "pesapal_reference": reference, "created_at": created_at,
+                "updated_at": created_at + timedelta(minutes=rng.randint(0, 600)) if paid else created_at,
+            })
+
+        _insert(Order, order_rows)
+        _insert(OrderItem, item_rows)
+        _insert(PaymentAttempt, attempt_rows)
+        db.session.commit()
+        counts["orders"] += len(order_rows)
+        counts["order_items"] += len(item_rows)
+        counts["payment_attempts"] += len(attempt_rows)
+        if progress:
+            progress(counts)
+
+    _sync_sequences([User, Flower, Order, OrderItem, PaymentAttempt])
+    db.session.commit()
+    return counts
+
+
+@click.command("seed")
+@click.option("--buyers", type=int, default=1000, show_default=True)
+@click.option("--florists", type=int, default=50, show_default=True)
+@click.option("--flowers", type=int, default=2000, show_default=True)
+@click.option("--orders", type=int, default=10000, show_default=True)
+@click.option("--max-items", type=int, default=8, show_default=True, help="Most items in one order.")
+@click.option("--seed", "seed", type=int, default=42, show_default=True, help="Same seed, same data.")
+@click.option("--batch-size", type=int, default=5000, show_default=True, help="Orders per transaction.")
+@click.option("--days", type=int, default=180, show_default=True, help="Spread orders over this many days.")
+@click.option("--until", type=click.DateTime(["%Y-%m-%d"]), default=None,
+              help="Last day of the spread (default: today, UTC).")
+@with_appcontext
+def seed_command(buyers, florists, flowers, orders, max_items, seed, batch_size, days, until):
+    """Generate synthetic users, flowers, orders and payments (run migrations first)."""
+    started = time.perf_counter()
+
+    def _progress(counts):
+        click.echo(f"  {counts['orders']}/{orders} orders, {counts['order_items']} items "
+                   f"({time.perf_counter() - started:.0f}s)")
+
+    counts = generate(buyers, florists, flowers, orders, max_items=max_items, seed=seed, batch_size=batch_size,
+                      days=days, until=until.date() if until else None,
+                      progress=_progress if orders > batch_size else None)
+    click.echo(", ".join(f"{table} {count}" for table, count in counts.items())
+               + f" in {time.perf_counter() - started:.1f}s")
+    click.echo(f"Every generated user's password is {PASSWORD!r}")
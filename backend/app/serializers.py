@@ -0,0 +1,151 @@
+"""
+Response serializers, one set per model, shared by every route returning it.
+
+Each serializer reads only the attributes listed in its column tuple, so a
+route selects those columns (or load_only()s them) instead of whole rows.
+Flower image references become URLs through an ImageUrls resolver the route
+creates once per request: the URL root is read once and each distinct image
+is resolved, including the variant check on disk, once per response.
+"""
+from flask import current_app, request
+
+from .images import IMAGE_VARIANTS, variant_filename, variants_ready
+from .models import Flower, Order, OrderItem
+from .routes.uploads import upload_url
+
+
+class ImageUrls:
+    """Memoized (image_url, image_variants) for stored image references"""
+
+    __slots__ = ("url_root", "upload_folder", "_resolved")
+
+    def __init__(self, url_root=None, upload_folder=None):
+        self.url_root = (request.url_root if url_root is None else url_root).rstrip("/")
+        self.upload_folder = upload_folder or current_app.config["UPLOAD_FOLDER"]
+        self._resolved = {}
+
+    def __call__(self, image_url):
+        resolved = self._resolved.get(image_url)
+        if resolved is None:
+            resolved = self._resolved[image_url] = (self._absolute(image_url), self._variants(image_url))
+        return resolved
+
+    def _absolute(self, image_url):
+        """Turn a stored image reference into a URL the frontend can load."""
+        if not image_url:
+            return None
+        if image_url.startswith("http"):
+            return image_url
+        if image_url.startswith("/"):
+            return self.url_root + image_url
+        return upload_url(self.url_root, image_url)
+
+    def _variants(self, image_url):
+        """Resized variant URLs for an uploaded image, or None until they have been generated."""
+        if not variants_ready(image_url, self.upload_folder):
+            return None
+        return {name: upload_url(self.url_root, variant_filename(image_url, name)) for name in IMAGE_VARIANTS}
+
+
+# Flowers. Catalog rows carry the florist's name, joined in as florist_name.
+FLOWER_CATALOG_COLUMNS = (Flower.id, Flower.name, Flower.price, Flower.image_url, Flower.description,
+                          Flower.stock_status, Flower.florist_id, Flower.updated_at)
+FLORIST_FLOWER_COLUMNS = (Flower.id, Flower.name, Flower.price, Flower.image_url, Flower.description,
+                          Flower.stock_status)
+
+
+def catalog_flower_json(f, images):
+    image_url, variants = images(f.image_url)
+    return {
+        "id": f.id,
+        "name": f.name,
+        "price": f.price,
+        "image_url": image_url,
+        "image_variants": variants,
+        "description": f.description,
+        "shop_name": f.florist_name or "Unknown",
+        "florist_id": f.florist_id,  # lets buyers fetch the shop details
+    }
+
+
+def flower_detail_json(f, images):
+    image_url, variants = images(f.image_url)
+    return {
+        "id": f.id,
+        "name": f.name,
+        "price": f.price,
+        "image_url": image_url,
+        "image_variants": variants,
+        "description": f.description,
+        "shop_name": f.florist_name or "Unknown",
+        "stock_status": f.stock_status,
+    }
+
+
+def florist_flower_json(f, images):
+    image_url, variants = images(f.image_url)
+    return {
+        "id": f.id,
+        "name": f.name,
+        "price": f.price,
+        "image_url": image_url,
+        "image_variants": variants,
+        "description": f.description,
+        "stock_status": f.stock_status,
+    }
+
+
+# Orders and their items, for load_only() / selectinload(...).load_only()
+BUYER_ORDER_COLUMNS = (Order.total_price, Order.status, Order.paid, Order.created_at)
+BUYER_ITEM_COLUMNS = (OrderItem.order_id, OrderItem.flower_name, OrderItem.quantity)
+FLORIST_ORDER_COLUMNS = (Order.buyer_name, Order.buyer_phone, Order.delivery_address, Order.status, Order.paid,
+                         Order.created_at, Order.total_price)
+FLORIST_ITEM_COLUMNS = (OrderItem.order_id, OrderItem.flower_name, OrderItem.quantity, OrderItem.unit_price)
+
+
+def buyer_item_json(i):
+    return {"flower_name": i.flower_name, "quantity": i.quantity}
+
+
+def florist_item_json(i):
+    return {"flower_name": i.flower_name, "quantity": i.quantity, "unit_price": i.unit_price}
+
+
+def buyer_order_json(o):
+    return {
+        "id": o.id,
+        "total_price": o.total_price,
+        "status": o.status,
+        "paid": o.paid,
+        "created_at": o.created_at.isoformat(),
+        "items": [buyer_item_json(i) for i in o.items],
+    }
+
+
+def florist_order_json(o):
+    """An order as one florist sees it: only their items (the query filters them) and their share"""
+    items = o.items
+    return {
+        "id": o.id,
+        "buyer_name": o.buyer_name,
+        "buyer_phone": o.buyer_phone,
+        "delivery_address": o.delivery_address,
+        "status": o.status,
+        "paid": o.paid,
+        "created_at": o.created_at.isoformat() if o.created_at else None,
+        "total_price": o.total_price,
+        "florist_total": sum(i.unit_price * i.quantity for i in items),
+        "items": [florist_item_json(i) for i in items],
+    }
+
+
+# Users: a User row or the CachedUser behind a request's JWT
+def user_json(u):
+    return {
+        "id": u.id,
+        "name": u.name,
+        "email": u.email,
+        "role": u.role,
+        "shop_name": u.shop_name,
+        "shop_address": u.shop_address,
+    }
@@ -0,0 +1,117 @@
+"""
+The authenticated user behind a JWT, loaded once per request.
+
+The loader registered on the JWTManager runs when @jwt_required verifies a
+token, and flask-jwt-extended keeps its result for the rest of the request,
+so routes read ``current_user`` instead of querying User themselves.
+
+Loaded users are also kept for USER_CACHE_TTL seconds in a bounded
+per-process cache, so a buyer clicking through the site costs one User
+lookup per worker per TTL rather than one or more per request. Entries are
+read-only snapshots (CachedUser), not ORM objects, because they are shared
+between requests and threads. Code that changes a user's cached fields
+calls invalidate_user() after committing. That clears this process's copy
+only; other workers pick up the change when their entry expires, so keep
+the TTL short.
+"""
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+from flask import current_app, jsonify, request
+
+from . import db
+from .models import User
+
+CachedUser = namedtuple("CachedUser", "id name email role shop_name shop_address shop_contact")
+
+
+class UserCache:
+    """Bounded LRU of CachedUser snapshots that expire ``ttl`` seconds after loading"""
+
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # user id -> (expires at, CachedUser)
+        self._lock = threading.Lock()
+
+    def get(self, user_id):
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None:
+                return None
+            if entry[0] <= time.monotonic():
+                del self._entries[user_id]
+                return None
+            self._entries.move_to_end(user_id)
+            return entry[1]
+
+    def put(self, user, ttl):
+        with self._lock:
+            self._entries[user.id] = (time.monotonic() + ttl, user)
+            self._entries.move_to_end(user.id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+user_cache = UserCache()
+
+
+def load_user(user_id):
+    """CachedUser for ``user_id``, from the cache or one primary-key lookup; None if it does not exist"""
+    try:
+        user_id = int(user_id)
+    except (TypeError, ValueError):
+        return None
+    ttl = current_app.config.get("USER_CACHE_TTL", 30)
+    if ttl > 0:
+        cached = user_cache.get(user_id)
+        if cached is not None:
+            return cached
+
+    row = db.session.execute(
+        db.select(User.id, User.name, User.email, User.role, User.shop_name, User.shop_address, User.shop_contact)
+        .where(User.id == user_id)
+    ).first()
+    if row is None:
+        return None
+    user = CachedUser(*row)
+    if ttl > 0:
+        user_cache.max_entries = current_app.config.get("USER_CACHE_SIZE", 1024)
+        user_cache.put(user, ttl)
+    return user
+
+
+def invalidate_user(user_id):
+    user_cache.invalidate(int(user_id))
+
+
+def init_user_loader(jwt):
+    @jwt.user_lookup_loader
+    def _user_lookup(_jwt_header, jwt_data):
+        return load_user(jwt_data["sub"])
+
+    @jwt.user_lookup_error_loader
+    def _user_lookup_error(_jwt_header, _jwt_data):
+        # A valid token for an account that no longer exists
+        return jsonify({"error": "User not found"}), 401
+
+    @jwt.token_verification_loader
+    def _scope_allows_request(_jwt_header, jwt_data):
+        # Scoped tokens (order event streams, see routes/orders.py) open only the stream they name
+        scope = jwt_data.get("scope")
+        if scope is None:
+            return True
+        from .events import events_scope
+        return request.endpoint == "orders.order_events" and scope == events_scope(request.view_args["order_id"])
+
+    @jwt.token_verification_failed_loader
+    def _scope_mismatch(_jwt_header, _jwt_data):
+        return jsonify({"error": "Token not valid for this request"}), 403
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Benchmark: GET /api/flowers keyset pagination vs. page depth.
+
+Seeds a throwaway SQLite database with 100k flowers and times the catalog
+endpoint at increasing page depths, next to the equivalent OFFSET query.
+Keyset pages should stay flat; OFFSET grows with depth.
+
+Usage: python benchmarks/catalog_pagination.py [--flowers 100000] [--repeat 20]
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from sqlalchemy import insert
+
+from app import create_app, db
+from app.models import Flower, User
+from app.pagination import encode_cursor
+
+
+def seed(flower_count, florist_count=200):
+    db.session.execute(insert(User), [
+        {"name": f"Florist {i}", "email": f"florist{i}@bench.local", "password_hash": "x",
+         "role": "florist", "shop_name": f"Shop {i}"}
+        for i in range(florist_count)
+    ])
+    batch = []
+    for i in range(flower_count):
+        batch.append({
+            "name": f"Bouquet {i}",
+            "price": float(100 + (i * 37) % 5000),
+            "description": "Seasonal stems",
+            "image_url": f"bouquet_{i}.jpg",
+            "stock_status": "in_stock" if i % 7 else "out_of_stock",
+            "florist_id": 1 + i % florist_count,
+        })
+        if len(batch) == 10000:
+            db.session.execute(insert(Flower), batch)
+            batch = []
+    if batch:
+        db.session.execute(insert(Flower), batch)
+    db.session.commit()
+
+
+def timed(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--flowers", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--limit", type=int, default=24)
+    args = parser.parse_args()
+
+    tmpdir = tempfile.mkdtemp()
+    app = create_app({
+        "SQLALCHEMY_DATABASE_URI": f"sqlite:///{os.path.join(tmpdir, 'bench.db')}",
+        "CATALOG_CACHE_ENABLED": False,  # measure the query path, not cache hits
+    })
+    client = app.test_client()
+
+    with app.app_context():
+        db.create_all()
+        print(f"🌸 Seeding {args.flowers:,} flowers...")
+        seed(args.flowers)
+
+        depths = [0, 100, 1_000, 10_000, 50_000, args.flowers - args.limit * 2]
+        print(f"\n{'sort':<11}{'row offset':>12}{'keyset ms':>12}{'OFFSET ms':>12}")
+        for sort, order in (("newest", [Flower.id.desc()]), ("price_asc", [Flower.price, Flower.id])):
+            for depth in depths:
+                cursor = ""
+                if depth:
+                    last = (db.session.query(Flower.price, Flower.id)
+                            .order_by(*order).offset(depth - 1).limit(1).one())
+                    cursor = encode_cursor([last.id] if sort == "newest" else [last.price, last.id])
+
+                url = f"/api/flowers?sort={sort}&limit={args.limit}&cursor={cursor}"
+                keyset_ms = timed(lambda: client.get(url), args.repeat)
+                offset_ms = timed(
+                    lambda: db.session.query(Flower).order_by(*order).offset(depth).limit(args.limit).all(),
+                    args.repeat,
+                )
+                print(f"{sort:<11}{depth:>12,}{keyset_ms:>12.2f}{offset_ms:>12.2f}")
+
+
+if __name__ == "__main__":
+    main()
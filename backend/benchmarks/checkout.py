@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Benchmark: POST /api/orders/create latency and query count against cart size.
+
+Every cart spreads its items over many florists, the worst case for the old
+per-item Flower/User lookups. With batched resolution the query count should
+stay flat and latency grow only with the rows written.
+
+Usage: python benchmarks/checkout.py [--repeat 20]
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from flask_jwt_extended import create_access_token
+from sqlalchemy import event, insert
+
+from app import create_app, db
+from app.models import Flower, User
+
+CART_SIZES = [1, 5, 20, 50, 100, 250]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    tmpdir = tempfile.mkdtemp()
+    app = create_app({"SQLALCHEMY_DATABASE_URI": f"sqlite:///{os.path.join(tmpdir, 'bench.db')}"})
+    client = app.test_client()
+
+    with app.app_context():
+        db.create_all()
+        florist_count = max(CART_SIZES)
+        db.session.execute(insert(User), [
+            {"name": f"Florist {i}", "email": f"florist{i}@bench.local", "password_hash": "x",
+             "role": "florist", "shop_name": f"Shop {i}"}
+            for i in range(florist_count)
+        ] + [{"name": "Buyer", "email": "buyer@bench.local", "password_hash": "x", "role": "buyer"}])
+        db.session.execute(insert(Flower), [
+            {"name": f"Bouquet {i}", "price": 1000.0, "stock_status": "in_stock", "florist_id": 1 + i}
+            for i in range(florist_count)
+        ])
+        db.session.commit()
+        buyer_id = florist_count + 1
+        headers = {"Authorization": f"Bearer {create_access_token(identity=str(buyer_id))}"}
+
+        statements = []
+        event.listen(db.engine, "before_cursor_execute", lambda *a: statements.append(a[2]))
+
+        print(f"{'cart items':>10}{'queries':>9}{'p50 ms':>9}{'p95 ms':>9}")
+        for size in CART_SIZES:
+            payload = {
+                "buyer_name": "Buyer", "buyer_phone": "0712345678", "delivery_address": "Nairobi",
+                "items": [{"flower_id": i + 1, "quantity": 1 + i % 3} for i in range(size)],
+            }
+            samples = []
+            for _ in range(args.repeat):
+                statements.clear()
+                start = time.perf_counter()
+                response = client.post("/api/orders/create", json=payload, headers=headers)
+                samples.append((time.perf_counter() - start) * 1000)
+                assert response.status_code == 201, response.get_json()
+            samples.sort()
+            print(f"{size:>10}{len(statements):>9}{statistics.median(samples):>9.2f}"
+                  f"{samples[int(len(samples) * 0.95) - 1]:>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Benchmark: bytes on the wire and CPU per request, by Content-Encoding.
+
+Requests the catalog (GET /api/flowers) and a buyer's order history
+(GET /api/orders/buyer) through the test client with no Accept-Encoding,
+gzip and brotli, and reports the body size and the median process CPU time
+per request. The catalog is measured twice: served from the cache's
+precompressed copies (CATALOG_CACHE_COMPRESS on, the default) and
+compressed per request by the after_request hook (off). Order history is
+always compressed per request.
+
+CPU time covers the whole request (routing, query, serialization and
+compression), so the difference to the identity row is what compression
+costs.
+
+Usage: python benchmarks/compression.py [--rows 5000] [--repeat 20]
+"""
+import argparse
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from flask_jwt_extended import create_access_token
+
+from app import compression, create_app, db
+from app.models import User
+from app.seeding import generate
+
+ENCODINGS = [("identity", None), ("gzip", "gzip")] + ([("br", "br")] if compression.brotli else [])
+
+
+def measure(client, path, headers, repeat):
+    """(bytes, median CPU ms) for ``repeat`` requests"""
+    client.get(path, headers=headers)  # warm the caches
+    cpu_ms, size = [], 0
+    for _ in range(repeat):
+        started = time.process_time()
+        size = len(client.get(path, headers=headers).get_data())
+        cpu_ms.append((time.process_time() - started) * 1000)
+    return size, statistics.median(cpu_ms)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    tmpdir = tempfile.mkdtemp()
+    app = create_app({"SQLALCHEMY_DATABASE_URI": f"sqlite:///{os.path.join(tmpdir, 'bench.db')}",
+                      "UPLOAD_FOLDER": os.path.join(tmpdir, "uploads"), "SQL_PROFILE_ENABLED": False})
+    try:
+        with app.app_context():
+            db.create_all()
+            generate(buyers=1, florists=20, flowers=args.rows, orders=args.rows // 5)
+            buyer_id = db.session.execute(db.select(User.id).where(User.role == "buyer")).scalar()
+            token = create_access_token(identity=str(buyer_id))
+        client = app.test_client()
+        cases = [
+            ("catalog, cached", "/api/flowers", {}, True),
+            ("catalog, per request", "/api/flowers", {}, False),
+            ("buyer orders", "/api/orders/buyer", {"Authorization": f"Bearer {token}"}, True),
+        ]
+
+        print(f"🌸 {args.rows} flowers, {args.rows // 5} orders, median CPU of {args.repeat} requests"
+              + ("" if compression.brotli else " (Brotli not installed)"))
+        print(f"{'response':<22}{'encoding':<10}{'KB':>8}{'ratio':>7}{'CPU ms':>8}{'+ms':>7}")
+        for label, path, headers, cache_compress in cases:
+            app.config["CATALOG_CACHE_COMPRESS"] = cache_compress
+            identity_size = identity_ms = None
+            for name, encoding in ENCODINGS:
+                request_headers = {**headers, "Accept-Encoding": encoding} if encoding else headers
+                size, cpu_ms = measure(client, path, request_headers, args.repeat)
+                identity_size = identity_size or size
+                identity_ms = identity_ms if identity_ms is not None else cpu_ms
+                print(f"{label:<22}{name:<10}{size / 1024:>8.0f}{identity_size / size:>6.1f}x"
+                      f"{cpu_ms:>8.1f}{cpu_ms - identity_ms:>+7.1f}")
+    finally:
+        shutil.rmtree(tmpdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+"""
+Benchmark: throughput and database connections for each gunicorn concurrency profile.
+
+Starts gunicorn with gunicorn_config.py once per GUNICORN_PROFILE (sync,
+gthread, gevent), drives --concurrency clients at the catalog
+(GET /api/flowers, response cache off so every request queries) and at the
+checkout (POST /api/orders/create then POST /api/payment/daraja/initialize, in
+mock payment mode), and samples the database connections the workers hold:
+pg_stat_activity on PostgreSQL (DATABASE_URL), open handles on the SQLite
+file otherwise.
+
+Usage: python benchmarks/concurrency_profiles.py [--duration 10] [--concurrency 32] [--preload]
+"""
+import argparse
+import os
+import re
+import shutil
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from flask_jwt_extended import create_access_token
+from sqlalchemy import create_engine, text
+from sqlalchemy.pool import NullPool
+
+from app import create_app, db
+from app.seeding import generate
+
+BACKEND = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+PROFILES = ["sync", "gthread", "gevent"]
+BUYERS = 200
+SIZING = re.compile(r"Profile \w+: (\d+) workers x \d+ requests, (\d+) DB connections per worker, (\d+) at most")
+
+
+def _percentile(samples, q):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(q / 100 * len(ordered)))] if ordered else float("nan")
+
+
+def seed(database_url):
+    app = create_app({"SQLALCHEMY_DATABASE_URI": database_url})
+    with app.app_context():
+        db.create_all()
+        generate(buyers=BUYERS, florists=20, flowers=500, orders=0)
+        buyer_ids = [row.id for row in db.session.execute(text("SELECT id FROM users WHERE role = 'buyer'"))]
+        flower_ids = [row.id for row in db.session.execute(text(
+            "SELECT id FROM flowers WHERE stock_status = 'in_stock' LIMIT 50"))]
+        tokens = [create_access_token(identity=str(user_id)) for user_id in buyer_ids]
+    return tokens, flower_ids
+
+
+class ConnectionSampler(threading.Thread):
+    """Peak number of database connections held by the server's processes"""
+
+    def __init__(self, database_url, master_pid):
+        super().__init__(daemon=True)
+        self.master_pid = master_pid
+        self.peak = 0
+        self.stopped = threading.Event()
+        if database_url.startswith("sqlite"):
+            self.db_path = os.path.realpath(database_url.split("sqlite:///", 1)[1])
+            self.engine = None
+        else:
+            self.engine = create_engine(database_url, poolclass=NullPool)
+
+    def _count(self):
+        if self.engine is not None:
+            with self.engine.connect() as connection:
+                return connection.execute(text(
+                    "SELECT count(*) - 1 FROM pg_stat_activity WHERE datname = current_database()")).scalar()
+        count = 0
+        with open(f"/proc/{self.master_pid}/task/{self.master_pid}/children") as f:
+            pids = [self.master_pid] + [int(pid) for pid in f.read().split()]
+        for pid in pids:
+            try:
+                for fd in os.listdir(f"/proc/{pid}/fd"):
+                    if os.readlink(f"/proc/{pid}/fd/{fd}") == self.db_path:
+                        count += 1
+            except OSError:
+                pass  # a worker exited or an fd closed while we looked
+        return count
+
+    def run(self):
+        while not self.stopped.is_set():
+            self.peak = max(self.peak, self._count())
+            self.stopped.wait(0.1)
+
+
+def start_server(port, env):
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-c", "gunicorn_config.py", "run:app"],
+        cwd=BACKEND, env=dict(env, PORT=str(port)), stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True,
+    )
+    for _ in range(150):
+        try:
+            requests.get(f"http://127.0.0.1:{port}/", timeout=5)
+            return proc
+        except requests.RequestException:
+            time.sleep(0.1)
+    proc.kill()
+    raise RuntimeError("gunicorn did not start")
+
+
+def drive(base, path, tokens, flower_ids, concurrency, duration):
+    latencies, errors = [], []
+    deadline = time.monotonic() + duration
+
+    def client(index):
+        session = requests.Session()
+        headers = {"Authorization": f"Bearer {tokens[index % len(tokens)]}"}
+        sent = 0
+        while time.monotonic() < deadline:
+            started = time.perf_counter()
+            try:
+                if path == "catalog":
+                    response = session.get(f"{base}/api/flowers?limit=24", timeout=30)
+                else:
+                    response = session.post(f"{base}/api/orders/create", headers=headers, timeout=30, json={
+                        "buyer_name": "Bench Buyer", "buyer_phone": "0712345678", "delivery_address": "Nairobi",
+                        "items": [{"flower_id": flower_ids[(index + sent + k) % len(flower_ids)]} for k in range(3)],
+                    })
+                    if response.ok:
+                        response = session.post(f"{base}/api/payment/daraja/initialize", headers=headers, timeout=30,
+                                                json={"order_id": response.json()["order_id"]})
+                if response.ok:
+                    latencies.append((time.perf_counter() - started) * 1000)
+                else:
+                    errors.append(response.status_code)
+            except requests.RequestException as e:
+                errors.append(type(e).__name__)
+            sent += 1
+
+    with ThreadPoolExecutor(concurrency) as pool:
+        list(pool.map(client, range(concurrency)))
+    return len(latencies) / duration, latencies, errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--port", type=int, default=8772)
+    parser.add_argument("--duration", type=float, default=10, help="seconds per path and profile")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--workers", type=int, default=None, help="WEB_CONCURRENCY (default: the profile's)")
+    parser.add_argument("--preload", action="store_true", help="GUNICORN_PRELOAD=true")
+    parser.add_argument("--profiles", nargs="+", choices=PROFILES, default=PROFILES)
+    args = parser.parse_args()
+
+    tmpdir = tempfile.mkdtemp()
+    database_url = os.getenv("DATABASE_URL") or f"sqlite:///{os.path.join(tmpdir, 'bench.db')}"
+    print(f"🌸 {args.concurrency} clients, {args.duration:.0f}s per run, {os.cpu_count()} CPU(s), "
+          f"{database_url.split(':', 1)[0]}{', preloaded' if args.preload else ''}")
+    print(f"{'profile':<9}{'path':<10}{'workers':>8}{'pool':>6}{'req/s':>8}{'p50 ms':>8}{'p99 ms':>8}"
+          f"{'errors':>8}{'peak conns':>12}{'ceiling':>9}")
+    try:
+        for profile in args.profiles:
+            for path in ("catalog", "checkout"):
+                if database_url.startswith("sqlite"):
+                    # A fresh database per run, so checkouts don't accumulate
+                    db_path = os.path.join(tmpdir, "bench.db")
+                    for suffix in ("", "-wal", "-shm"):
+                        if os.path.exists(db_path + suffix):
+                            os.remove(db_path + suffix)
+                tokens, flower_ids = seed(database_url)
+                env = {key: value for key, value in os.environ.items()
+                       if not key.startswith(("GUNICORN_", "DB_POOL", "DB_MAX_OVERFLOW", "DARAJA_"))}
+                env.update(DATABASE_URL=database_url, GUNICORN_PROFILE=profile, CATALOG_CACHE_ENABLED="false",
+                           PROMETHEUS_MULTIPROC_DIR=os.path.join(tmpdir, f"metrics-{profile}-{path}"),
+                           GUNICORN_PRELOAD="true" if args.preload else "false")
+                if args.workers:
+                    env["WEB_CONCURRENCY"] = str(args.workers)
+                proc = start_server(args.port, env)
+                sampler = ConnectionSampler(database_url, proc.pid)
+                sampler.start()
+                try:
+                    rate, latencies, errors = drive(f"http://127.0.0.1:{args.port}", path, tokens, flower_ids,
+                                                    args.concurrency, args.duration)
+                finally:
+                    sampler.stopped.set()
+                    sampler.join()
+                    proc.send_signal(signal.SIGQUIT if profile == "gevent" else signal.SIGTERM)
+                    _, log = proc.communicate(timeout=30)
+                # The sizing the config chose, from its startup line
+                sizing = SIZING.search(log)
+                workers, pool, ceiling = sizing.groups() if sizing else ("?", "?", "?")
+                print(f"{profile:<9}{path:<10}{workers:>8}{pool:>6}{rate:>8.1f}{_percentile(latencies, 50):>8.0f}"
+                      f"{_percentile(latencies, 99):>8.0f}{len(errors):>8}{sampler.peak:>12}{ceiling:>9}")
+    finally:
+        shutil.rmtree(tmpdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
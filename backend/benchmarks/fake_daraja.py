@@ -0,0 +1,309 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the Safaricom Daraja API, for benchmarks and offline runs.
+
+Serves the OAuth token, STK push and STK push query endpoints with
+configurable per-request latency and a per-connection setup delay that
+stands in for the TCP + TLS handshake a real client pays to reach
+Safaricom. Counts tokens issued, connections accepted, pushes and queries
+received so benchmarks can report them.
+
+Every CheckoutRequestID has a fixed fate derived from its hash, so queries
+for references the server never issued (seeded pending orders) still get
+stable answers: paid, cancelled (1032), timed out (1037) or "still being
+processed", in the proportions given by --success-rate and --processing-rate.
+--max-qps makes it answer 429 like Daraja's spike arrest, and
+--push-failure-rate rejects that share of STK pushes with a 500.
+
+With --callback-delay-ms the server also plays the customer: about that
+long after an accepted push it POSTs the result to the push's CallBackURL
+(or --callback-url), in Daraja's stkCallback format. Pushes still "being
+processed" never get one; --callback-loss-rate drops a share of the rest
+and --duplicate-rate delivers a share twice, as Daraja does when it thinks
+a delivery failed.
+
+Usage: python benchmarks/fake_daraja.py [--port 8089] [--latency-ms 80] [--handshake-ms 120]
+                                        [--callback-delay-ms 3000 --callback-url URL]
+Then point the app at it with DARAJA_BASE_URL=http://127.0.0.1:8089
+"""
+import argparse
+import hashlib
+import heapq
+import json
+import random
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+
+RESULT_DESCRIPTIONS = {
+    0: "The service request is processed successfully.",
+    1032: "Request cancelled by user",
+    1037: "DS timeout user cannot be reached",
+}
+
+
+class FakeDaraja(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 256
+
+    def __init__(self, address, latency_ms=0, handshake_ms=0, token_ttl=3599,
+                 success_rate=0.8, processing_rate=0.05, max_qps=0, push_failure_rate=0,
+                 callback_delay_ms=None, callback_url=None, callback_loss_rate=0, duplicate_rate=0,
+                 callback_workers=16):
+        super().__init__(address, FakeDarajaHandler)
+        self.latency = latency_ms / 1000
+        self.handshake = handshake_ms / 1000
+        self.token_ttl = token_ttl
+        self.success_rate = success_rate
+        self.processing_rate = processing_rate
+        self.max_qps = max_qps
+        self.push_failure_rate = push_failure_rate
+        self.callback_delay = None if callback_delay_ms is None else callback_delay_ms / 1000
+        self.callback_url = callback_url
+        self.callback_loss_rate = callback_loss_rate
+        self.duplicate_rate = duplicate_rate
+        self.callback_workers = callback_workers
+        self.tokens = set()
+        self.stats = {"connections": 0, "tokens": 0, "pushes": 0, "queries": 0, "rejected": 0, "throttled": 0,
+                      "push_failures": 0, "callbacks": 0, "duplicates": 0, "lost": 0, "callback_errors": 0}
+        self.callback_ms = []  # how long the app took to answer each callback
+        self.lock = threading.Lock()
+        self._window = (0, 0)  # (second, requests seen in it)
+        self._due = []  # heap of (due time, sequence, url, payload, is a redelivery)
+        self._due_ready = threading.Condition()
+        self._sequence = 0
+        self._http = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=callback_workers)
+        self._http.mount("http://", adapter)
+        self._http.mount("https://", adapter)
+
+    def outcome(self, checkout_id):
+        """Fate of a push: None while still processing, else its ResultCode"""
+        roll = int(hashlib.sha1(checkout_id.encode()).hexdigest()[:8], 16) / 0x100000000
+        if roll < self.processing_rate:
+            return None
+        if roll < self.processing_rate + self.success_rate:
+            return 0
+        return 1032 if int(roll * 1e6) % 2 else 1037
+
+    def throttled(self):
+        """True when this request exceeds --max-qps in the current second"""
+        if not self.max_qps:
+            return False
+        with self.lock:
+            second, seen = self._window
+            now = int(time.monotonic())
+            seen = seen + 1 if now == second else 1
+            self._window = (now, seen)
+            if seen > self.max_qps:
+                self.stats["throttled"] += 1
+                return True
+        return False
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def count(self, key):
+        with self.lock:
+            self.stats[key] += 1
+
+    def callback_payload(self, checkout_id, merchant_id, push, result_code):
+        """The stkCallback Daraja would POST for this push"""
+        callback = {
+            "MerchantRequestID": merchant_id,
+            "CheckoutRequestID": checkout_id,
+            "ResultCode": result_code,
+            "ResultDesc": RESULT_DESCRIPTIONS[result_code],
+        }
+        if result_code == 0:
+            callback["CallbackMetadata"] = {"Item": [
+                {"Name": "Amount", "Value": push.get("Amount")},
+                {"Name": "MpesaReceiptNumber", "Value": f"FK{checkout_id[-8:].upper()}"},
+                {"Name": "TransactionDate", "Value": int(datetime.now().strftime("%Y%m%d%H%M%S"))},
+                {"Name": "PhoneNumber", "Value": push.get("PhoneNumber")},
+            ]}
+        return {"Body": {"stkCallback": callback}}
+
+    def schedule_callback(self, checkout_id, merchant_id, push):
+        """Queue the customer's answer to an accepted push, if callbacks are on"""
+        url = self.callback_url or push.get("CallBackURL")
+        if self.callback_delay is None or not url:
+            return
+        result_code = self.outcome(checkout_id)
+        if result_code is None:
+            return  # still "being processed": only a query can settle it
+        if random.random() < self.callback_loss_rate:
+            self.count("lost")
+            return
+        payload = self.callback_payload(checkout_id, merchant_id, push, result_code)
+        # Customers take a varying time to enter their PIN
+        due = time.monotonic() + self.callback_delay * random.uniform(0.5, 1.5)
+        deliveries = [due]
+        if random.random() < self.duplicate_rate:
+            deliveries.append(due + random.uniform(0, 1))
+        with self._due_ready:
+            for index, when in enumerate(deliveries):
+                self._sequence += 1
+                heapq.heappush(self._due, (when, self._sequence, url, payload, index > 0))
+            self._due_ready.notify()
+
+    def _deliver(self, url, payload, duplicate):
+        started = time.perf_counter()
+        try:
+            response = self._http.post(url, json=payload, timeout=30)
+            ok = response.status_code < 500
+        except requests.RequestException:
+            ok = False
+        with self.lock:
+            self.callback_ms.append((time.perf_counter() - started) * 1000)
+        self.count("duplicates" if duplicate else "callbacks")
+        if not ok:
+            self.count("callback_errors")
+
+    def _run_callbacks(self):
+        with ThreadPoolExecutor(max_workers=self.callback_workers, thread_name_prefix="callback") as pool:
+            while True:
+                with self._due_ready:
+                    while not self._due or self._due[0][0] > time.monotonic():
+                        self._due_ready.wait(self._due[0][0] - time.monotonic() if self._due else None)
+                    _, _, url, payload, duplicate = heapq.heappop(self._due)
+                pool.submit(self._deliver, url, payload, duplicate)
+
+    def pending_callbacks(self):
+        with self._due_ready:
+            return len(self._due)
+
+    def start(self):
+        """Serve from a daemon thread; returns self for one-line setup"""
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        if self.callback_delay is not None:
+            threading.Thread(target=self._run_callbacks, name="callbacks", daemon=True).start()
+        return self
+
+
+class FakeDarajaHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, like the real API
+    disable_nagle_algorithm = True
+
+    def setup(self):
+        super().setup()
+        self.server.count("connections")
+        time.sleep(self.server.handshake)
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, status, body):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _read_json(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        return json.loads(self.rfile.read(length) or b"{}")
+
+    def _authorized(self):
+        token = (self.headers.get("Authorization") or "").removeprefix("Bearer ")
+        if token in self.server.tokens:
+            return True
+        self.server.count("rejected")
+        self._send(401, {"errorCode": "404.001.03", "errorMessage": "Invalid Access Token"})
+        return False
+
+    def do_GET(self):
+        time.sleep(self.server.latency)
+        if self.path.startswith("/oauth/v1/generate"):
+            token = uuid.uuid4().hex
+            with self.server.lock:
+                self.server.tokens.add(token)
+            self.server.count("tokens")
+            return self._send(200, {"access_token": token, "expires_in": str(self.server.token_ttl)})
+        self._send(404, {"errorMessage": "Not found"})
+
+    def do_POST(self):
+        time.sleep(self.server.latency)
+        payload = self._read_json()
+        if self.server.throttled():
+            return self._send(429, {"errorCode": "500.003.02", "errorMessage": "Spike arrest violation"})
+        if self.path == "/mpesa/stkpushquery/v1/query":
+            if not self._authorized():
+                return
+            self.server.count("queries")
+            checkout_id = payload.get("CheckoutRequestID", "")
+            result_code = self.server.outcome(checkout_id)
+            if result_code is None:
+                return self._send(500, {"requestId": uuid.uuid4().hex[:12], "errorCode": "500.001.1001",
+                                        "errorMessage": "The transaction is being processed"})
+            return self._send(200, {
+                "ResponseCode": "0",
+                "ResponseDescription": "The service request has been accepted successsfully",
+                "MerchantRequestID": uuid.uuid4().hex[:12],
+                "CheckoutRequestID": checkout_id,
+                "ResultCode": str(result_code),
+                "ResultDesc": RESULT_DESCRIPTIONS[result_code],
+            })
+        if self.path == "/mpesa/stkpush/v1/processrequest":
+            if not self._authorized():
+                return
+            self.server.count("pushes")
+            if random.random() < self.server.push_failure_rate:
+                self.server.count("push_failures")
+                return self._send(500, {"requestId": uuid.uuid4().hex[:12], "errorCode": "500.001.1001",
+                                        "errorMessage": "Unable to lock subscriber, a transaction is "
+                                                        "already in process for the current subscriber"})
+            merchant_id = uuid.uuid4().hex[:12]
+            checkout_id = f"ws_CO_{uuid.uuid4().hex[:20]}"
+            self.server.schedule_callback(checkout_id, merchant_id, payload)
+            return self._send(200, {
+                "MerchantRequestID": merchant_id,
+                "CheckoutRequestID": checkout_id,
+                "ResponseCode": "0",
+                "ResponseDescription": "Success. Request accepted for processing",
+                "CustomerMessage": f"Success. Request accepted for processing {payload.get('AccountReference', '')}",
+            })
+        self._send(404, {"errorMessage": "Not found"})
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--latency-ms", type=float, default=80)
+    parser.add_argument("--handshake-ms", type=float, default=120)
+    parser.add_argument("--success-rate", type=float, default=0.8)
+    parser.add_argument("--processing-rate", type=float, default=0.05)
+    parser.add_argument("--max-qps", type=int, default=0)
+    parser.add_argument("--push-failure-rate", type=float, default=0)
+    parser.add_argument("--callback-delay-ms", type=float, default=None,
+                        help="Deliver result callbacks about this long after each push (off by default).")
+    parser.add_argument("--callback-url", default=None,
+                        help="Send callbacks here instead of the push's CallBackURL.")
+    parser.add_argument("--callback-loss-rate", type=float, default=0)
+    parser.add_argument("--duplicate-rate", type=float, default=0)
+    args = parser.parse_args()
+
+    server = FakeDaraja(("127.0.0.1", args.port), args.latency_ms, args.handshake_ms,
+                        success_rate=args.success_rate, processing_rate=args.processing_rate,
+                        max_qps=args.max_qps, push_failure_rate=args.push_failure_rate,
+                        callback_delay_ms=args.callback_delay_ms, callback_url=args.callback_url,
+                        callback_loss_rate=args.callback_loss_rate, duplicate_rate=args.duplicate_rate)
+    print(f"✅ Fake Daraja listening on {server.url}")
+    try:
+        server.start()
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        print(f"\n{server.stats}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Benchmark: GET /api/flowers/search typeahead latency on a large catalog.
+
+Seeds a throwaway SQLite database (FTS5 index maintained by triggers) and
+times prefix queries as a user would type them.
+
+Usage: python benchmarks/flower_search.py [--flowers 100000] [--repeat 50]
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from sqlalchemy import insert
+
+from app import create_app, db
+from app.models import Flower, User
+from app.search import install_search_index
+
+COLOURS = ["red", "white", "pink", "yellow", "purple", "peach", "blush", "ivory", "coral", "lilac"]
+STEMS = ["rose", "lily", "tulip", "orchid", "peony", "sunflower", "carnation", "daisy", "hydrangea", "gerbera"]
+FORMS = ["bouquet", "basket", "vase", "bunch", "box", "wreath", "posy", "arrangement"]
+WORDS = ["fresh", "seasonal", "fragrant", "hand", "tied", "garden", "long", "stem", "luxury", "classic",
+         "wedding", "birthday", "anniversary", "sympathy", "valentine", "mothers", "day", "delivery"]
+
+
+def seed(flower_count, florist_count=500):
+    rng = random.Random(42)
+    db.session.execute(insert(User), [
+        {"name": f"Florist {i}", "email": f"florist{i}@bench.local", "password_hash": "x",
+         "role": "florist", "shop_name": f"{rng.choice(COLOURS).title()} {rng.choice(STEMS).title()} Studio {i}"}
+        for i in range(florist_count)
+    ])
+    batch = []
+    for i in range(flower_count):
+        batch.append({
+            "name": f"{rng.choice(COLOURS).title()} {rng.choice(STEMS).title()} {rng.choice(FORMS).title()}",
+            "description": " ".join(rng.choice(WORDS) for _ in range(12)),
+            "price": float(rng.randint(500, 15000)),
+            "stock_status": "in_stock",
+            "florist_id": 1 + i % florist_count,
+        })
+        if len(batch) == 10000:
+            db.session.execute(insert(Flower), batch)
+            batch = []
+    if batch:
+        db.session.execute(insert(Flower), batch)
+    db.session.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--flowers", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    tmpdir = tempfile.mkdtemp()
+    app = create_app({
+        "SQLALCHEMY_DATABASE_URI": f"sqlite:///{os.path.join(tmpdir, 'bench.db')}",
+        "CATALOG_CACHE_ENABLED": False,  # measure the index, not cache hits
+    })
+    client = app.test_client()
+
+    with app.app_context():
+        db.create_all()
+        with db.engine.begin() as connection:
+            install_search_index(connection)
+        print(f"🌸 Seeding {args.flowers:,} flowers...")
+        start = time.perf_counter()
+        seed(args.flowers)
+        print(f"   seeded and indexed in {time.perf_counter() - start:.1f}s")
+
+        print(f"\n{'query':<24}{'hits':>6}{'p50 ms':>10}{'p95 ms':>10}")
+        for q in ["ro", "ros", "rose", "red ro", "red rose bou", "wedding lil", "coral peony studio"]:
+            samples = []
+            for _ in range(args.repeat):
+                t0 = time.perf_counter()
+                response = client.get("/api/flowers/search", query_string={"q": q, "limit": 10})
+                samples.append((time.perf_counter() - t0) * 1000)
+            samples.sort()
+            hits = len(response.get_json()["items"])
+            print(f"{q:<24}{hits:>6}{statistics.median(samples):>10.2f}{samples[int(len(samples) * 0.95) - 1]:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Benchmark: login throughput and catalog latency at several password hash costs.
+
+Runs gunicorn (2 gevent workers) once per PASSWORD_HASH_METHOD, hashing
+inline and in the worker process pool, fires --logins concurrent logins
+and meanwhile times GET /api/flowers from another client. Inline hashing
+blocks the gevent loop for the length of each hash, so the catalog waits
+behind the login burst; with the pool it only waits for CPU.
+
+Usage: python benchmarks/login.py [--logins 200] [--concurrency 16]
+"""
+import argparse
+import os
+import shutil
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from sqlalchemy import insert
+from werkzeug.security import generate_password_hash
+
+from app import create_app, db
+from app.models import Flower, User
+
+BACKEND = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+METHODS = ["pbkdf2:sha256:100000", "pbkdf2:sha256:600000", "scrypt:16384:8:1", "scrypt:32768:8:1"]
+USERS = 50
+
+
+def _percentile(samples, q):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(q / 100 * len(ordered)))] if ordered else float("nan")
+
+
+def seed(db_path, method):
+    app = create_app({"SQLALCHEMY_DATABASE_URI": f"sqlite:///{db_path}"})
+    with app.app_context():
+        db.create_all()
+        # One hash for everyone: the cost being measured is checking it
+        pwhash = generate_password_hash("password123", method)
+        db.session.execute(insert(User), [
+            {"name": f"Buyer {i}", "email": f"buyer{i}@bench.local", "password_hash": pwhash, "role": "buyer"}
+            for i in range(USERS)
+        ])
+        db.session.execute(insert(Flower), [
+            {"name": f"Bouquet {i}", "price": 1000.0, "stock_status": "in_stock", "florist_id": 1}
+            for i in range(24)
+        ])
+        db.session.commit()
+
+
+def start_server(port, env):
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-w", "2", "-k", "gevent", "-b", f"127.0.0.1:{port}",
+         "--timeout", "120", "run:app"],
+        cwd=BACKEND, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    for _ in range(100):
+        try:
+            requests.get(f"http://127.0.0.1:{port}/", timeout=5)
+            return proc
+        except requests.RequestException:
+            time.sleep(0.1)
+    proc.kill()
+    raise RuntimeError("gunicorn did not start")
+
+
+def run(base, logins, concurrency):
+    session = requests.Session()
+    session.mount("http://", requests.adapters.HTTPAdapter(pool_maxsize=concurrency))
+    login_ms, catalog_ms = [], []
+    done = threading.Event()
+
+    def login(index):
+        started = time.perf_counter()
+        response = session.post(f"{base}/api/auth/login",
+                                 json={"email": f"buyer{index % USERS}@bench.local", "password": "password123"})
+        assert response.status_code == 200, response.text
+        login_ms.append((time.perf_counter() - started) * 1000)
+
+    def browse():
+        while not done.is_set():
+            started = time.perf_counter()
+            requests.get(f"{base}/api/flowers", timeout=30)
+            catalog_ms.append((time.perf_counter() - started) * 1000)
+            time.sleep(0.02)
+
+    with ThreadPoolExecutor(concurrency) as pool:
+        list(pool.map(login, range(concurrency * 2)))  # start the hashing processes
+        login_ms.clear()
+        browser = threading.Thread(target=browse)
+        browser.start()
+        started = time.perf_counter()
+        list(pool.map(login, range(logins)))
+        elapsed = time.perf_counter() - started
+    done.set()
+    browser.join()
+    return logins / elapsed, login_ms, catalog_ms
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--port", type=int, default=8770)
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--hash-workers", type=int, default=2, help="PASSWORD_HASH_WORKERS for the pool runs")
+    args = parser.parse_args()
+
+    print(f"{args.logins} logins, {args.concurrency} at a time, 2 gevent workers, {os.cpu_count()} CPU(s)")
+    print(f"{'method':<22}{'hashing':>9}{'logins/s':>10}{'login p50':>10}{'p99':>7}"
+          f"{'catalog p50':>12}{'p99':>7}")
+    for method in METHODS:
+        for workers in (0, args.hash_workers):
+            tmpdir = tempfile.mkdtemp()
+            db_path = os.path.join(tmpdir, "bench.db")
+            seed(db_path, method)
+            env = dict(os.environ, DATABASE_URL=f"sqlite:///{db_path}", PASSWORD_HASH_METHOD=method,
+                       PASSWORD_HASH_WORKERS=str(workers))
+            proc = start_server(args.port, env)
+            try:
+                rate, login_ms, catalog_ms = run(f"http://127.0.0.1:{args.port}", args.logins, args.concurrency)
+            finally:
+                proc.send_signal(signal.SIGQUIT)
+                proc.wait(timeout=10)
+                shutil.rmtree(tmpdir, ignore_errors=True)
+            label = "inline" if workers == 0 else f"pool({workers})"
+            print(f"{method:<22}{label:>9}{rate:>10.1f}{_percentile(login_ms, 50):>10.0f}"
+                  f"{_percentile(login_ms, 99):>7.0f}{_percentile(catalog_ms, 50):>12.0f}"
+                  f"{_percentile(catalog_ms, 99):>7.0f}")
+
+
+if __name__ == "__main__":
+    main()
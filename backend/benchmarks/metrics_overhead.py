@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Benchmark: cost of the request metrics hooks, and a check that /metrics
+adds up every gunicorn worker.
+
+1. Times GET / (the cheapest route, so the worst case), GET /api/flowers and
+   GET /api/orders/buyer through the test client with METRICS_ENABLED off
+   and on, alternating batches, with the default registry and with
+   multiprocess files (PROMETHEUS_MULTIPROC_DIR) as under gunicorn.
+2. Starts gunicorn with gunicorn_config.py and 2 workers, sends --requests
+   requests to GET / on fresh connections and compares them with the count
+   scraped from /metrics.
+
+Usage: python benchmarks/metrics_overhead.py [--batches 40] [--batch-size 100]
+"""
+import argparse
+import os
+import re
+import shutil
+import signal
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import requests
+
+BACKEND = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+ROUTES = ["/", "/api/flowers", "/api/orders/buyer"]
+SCRAPE_TOKEN = "benchmark"
+SCRAPE_HEADERS = {"Authorization": f"Bearer {SCRAPE_TOKEN}"}
+
+
+def measure(mode, batches, batch_size):
+    """Run in a child process: prometheus_client picks its storage at import time"""
+    tmpdir = tempfile.mkdtemp()
+    if mode == "multiprocess":
+        os.environ["PROMETHEUS_MULTIPROC_DIR"] = os.path.join(tmpdir, "metrics")
+        os.makedirs(os.environ["PROMETHEUS_MULTIPROC_DIR"])
+    sys.path.insert(0, BACKEND)
+    from flask_jwt_extended import create_access_token
+    from sqlalchemy import insert
+
+    from app import create_app, db
+    from app.models import Flower, User
+
+    db_path = os.path.join(tmpdir, "bench.db")
+    apps = {}
+    for enabled in (False, True):
+        apps[enabled] = create_app({"SQLALCHEMY_DATABASE_URI": f"sqlite:///{db_path}", "METRICS_ENABLED": enabled})
+    with apps[False].app_context():
+        db.create_all()
+        db.session.execute(insert(User), [{"name": "Buyer", "email": "buyer@bench.local", "password_hash": "x",
+                                           "role": "buyer"}])
+        db.session.execute(insert(Flower), [
+            {"name": f"Bouquet {i}", "price": 1000.0, "stock_status": "in_stock", "florist_id": 1} for i in range(24)
+        ])
+        db.session.commit()
+        headers = {"Authorization": f"Bearer {create_access_token(identity='1')}"}
+
+    clients = {enabled: app.test_client() for enabled, app in apps.items()}
+    for route in ROUTES:
+        per_request = {False: [], True: []}
+        for batch in range(batches):
+            # Alternate which app goes first so neither always runs on a warmer cache
+            for enabled in ((False, True) if batch % 2 else (True, False)):
+                client = clients[enabled]
+                started = time.perf_counter()
+                for _ in range(batch_size):
+                    client.get(route, headers=headers)
+                per_request[enabled].append((time.perf_counter() - started) / batch_size * 1e6)
+        # Neighbouring batches see the same machine noise; compare them pairwise
+        extra = statistics.median(on - off for off, on in zip(per_request[False], per_request[True]))
+        off = statistics.median(per_request[False])
+        print(f"{mode:<14}{route:<20}{off:>9.0f}{off + extra:>9.0f}{extra:>9.0f}{extra / off:>9.1%}")
+    shutil.rmtree(tmpdir, ignore_errors=True)
+
+
+def check_aggregation(port, total):
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-c", "gunicorn_config.py", "-b", f"127.0.0.1:{port}", "run:app"],
+        cwd=BACKEND, env=dict(os.environ, GUNICORN_PROFILE="sync", WEB_CONCURRENCY="2",
+                              PROMETHEUS_MULTIPROC_DIR=tempfile.mkdtemp(), METRICS_TOKEN=SCRAPE_TOKEN),
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    base = f"http://127.0.0.1:{port}"
+    try:
+        for _ in range(100):
+            try:
+                requests.get(f"{base}/metrics", headers=SCRAPE_HEADERS, timeout=5)
+                break
+            except requests.RequestException:
+                time.sleep(0.1)
+        for _ in range(total):
+            # New connections spread the requests over both workers
+            requests.get(f"{base}/")
+        body = requests.get(f"{base}/metrics", headers=SCRAPE_HEADERS).text
+    finally:
+        proc.send_signal(signal.SIGTERM)
+        proc.wait(timeout=10)
+    match = re.search(r'^http_requests_total\{method="GET",route="/",status="200"\} (\S+)$', body, re.M)
+    counted = float(match.group(1)) if match else 0
+    mark = "✅" if counted == total else "❌"
+    print(f"{mark} /metrics counted {counted:.0f} of {total} requests served by 2 workers")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--batches", type=int, default=40)
+    parser.add_argument("--batch-size", type=int, default=100)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--port", type=int, default=8771)
+    parser.add_argument("--mode", choices=["default", "multiprocess"], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.mode:
+        measure(args.mode, args.batches, args.batch_size)
+        return
+
+    print(f"{'registry':<14}{'route':<20}{'off µs':>9}{'on µs':>9}{'+µs':>9}{'+%':>9}")
+    for mode in ("default", "multiprocess"):
+        subprocess.run([sys.executable, __file__, "--mode", mode, "--batches", str(args.batches),
+                        "--batch-size", str(args.batch_size)], check=True, stderr=subprocess.DEVNULL)
+    check_aggregation(args.port, args.requests)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+Benchmark: idle order status streams per gunicorn worker class.
+
+Starts gunicorn (2 workers) with the sync and the gevent worker class, opens
+--streams SSE connections to GET /api/orders/<id>/events spread over 50
+orders, then:
+  * counts how many streams got their first message within 5 s,
+  * times GET /api/flowers while the streams sit idle,
+  * updates every order's status and measures how long each open stream
+    waits for the change (fan-out through the order_events table).
+
+Usage: python benchmarks/order_events.py [--streams 1000]
+"""
+import argparse
+import os
+import resource
+import selectors
+import shutil
+import signal
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import requests
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from flask_jwt_extended import create_access_token
+from sqlalchemy import insert
+
+from app import create_app, db
+from app.models import Flower, Order, OrderItem, User
+
+BACKEND = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+ORDERS = 50
+
+
+def seed(db_path):
+    app = create_app({"SQLALCHEMY_DATABASE_URI": f"sqlite:///{db_path}"})
+    with app.app_context():
+        db.create_all()
+        db.session.execute(insert(User), [
+            {"name": "Buyer", "email": "buyer@bench.local", "password_hash": "x", "role": "buyer"},
+            {"name": "Florist", "email": "florist@bench.local", "password_hash": "x", "role": "florist"},
+        ])
+        db.session.execute(insert(Flower), [
+            {"name": f"Bouquet {i}", "price": 1000.0, "stock_status": "in_stock", "florist_id": 2} for i in range(24)
+        ])
+        db.session.execute(insert(Order), [
+            {"buyer_id": 1, "buyer_name": "Buyer", "buyer_email": "buyer@bench.local", "buyer_phone": "0712345678",
+             "delivery_address": "Nairobi", "total_price": 1000.0, "status": "paid", "paid": True}
+            for _ in range(ORDERS)
+        ])
+        db.session.execute(insert(OrderItem), [
+            {"order_id": i + 1, "flower_id": 1, "florist_id": 2, "flower_name": "Bouquet 0",
+             "florist_name": "Florist", "quantity": 1, "unit_price": 1000.0}
+            for i in range(ORDERS)
+        ])
+        db.session.commit()
+        return create_access_token(identity="1"), create_access_token(identity="2")
+
+
+def start_server(port, worker_class, db_path):
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{db_path}", ORDER_EVENTS_POLL_INTERVAL="0.25")
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-w", "2", "-k", worker_class, "--worker-connections", "5000",
+         "-b", f"127.0.0.1:{port}", "--timeout", "120", "run:app"],
+        cwd=BACKEND, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    for _ in range(100):
+        try:
+            requests.get(f"http://127.0.0.1:{port}/", timeout=5)
+            return proc
+        except requests.RequestException:
+            time.sleep(0.1)
+    proc.kill()
+    raise RuntimeError("gunicorn did not start")
+
+
+def open_streams(port, token, count):
+    selector = selectors.DefaultSelector()
+    for i in range(count):
+        sock = socket.create_connection(("127.0.0.1", port))
+        sock.sendall(f"GET /api/orders/{i % ORDERS + 1}/events?jwt={token} HTTP/1.1\r\n"
+                     f"Host: 127.0.0.1\r\nAccept: text/event-stream\r\n\r\n".encode())
+        sock.setblocking(False)
+        selector.register(sock, selectors.EVENT_READ, {"order": i % ORDERS + 1, "events": 0})
+    return selector
+
+
+def pump(selector, until, wanted, received_at=None):
+    """Read streams until each has ``wanted`` status messages or the deadline passes"""
+    while time.perf_counter() < until:
+        pending = [key for key in selector.get_map().values() if key.data["events"] < wanted]
+        if not pending:
+            break
+        for key, _ in selector.select(timeout=0.05):
+            try:
+                data = key.fileobj.recv(65536)
+            except BlockingIOError:
+                continue
+            before = key.data["events"]
+            key.data["events"] += data.count(b"event: status")
+            if received_at is not None and before < wanted <= key.data["events"]:
+                received_at.append(time.perf_counter())
+    return sum(1 for key in selector.get_map().values() if key.data["events"] >= wanted)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--port", type=int, default=8767)
+    parser.add_argument("--streams", type=int, default=1000)
+    args = parser.parse_args()
+
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    resource.setrlimit(resource.RLIMIT_NOFILE, (min(hard, max(soft, args.streams * 2 + 256)), hard))
+
+    print(f"{args.streams} streams over {ORDERS} orders, 2 gunicorn workers")
+    print(f"{'worker':<8}{'connected':>10}{'catalog p50':>12}{'catalog max':>12}{'fan-out p50':>12}{'fan-out max':>12}")
+    for offset, worker_class in enumerate(("sync", "gevent")):
+        port = args.port + offset
+        tmpdir = tempfile.mkdtemp()
+        db_path = os.path.join(tmpdir, "bench.db")
+        buyer_token, florist_token = seed(db_path)
+        proc = start_server(port, worker_class, db_path)
+        base = f"http://127.0.0.1:{port}"
+        selector = open_streams(port, buyer_token, args.streams)
+        try:
+            connected = pump(selector, time.perf_counter() + 5, wanted=1)
+
+            catalog = []
+            for _ in range(20):
+                started = time.perf_counter()
+                try:
+                    requests.get(f"{base}/api/flowers", timeout=3)
+                    catalog.append((time.perf_counter() - started) * 1000)
+                except requests.RequestException:
+                    catalog.append(float("inf"))  # every worker is busy holding a stream
+                    break
+
+            fanout = []
+            if connected and max(catalog) != float("inf"):
+                headers = {"Authorization": f"Bearer {florist_token}"}
+                received_at = []
+                started = time.perf_counter()
+                for order_id in range(1, ORDERS + 1):
+                    requests.put(f"{base}/api/orders/{order_id}/status", json={"status": "processing"},
+                                 headers=headers, timeout=5)
+                pump(selector, time.perf_counter() + 10, wanted=2, received_at=received_at)
+                fanout = sorted((t - started) * 1000 for t in received_at)
+
+            print(f"{worker_class:<8}{connected:>10}{statistics.median(catalog):>12.1f}{max(catalog):>12.1f}"
+                  + (f"{statistics.median(fanout):>12.0f}{fanout[-1]:>12.0f}" if fanout else f"{'-':>12}{'-':>12}"))
+        finally:
+            for key in list(selector.get_map().values()):
+                key.fileobj.close()
+            proc.send_signal(signal.SIGQUIT)  # quick shutdown: do not wait for open streams
+            try:
+                proc.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+            shutil.rmtree(tmpdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
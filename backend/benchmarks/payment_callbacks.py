@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Benchmark: replay Daraja STK callbacks against a large orders table.
+
+Seeds --orders orders, each with a pending payment attempt, then delivers
+--callbacks first-time callbacks followed by --replays redeliveries of each
+(Daraja retries callbacks it believes were lost). First deliveries update
+one attempt and one order; replays should be a read-only index probe whose
+cost does not depend on the table size. --drop-indexes removes the checkout
+reference indexes to show the scan the callback used to pay for.
+
+Usage: python benchmarks/payment_callbacks.py [--orders 200000] [--callbacks 2000] [--replays 3]
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from sqlalchemy import event, insert, text
+
+from app import create_app, db
+from app.models import Order, PaymentAttempt, User
+
+BATCH = 20000
+
+
+def _payload(checkout_id, index):
+    callback = {"CheckoutRequestID": checkout_id, "ResultCode": 0 if index % 5 else 1032,
+                "ResultDesc": "Processed"}
+    if callback["ResultCode"] == 0:
+        callback["CallbackMetadata"] = {"Item": [{"Name": "MpesaReceiptNumber", "Value": f"QK{index:08d}"}]}
+    return {"Body": {"stkCallback": callback}}
+
+
+def _report(label, samples, statements):
+    samples.sort()
+    total = sum(samples) / 1000
+    print(f"{label:<18}{len(samples):>9}{len(samples) / total:>10.0f}"
+          f"{statistics.median(samples):>9.2f}{samples[int(len(samples) * 0.99) - 1]:>9.2f}"
+          f"{statements / len(samples):>11.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--orders", type=int, default=200000)
+    parser.add_argument("--callbacks", type=int, default=2000)
+    parser.add_argument("--replays", type=int, default=3)
+    parser.add_argument("--drop-indexes", action="store_true")
+    args = parser.parse_args()
+
+    tmpdir = tempfile.mkdtemp()
+    app = create_app({"SQLALCHEMY_DATABASE_URI": f"sqlite:///{os.path.join(tmpdir, 'bench.db')}"})
+    client = app.test_client()
+
+    with app.app_context():
+        db.create_all()
+        db.session.execute(insert(User), [
+            {"name": "Buyer", "email": "buyer@bench.local", "password_hash": "x", "role": "buyer"}
+        ])
+        start = time.perf_counter()
+        for offset in range(0, args.orders, BATCH):
+            ids = range(offset + 1, min(offset + BATCH, args.orders) + 1)
+            db.session.execute(insert(Order), [
+                {"id": i, "buyer_id": 1, "buyer_name": "Buyer", "buyer_email": "buyer@bench.local",
+                 "buyer_phone": "0712345678", "delivery_address": "Nairobi", "total_price": 1500.0,
+                 "status": "pending", "paid": False, "pesapal_reference": f"ws_CO_{i:09d}"}
+                for i in ids
+            ])
+            db.session.execute(insert(PaymentAttempt), [
+                {"checkout_request_id": f"ws_CO_{i:09d}", "order_id": i, "amount": 1500.0, "status": "pending"}
+                for i in ids
+            ])
+        if args.drop_indexes:
+            db.session.execute(text("DROP INDEX ix_orders_pesapal_reference"))
+            db.session.execute(text("DROP INDEX ix_payment_attempts_checkout_request_id"))
+        db.session.commit()
+        print(f"✅ Seeded {args.orders} orders in {time.perf_counter() - start:.1f}s"
+              f"{' (checkout indexes dropped)' if args.drop_indexes else ''}")
+
+        statements = []
+        event.listen(db.engine, "before_cursor_execute", lambda *a: statements.append(a[2]))
+
+        targets = random.Random(7).sample(range(1, args.orders + 1), min(args.callbacks, args.orders))
+        deliveries = [("first delivery", targets)] + [("replay", targets)] * args.replays
+
+        print(f"{'callbacks':<18}{'count':>9}{'per s':>10}{'p50 ms':>9}{'p99 ms':>9}{'queries':>11}")
+        results = {}
+        for label, order_ids in deliveries:
+            samples, count = results.setdefault(label, ([], [0]))
+            for n, order_id in enumerate(order_ids):
+                before = len(statements)
+                started = time.perf_counter()
+                response = client.post("/api/payment/daraja/callback",
+                                       json=_payload(f"ws_CO_{order_id:09d}", n))
+                samples.append((time.perf_counter() - started) * 1000)
+                count[0] += len(statements) - before
+                assert response.status_code == 200, response.get_json()
+                assert response.get_json()["duplicate"] == (label == "replay")
+        for label, (samples, count) in results.items():
+            _report(label, samples, count[0])
+
+        paid = db.session.query(Order).filter_by(paid=True).count()
+        print(f"✅ {paid} orders paid, {args.callbacks * args.replays} replays acknowledged without writes")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Benchmark: catalog latency while a slow Daraja is handling STK pushes.
+
+Runs gunicorn with the production worker class (sync) against the fake
+Daraja server, sends a burst of concurrent payment initializations and
+measures GET /api/flowers from another client at the same time.
+
+  inline    the request calls Daraja itself (the old behaviour)
+  threads   the request queues the push; dispatcher threads send it
+
+Usage: python benchmarks/payment_dispatch.py [--workers 2] [--checkouts 8] [--latency-ms 2000]
+"""
+import argparse
+import os
+import shutil
+import signal
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import requests
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from flask_jwt_extended import create_access_token
+from sqlalchemy import insert
+
+from app import create_app, db
+from app.models import Flower, Order, User
+from fake_daraja import FakeDaraja
+
+BACKEND = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+
+def seed(db_path, checkouts):
+    app = create_app({"SQLALCHEMY_DATABASE_URI": f"sqlite:///{db_path}"})
+    with app.app_context():
+        db.create_all()
+        db.session.execute(insert(User), [
+            {"name": "Buyer", "email": "buyer@bench.local", "password_hash": "x", "role": "buyer"},
+            {"name": "Florist", "email": "florist@bench.local", "password_hash": "x", "role": "florist"},
+        ])
+        db.session.execute(insert(Flower), [
+            {"name": f"Bouquet {i}", "price": 1000.0, "stock_status": "in_stock", "florist_id": 2}
+            for i in range(24)
+        ])
+        db.session.execute(insert(Order), [
+            {"buyer_id": 1, "buyer_name": "Buyer", "buyer_email": "buyer@bench.local",
+             "buyer_phone": "0712345678", "delivery_address": "Nairobi", "total_price": 1500.0}
+            for _ in range(checkouts * 2)
+        ])
+        db.session.commit()
+        return {"Authorization": f"Bearer {create_access_token(identity='1')}"}
+
+
+def start_server(port, workers, env):
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-w", str(workers), "-k", "sync", "-b", f"127.0.0.1:{port}",
+         "--timeout", "120", "run:app"],
+        cwd=BACKEND, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    for _ in range(100):
+        try:
+            requests.get(f"http://127.0.0.1:{port}/", timeout=5)
+            return proc
+        except requests.RequestException:
+            time.sleep(0.1)
+    proc.kill()
+    raise RuntimeError("gunicorn did not start")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--checkouts", type=int, default=8)
+    parser.add_argument("--latency-ms", type=float, default=2000)
+    args = parser.parse_args()
+
+    daraja = FakeDaraja(("127.0.0.1", 0), args.latency_ms).start()
+    base = f"http://127.0.0.1:{args.port}"
+    print(f"Fake Daraja: {args.latency_ms:.0f} ms per request; {args.workers} sync workers; "
+          f"{args.checkouts} concurrent checkouts")
+    print(f"{'dispatch':<10}{'init p50 ms':>12}{'catalog p50':>12}{'catalog max':>12}{'all sent s':>11}")
+
+    for mode in ("inline", "threads"):
+        tmpdir = tempfile.mkdtemp()
+        db_path = os.path.join(tmpdir, "bench.db")
+        headers = seed(db_path, args.checkouts)
+        env = dict(os.environ, DATABASE_URL=f"sqlite:///{db_path}", PAYMENT_DISPATCH=mode,
+                   PAYMENT_POLL_INTERVAL="0.2", DARAJA_BASE_URL=daraja.url, DARAJA_KEY="bench-key",
+                   DARAJA_SECRET="bench-secret", DARAJA_PASSKEY="bench-pass", DARAJA_SHORTCODE="174379",
+                   DARAJA_TOKEN_CACHE=os.path.join(tmpdir, "token.json"))
+        proc = start_server(args.port, args.workers, env)
+        try:
+            init_ms, catalog_ms = [], []
+            done = threading.Event()
+
+            def checkout(order_id):
+                started = time.perf_counter()
+                response = requests.post(f"{base}/api/payment/daraja/initialize",
+                                         json={"order_id": order_id}, headers=headers)
+                init_ms.append((time.perf_counter() - started) * 1000)
+                assert response.status_code in (200, 202), response.text
+
+            def browse():
+                while not done.is_set():
+                    started = time.perf_counter()
+                    requests.get(f"{base}/api/flowers")
+                    catalog_ms.append((time.perf_counter() - started) * 1000)
+                    time.sleep(0.05)
+
+            browser = threading.Thread(target=browse)
+            browser.start()
+            started = time.perf_counter()
+            checkouts = [threading.Thread(target=checkout, args=(i + 1,)) for i in range(args.checkouts)]
+            for t in checkouts:
+                t.start()
+            for t in checkouts:
+                t.join()
+            # Wait until every push has reached Daraja
+            while True:
+                states = [requests.get(f"{base}/api/payment/daraja/check-status/{i + 1}", headers=headers)
+                          .json()["payment_attempt"]["status"] for i in range(args.checkouts)]
+                if all(state != "queued" and state != "sending" for state in states):
+                    break
+                time.sleep(0.1)
+            all_sent = time.perf_counter() - started
+            done.set()
+            browser.join()
+            print(f"{mode:<10}{statistics.median(init_ms):>12.0f}{statistics.median(catalog_ms):>12.0f}"
+                  f"{max(catalog_ms):>12.0f}{all_sent:>11.1f}")
+        finally:
+            proc.send_signal(signal.SIGTERM)
+            proc.wait(timeout=10)
+            shutil.rmtree(tmpdir, ignore_errors=True)
+    daraja.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+"""
+Load test: the whole M-Pesa checkout against a local Daraja stand-in.
+
+Starts the fake Daraja server with callback delivery and gunicorn pointed at
+it, then --users concurrent buyers each run checkouts until --flows are done:
+
+  create      POST /api/orders/create
+  initialize  POST /api/payment/daraja/initialize (queues the STK push)
+  settled     the order's event stream reports it paid or failed, i.e. the
+              push was sent, the fake customer answered and the callback
+              was processed
+
+Lost callbacks and pushes Daraja is "still processing" leave orders pending
+until --flow-timeout; those are then settled with the reconciler, and the
+database is checked for double-settled attempts caused by duplicate callbacks.
+
+Usage: python benchmarks/payment_flow.py [--users 50] [--flows 500] [--duplicate-rate 0.2]
+"""
+import argparse
+import json
+import os
+import shutil
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import requests
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from flask_jwt_extended import create_access_token
+from sqlalchemy import func, insert, select
+
+from app import create_app, db
+from app.models import Flower, Order, PaymentAttempt, User
+from fake_daraja import FakeDaraja
+
+BACKEND = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+FLOWERS = 24
+
+
+def _percentile(samples, q):
+    if not samples:
+        return float("nan")
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(q / 100 * len(ordered)))]
+
+
+def seed(database_url, users):
+    app = create_app({"SQLALCHEMY_DATABASE_URI": database_url})
+    with app.app_context():
+        db.create_all()
+        db.session.execute(insert(User), [
+            {"name": "Florist", "email": "florist@bench.local", "password_hash": "x", "role": "florist",
+             "shop_name": "Bench Blooms"}
+        ] + [
+            {"name": f"Buyer {i}", "email": f"buyer{i}@bench.local", "password_hash": "x", "role": "buyer"}
+            for i in range(users)
+        ])
+        db.session.execute(insert(Flower), [
+            {"name": f"Bouquet {i}", "price": 500.0 + 50 * i, "stock_status": "in_stock", "florist_id": 1}
+            for i in range(FLOWERS)
+        ])
+        db.session.commit()
+        return app, [create_access_token(identity=str(i + 2)) for i in range(users)]
+
+
+def start_server(port, workers, env):
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-w", str(workers), "-k", "gevent", "-b", f"127.0.0.1:{port}",
+         "--timeout", "120", "run:app"],
+        cwd=BACKEND, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    for _ in range(100):
+        try:
+            requests.get(f"http://127.0.0.1:{port}/", timeout=5)
+            return proc
+        except requests.RequestException:
+            time.sleep(0.1)
+    proc.kill()
+    raise RuntimeError("gunicorn did not start")
+
+
+def wait_for_outcome(session, base, token, order_id, deadline):
+    """Follow the order's event stream until the payment ends; returns its outcome"""
+    with session.get(f"{base}/api/orders/{order_id}/events", params={"jwt": token},
+                     stream=True, timeout=(5, 10)) as response:
+        for line in response.iter_lines(decode_unicode=True):
+            if line.startswith("data:"):
+                update = json.loads(line[5:])
+                if update["paid"]:
+                    return "paid"
+                if update["payment_status"] in ("failed", "error"):
+                    return "push error" if update["payment_status"] == "error" else "failed"
+            if time.monotonic() > deadline:
+                break
+    return "unsettled"
+
+
+def run_flows(base, tokens, flows, flow_timeout):
+    timings = {"create": [], "initialize": [], "settled": []}
+    outcomes = {"paid": 0, "failed": 0, "push error": 0, "unsettled": 0, "errors": 0}
+    unsettled, lock = [], threading.Lock()
+    remaining = iter(range(flows))
+
+    def buyer(index, token):
+        session = requests.Session()
+        headers = {"Authorization": f"Bearer {token}"}
+        while True:
+            with lock:
+                flow = next(remaining, None)
+            if flow is None:
+                return
+            try:
+                started = time.perf_counter()
+                response = session.post(f"{base}/api/orders/create", headers=headers, json={
+                    "buyer_name": f"Buyer {index}", "buyer_phone": f"07{index:08d}",
+                    "delivery_address": "Nairobi", "items": [
+                        {"flower_id": 1 + (flow + n) % FLOWERS, "quantity": 1 + n} for n in range(1 + flow % 3)
+                    ]})
+                response.raise_for_status()
+                order_id = response.json()["order_id"]
+                created = time.perf_counter()
+                response = session.post(f"{base}/api/payment/daraja/initialize", headers=headers,
+                                        json={"order_id": order_id})
+                response.raise_for_status()
+                initialized = time.perf_counter()
+                outcome = wait_for_outcome(session, base, token, order_id, time.monotonic() + flow_timeout)
+                settled = time.perf_counter()
+            except (requests.RequestException, KeyError, ValueError) as e:
+                print(f"⚠️ flow {flow}: {e}")
+                with lock:
+                    outcomes["errors"] += 1
+                continue
+            with lock:
+                timings["create"].append((created - started) * 1000)
+                timings["initialize"].append((initialized - created) * 1000)
+                outcomes[outcome] += 1
+                if outcome == "unsettled":
+                    unsettled.append(order_id)
+                else:
+                    timings["settled"].append((settled - started) * 1000)
+
+    threads = [threading.Thread(target=buyer, args=(i, token)) for i, token in enumerate(tokens)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return timings, outcomes, unsettled
+
+
+def check_consistency(app):
+    """Orders marked paid must match orders with a succeeded attempt, one each"""
+    with app.app_context():
+        paid = set(db.session.execute(select(Order.id).where(Order.paid.is_(True))).scalars())
+        succeeded = dict(db.session.execute(
+            select(PaymentAttempt.order_id, func.count()).where(PaymentAttempt.status == "succeeded")
+            .group_by(PaymentAttempt.order_id)
+        ).all())
+        return paid == set(succeeded) and all(count == 1 for count in succeeded.values())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--port", type=int, default=8769)
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--flows", type=int, default=500)
+    parser.add_argument("--latency-ms", type=float, default=80)
+    parser.add_argument("--callback-delay-ms", type=float, default=2000)
+    parser.add_argument("--success-rate", type=float, default=0.8)
+    parser.add_argument("--processing-rate", type=float, default=0.02)
+    parser.add_argument("--push-failure-rate", type=float, default=0.02)
+    parser.add_argument("--callback-loss-rate", type=float, default=0.02)
+    parser.add_argument("--duplicate-rate", type=float, default=0.2)
+    parser.add_argument("--flow-timeout", type=float, default=20)
+    parser.add_argument("--database-url", default=None, help="Defaults to a fresh SQLite file.")
+    args = parser.parse_args()
+
+    tmpdir = tempfile.mkdtemp()
+    database_url = args.database_url or f"sqlite:///{os.path.join(tmpdir, 'bench.db')}"
+    base = f"http://127.0.0.1:{args.port}"
+    daraja = FakeDaraja(("127.0.0.1", 0), args.latency_ms, success_rate=args.success_rate,
+                        processing_rate=args.processing_rate, push_failure_rate=args.push_failure_rate,
+                        callback_delay_ms=args.callback_delay_ms, callback_loss_rate=args.callback_loss_rate,
+                        duplicate_rate=args.duplicate_rate).start()
+    daraja_env = {"DARAJA_BASE_URL": daraja.url, "DARAJA_KEY": "bench-key", "DARAJA_SECRET": "bench-secret",
+                  "DARAJA_PASSKEY": "bench-pass", "DARAJA_SHORTCODE": "174379",
+                  "DARAJA_TOKEN_CACHE": os.path.join(tmpdir, "token.json")}
+    os.environ.update(daraja_env)  # the in-process reconciler talks to the same fake
+    from app.reconciliation import reconcile_pending
+
+    app, tokens = seed(database_url, args.users)
+    env = dict(os.environ, DATABASE_URL=database_url, DARAJA_CALLBACK_URL=f"{base}/api/payment/daraja/callback",
+               PAYMENT_POLL_INTERVAL="0.5", ORDER_EVENTS_POLL_INTERVAL="0.1", ORDER_EVENTS_HEARTBEAT="1")
+    proc = start_server(args.port, args.workers, env)
+    print(f"{args.flows} checkouts by {args.users} buyers, {args.workers} gevent workers; fake Daraja "
+          f"{args.latency_ms:.0f} ms, customer answers in ~{args.callback_delay_ms:.0f} ms, "
+          f"{args.duplicate_rate:.0%} duplicate and {args.callback_loss_rate:.0%} lost callbacks")
+    try:
+        started = time.perf_counter()
+        timings, outcomes, unsettled = run_flows(base, tokens, args.flows, args.flow_timeout)
+        elapsed = time.perf_counter() - started
+        # Let late redeliveries land before checking for double settlement
+        while daraja.pending_callbacks():
+            time.sleep(0.2)
+        time.sleep(1)
+    finally:
+        proc.send_signal(signal.SIGQUIT)
+        proc.wait(timeout=10)
+
+    print(f"\n✅ {args.flows} flows in {elapsed:.1f} s: {args.flows / elapsed:.1f} checkouts/s")
+    print(f"{'step':<12}{'p50 ms':>9}{'p99 ms':>9}")
+    for step, samples in timings.items():
+        print(f"{step:<12}{_percentile(samples, 50):>9.0f}{_percentile(samples, 99):>9.0f}")
+    print(f"{'callback':<12}{_percentile(daraja.callback_ms, 50):>9.0f}{_percentile(daraja.callback_ms, 99):>9.0f}")
+    print("outcomes: " + ", ".join(f"{key} {value}" for key, value in outcomes.items()))
+    stats = daraja.stats
+    print(f"fake Daraja: {stats['pushes']} pushes ({stats['push_failures']} rejected), {stats['callbacks']} callbacks "
+          f"+ {stats['duplicates']} duplicates, {stats['lost']} lost, {stats['callback_errors']} answered 5xx")
+
+    if unsettled:
+        with app.app_context():
+            stats = reconcile_pending(app, older_than=0, rate=0)
+        print(f"🔁 reconciled {len(unsettled)} unsettled: " + ", ".join(f"{k} {v}" for k, v in stats.items()))
+    print("✅ no order settled twice" if check_consistency(app) else "❌ paid orders and succeeded attempts disagree")
+    daraja.shutdown()
+    shutil.rmtree(tmpdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Benchmark: `flask payments reconcile` against tens of thousands of stuck payments.
+
+Seeds --orders orders whose STK push is pending with no callback, starts
+the fake Daraja server (every reference gets a fixed fate: paid,
+cancelled, timed out or still processing) and runs the reconciler at
+several concurrency / rate settings, reporting queries per second and
+how the attempts were settled. Each run starts from a fresh copy of the
+seeded database.
+
+Usage: python benchmarks/reconcile.py [--orders 20000] [--latency-ms 40]
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from sqlalchemy import insert
+
+from app import create_app, db
+from app.models import Order, PaymentAttempt, User
+from fake_daraja import FakeDaraja
+
+BATCH = 20000
+# (concurrency, rate limit per second; 0 = unlimited)
+SETTINGS = [(8, 0), (32, 0), (64, 0), (64, 250)]
+
+
+def seed(db_path, orders):
+    app = create_app({"SQLALCHEMY_DATABASE_URI": f"sqlite:///{db_path}"})
+    with app.app_context():
+        db.create_all()
+        db.session.execute(insert(User), [
+            {"name": "Buyer", "email": "buyer@bench.local", "password_hash": "x", "role": "buyer"}
+        ])
+        sent_at = datetime.utcnow() - timedelta(hours=1)
+        for offset in range(0, orders, BATCH):
+            ids = range(offset + 1, min(offset + BATCH, orders) + 1)
+            db.session.execute(insert(Order), [
+                {"id": i, "buyer_id": 1, "buyer_name": "Buyer", "buyer_email": "buyer@bench.local",
+                 "buyer_phone": "0712345678", "delivery_address": "Nairobi", "total_price": 1500.0,
+                 "status": "pending", "paid": False, "pesapal_reference": f"ws_CO_{i:09d}"}
+                for i in ids
+            ])
+            db.session.execute(insert(PaymentAttempt), [
+                {"checkout_request_id": f"ws_CO_{i:09d}", "order_id": i, "amount": 1500.0,
+                 "status": "pending", "created_at": sent_at}
+                for i in ids
+            ])
+        db.session.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--orders", type=int, default=20000)
+    parser.add_argument("--latency-ms", type=float, default=40)
+    parser.add_argument("--max-qps", type=int, default=0, help="fake Daraja spike arrest")
+    args = parser.parse_args()
+
+    server = FakeDaraja(("127.0.0.1", 0), args.latency_ms, max_qps=args.max_qps).start()
+    os.environ.update({
+        "DARAJA_KEY": "bench-key", "DARAJA_SECRET": "bench-secret", "DARAJA_PASSKEY": "bench-pass",
+        "DARAJA_SHORTCODE": "174379", "DARAJA_BASE_URL": server.url,
+    })
+    tmpdir = tempfile.mkdtemp()
+    os.environ["DARAJA_TOKEN_CACHE"] = os.path.join(tmpdir, "token.json")
+    from app.reconciliation import reconcile_pending
+
+    seeded = os.path.join(tmpdir, "seeded.db")
+    start = time.perf_counter()
+    seed(seeded, args.orders)
+    print(f"✅ Seeded {args.orders} pending payments in {time.perf_counter() - start:.1f}s; "
+          f"fake Daraja {args.latency_ms:.0f} ms per query")
+    print(f"{'workers':>8}{'rate':>7}{'seconds':>9}{'queries/s':>11}{'paid':>8}{'failed':>8}{'unresolved':>12}")
+
+    try:
+        for concurrency, rate in SETTINGS:
+            db_path = os.path.join(tmpdir, "run.db")
+            shutil.copyfile(seeded, db_path)
+            app = create_app({"SQLALCHEMY_DATABASE_URI": f"sqlite:///{db_path}"})
+            # Pool larger than the reconciler so connections are reused, not discarded
+            from app.payment import daraja
+            daraja.pool_size = max(concurrency, 10)
+            daraja._session = None
+            with app.app_context():
+                started = time.perf_counter()
+                stats = reconcile_pending(app, older_than=60, concurrency=concurrency, rate=rate)
+                elapsed = time.perf_counter() - started
+                db.session.remove()
+                db.engine.dispose()
+            print(f"{concurrency:>8}{rate or '-':>7}{elapsed:>9.1f}{stats['checked'] / elapsed:>11.0f}"
+                  f"{stats['paid']:>8}{stats['failed']:>8}{stats['unresolved']:>12}")
+    finally:
+        server.shutdown()
+        shutil.rmtree(tmpdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
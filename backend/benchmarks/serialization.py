@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+"""
+Benchmark: building and encoding 10k-row JSON responses.
+
+Times three pipelines on the same rows, inside a request context:
+
+  legacy       the hand-written dicts the routes used to build, resolving
+               image URLs row by row, encoded by Flask's default provider
+  serializers  app/serializers.py (one ImageUrls per response), stdlib JSON
+  + orjson     the same serializers, encoded by FastJSONProvider (if installed)
+
+on the catalog (GET /api/flowers), a florist's own flowers (whole Flower
+rows versus the serializer's columns, loading included) and a buyer's
+orders with their items. Images repeat across flowers, and half of them
+have generated variants, as in production.
+
+Usage: python benchmarks/serialization.py [--rows 10000] [--repeat 10]
+"""
+import argparse
+import hashlib
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from flask.json.provider import DefaultJSONProvider
+from sqlalchemy import update
+from sqlalchemy.orm import load_only, selectinload
+
+from app import create_app, db, json_provider
+from app.images import IMAGE_VARIANTS, variant_filename, variants_ready
+from app.json_provider import FastJSONProvider
+from app.models import Flower, Order, User
+from app.routes.uploads import upload_url
+from app.seeding import generate
+from app.serializers import (BUYER_ITEM_COLUMNS, BUYER_ORDER_COLUMNS, FLORIST_FLOWER_COLUMNS,
+                             FLOWER_CATALOG_COLUMNS, ImageUrls, buyer_order_json, catalog_flower_json,
+                             florist_flower_json)
+
+DISTINCT_IMAGES = 500
+
+
+def seed(rows, upload_folder):
+    generate(buyers=1, florists=1, flowers=rows, orders=rows)
+    names = [hashlib.sha256(str(i).encode()).hexdigest() + ".jpg" for i in range(DISTINCT_IMAGES)]
+    for name in names[::2]:
+        for variant in IMAGE_VARIANTS:
+            open(os.path.join(upload_folder, variant_filename(name, variant)), "wb").close()
+    for i, name in enumerate(names):
+        db.session.execute(update(Flower).where(Flower.id % DISTINCT_IMAGES == i).values(image_url=name))
+    db.session.commit()
+
+
+# The per-row helpers and dicts the routes used before app/serializers.py
+def _legacy_image_url(image_url, url_root):
+    if not image_url:
+        return None
+    if image_url.startswith('http'):
+        return image_url
+    if image_url.startswith('/'):
+        return url_root + image_url
+    return upload_url(url_root, image_url)
+
+
+def _legacy_variants(image_url, url_root, upload_folder):
+    if not variants_ready(image_url, upload_folder):
+        return None
+    return {name: upload_url(url_root, variant_filename(image_url, name)) for name in IMAGE_VARIANTS}
+
+
+def legacy_catalog(rows, url_root, upload_folder):
+    return [{
+        "id": f.id, "name": f.name, "price": f.price,
+        "image_url": _legacy_image_url(f.image_url, url_root),
+        "image_variants": _legacy_variants(f.image_url, url_root, upload_folder),
+        "description": f.description, "shop_name": f.florist_name or "Unknown", "florist_id": f.florist_id,
+    } for f in rows]
+
+
+def legacy_my_flowers(florist_id, url_root, upload_folder):
+    return [{
+        "id": f.id, "name": f.name, "price": f.price,
+        "image_url": _legacy_image_url(f.image_url, url_root),
+        "image_variants": _legacy_variants(f.image_url, url_root, upload_folder),
+        "description": f.description, "stock_status": getattr(f, "stock_status", "in_stock"),
+    } for f in Flower.query.filter_by(florist_id=florist_id).all()]
+
+
+def legacy_orders(buyer_id):
+    orders = Order.query.filter_by(buyer_id=buyer_id).options(selectinload(Order.items)).all()
+    return [{
+        "id": o.id, "total_price": o.total_price, "status": o.status, "paid": o.paid,
+        "created_at": o.created_at.isoformat(),
+        "items": [{"flower_name": i.flower_name, "quantity": i.quantity} for i in o.items],
+    } for o in orders]
+
+
+def catalog(rows):
+    images = ImageUrls()
+    return [catalog_flower_json(f, images) for f in rows]
+
+
+def my_flowers(florist_id):
+    rows = db.session.execute(db.select(*FLORIST_FLOWER_COLUMNS).where(Flower.florist_id == florist_id)).all()
+    images = ImageUrls()
+    return [florist_flower_json(f, images) for f in rows]
+
+
+def orders(buyer_id):
+    query = Order.query.filter_by(buyer_id=buyer_id).options(
+        load_only(*BUYER_ORDER_COLUMNS), selectinload(Order.items).load_only(*BUYER_ITEM_COLUMNS))
+    return [buyer_order_json(o) for o in query.all()]
+
+
+def timed(build, provider, repeat):
+    """Median ms to build the payload and to encode it as a response"""
+    build_ms, encode_ms, size = [], [], 0
+    for _ in range(repeat):
+        db.session.expunge_all()  # ORM-loading pipelines start cold each time
+        started = time.perf_counter()
+        payload = build()
+        built = time.perf_counter()
+        size = len(provider.response(payload).get_data())
+        build_ms.append((built - started) * 1000)
+        encode_ms.append((time.perf_counter() - built) * 1000)
+    return statistics.median(build_ms), statistics.median(encode_ms), size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    tmpdir = tempfile.mkdtemp()
+    upload_folder = os.path.join(tmpdir, "uploads")
+    os.makedirs(upload_folder)
+    app = create_app({"SQLALCHEMY_DATABASE_URI": f"sqlite:///{os.path.join(tmpdir, 'bench.db')}",
+                      "UPLOAD_FOLDER": upload_folder, "SQL_PROFILE_ENABLED": False})
+    stdlib, fast = DefaultJSONProvider(app), FastJSONProvider(app)
+    try:
+        with app.app_context():
+            db.create_all()
+            seed(args.rows, upload_folder)
+            florist_id = db.session.execute(db.select(User.id).where(User.role == "florist")).scalar()
+            buyer_id = db.session.execute(db.select(User.id).where(User.role == "buyer")).scalar()
+            with app.test_request_context("/api/flowers"):
+                catalog_rows = db.session.query(*FLOWER_CATALOG_COLUMNS, User.name.label("florist_name")) \
+                    .outerjoin(User, User.id == Flower.florist_id).all()
+                url_root = "http://localhost"
+                pipelines = {
+                    "catalog": [
+                        ("legacy", lambda: legacy_catalog(catalog_rows, url_root, upload_folder), stdlib),
+                        ("serializers", lambda: catalog(catalog_rows), stdlib),
+                    ],
+                    "my flowers": [
+                        ("legacy", lambda: legacy_my_flowers(florist_id, url_root, upload_folder), stdlib),
+                        ("serializers", lambda: my_flowers(florist_id), stdlib),
+                    ],
+                    "buyer orders": [
+                        ("legacy", lambda: legacy_orders(buyer_id), stdlib),
+                        ("serializers", lambda: orders(buyer_id), stdlib),
+                    ],
+                }
+                for steps in pipelines.values():
+                    if json_provider.orjson is not None:
+                        steps.append(("+ orjson", steps[1][1], fast))
+
+                print(f"🌸 {args.rows} rows per response, median of {args.repeat}"
+                      + ("" if json_provider.orjson else " (orjson not installed)"))
+                print(f"{'response':<14}{'pipeline':<13}{'build ms':>9}{'encode ms':>10}{'total ms':>9}{'KB':>7}")
+                for response, steps in pipelines.items():
+                    baseline = None
+                    for label, build, provider in steps:
+                        build_ms, encode_ms, size = timed(build, provider, args.repeat)
+                        total = build_ms + encode_ms
+                        baseline = baseline or total
+                        speedup = "" if total == baseline else f"  {baseline / total:.1f}x"
+                        print(f"{response:<14}{label:<13}{build_ms:>9.1f}{encode_ms:>10.1f}{total:>9.1f}"
+                              f"{size / 1024:>7.0f}{speedup}")
+    finally:
+        shutil.rmtree(tmpdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
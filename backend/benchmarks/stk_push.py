@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Benchmark: DarajaPayment.trigger_stk_push latency against the fake Daraja server.
+
+Compares the old request pattern (fresh OAuth token and fresh connections
+for every push) with the cached token and keep-alive pool, then forks
+several "workers" at once to check they share a single token refresh.
+Latency and handshake delay are simulated by benchmarks/fake_daraja.py.
+
+Usage: python benchmarks/stk_push.py [--pushes 50] [--latency-ms 80] [--handshake-ms 120] [--workers 4]
+"""
+import argparse
+import multiprocessing
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from fake_daraja import FakeDaraja
+
+
+def _client(base_url, cache_path):
+    os.environ.update({
+        "DARAJA_KEY": "bench-key", "DARAJA_SECRET": "bench-secret", "DARAJA_PASSKEY": "bench-pass",
+        "DARAJA_SHORTCODE": "174379", "DARAJA_BASE_URL": base_url, "DARAJA_TOKEN_CACHE": cache_path,
+    })
+    from app.payment import DarajaPayment
+    return DarajaPayment()
+
+
+def _forget(client):
+    """Put the client back in the state the old code started every push in"""
+    client._token = None
+    if os.path.exists(client.token_cache_path):
+        os.remove(client.token_cache_path)
+    if client._session is not None:
+        client._session.close()
+        client._session = None
+
+
+def _push(client, n):
+    started = time.perf_counter()
+    result = client.trigger_stk_push("0712345678", 1500, n)
+    assert result["success"], result
+    return (time.perf_counter() - started) * 1000
+
+
+def _worker_pushes(base_url, cache_path, pushes, start_barrier, results):
+    client = _client(base_url, cache_path)
+    start_barrier.wait()
+    results.put([_push(client, n) for n in range(pushes)])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--pushes", type=int, default=50)
+    parser.add_argument("--latency-ms", type=float, default=80)
+    parser.add_argument("--handshake-ms", type=float, default=120)
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+
+    server = FakeDaraja(("127.0.0.1", 0), args.latency_ms, args.handshake_ms).start()
+    cache_path = os.path.join(tempfile.mkdtemp(), "token.json")
+    client = _client(server.url, cache_path)
+
+    print(f"Fake Daraja: {args.latency_ms:.0f} ms per request, {args.handshake_ms:.0f} ms per new connection")
+    print(f"{'mode':<26}{'pushes':>8}{'p50 ms':>9}{'p99 ms':>9}{'tokens':>8}{'conns':>7}")
+
+    def run(label, reset):
+        before = dict(server.stats)
+        samples = []
+        for n in range(args.pushes):
+            if reset:
+                _forget(client)
+            samples.append(_push(client, n))
+        samples.sort()
+        print(f"{label:<26}{len(samples):>8}{statistics.median(samples):>9.1f}"
+              f"{samples[max(int(len(samples) * 0.99) - 1, 0)]:>9.1f}"
+              f"{server.stats['tokens'] - before['tokens']:>8}"
+              f"{server.stats['connections'] - before['connections']:>7}")
+
+    run("token + connect per push", reset=True)
+    _forget(client)
+    run("cached token, pooled", reset=False)
+
+    # Several processes starting cold at the same moment: one refresh, shared
+    _forget(client)
+    before = dict(server.stats)
+    context = multiprocessing.get_context("fork")
+    barrier, results = context.Barrier(args.workers), context.Queue()
+    workers = [context.Process(target=_worker_pushes, args=(server.url, cache_path, args.pushes, barrier, results))
+               for _ in range(args.workers)]
+    for worker in workers:
+        worker.start()
+    samples = sorted(sample for _ in workers for sample in results.get())
+    for worker in workers:
+        worker.join()
+    print(f"{f'{args.workers} workers, shared token':<26}{len(samples):>8}{statistics.median(samples):>9.1f}"
+          f"{samples[int(len(samples) * 0.99) - 1]:>9.1f}"
+          f"{server.stats['tokens'] - before['tokens']:>8}"
+          f"{server.stats['connections'] - before['connections']:>7}")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
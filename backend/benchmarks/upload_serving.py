@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+Benchmark: gunicorn worker occupancy when serving flower photos.
+
+Starts a single sync gunicorn worker per scenario and measures, from the
+access log, how long the worker was busy per image:
+
+  before      Flask's /static handler (no long-lived caching)
+  direct      /uploads with immutable caching, sendfile, Range support
+  x-accel     /uploads handing the bytes to a front proxy via X-Accel-Redirect
+
+Three client patterns are replayed against each:
+  fast        local clients downloading a 2 MB photo back to back
+  slow        clients on a ~2 MB/s link with small receive windows, so the
+              photo cannot simply be parked in kernel socket buffers
+  revisits    a browser with a warm cache opening a 24-photo page 10 times
+
+Usage: python benchmarks/upload_serving.py [--port 8765]
+"""
+import argparse
+import hashlib
+import os
+import shutil
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import requests
+
+BACKEND = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+UPLOAD_FOLDER = os.path.join(BACKEND, "app", "static", "uploads")
+PHOTO_BYTES = 8 * 1024 * 1024  # larger than the kernel's max socket send buffer
+
+
+def start_server(port, mode, log_path, db_path):
+    env = dict(os.environ, UPLOAD_SERVE_MODE=mode, DATABASE_URL=f"sqlite:///{db_path}")
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-w", "1", "-k", "sync", "-b", f"127.0.0.1:{port}",
+         "--access-logfile", log_path, "--access-logformat", "%(U)s %(s)s %(D)s", "run:app"],
+        cwd=BACKEND, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    for _ in range(100):
+        try:
+            requests.get(f"http://127.0.0.1:{port}/", timeout=1)
+            return proc
+        except requests.ConnectionError:
+            time.sleep(0.1)
+    proc.kill()
+    raise RuntimeError("gunicorn did not start")
+
+
+def stop_server(proc):
+    proc.send_signal(signal.SIGTERM)
+    proc.wait(timeout=10)
+
+
+def busy_ms(log_path):
+    """Total worker time (ms) and request count recorded in the access log."""
+    with open(log_path) as f:
+        durations = [int(line.split()[2]) / 1000 for line in f if line.strip()]
+    open(log_path, "w").close()
+    return sum(durations), len(durations)
+
+
+def fetch(url):
+    with requests.get(url, stream=True) as response:
+        for _ in response.iter_content(64 * 1024):
+            pass
+
+
+def fetch_slowly(url, rate):
+    """Download over a raw socket with a small receive window, reading at ``rate`` bytes/s."""
+    host_port, path = url.split("://", 1)[1].split("/", 1)
+    host, port = host_port.split(":")
+    sock = socket.socket()
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 16 * 1024)
+    sock.connect((host, int(port)))
+    sock.sendall(f"GET /{path} HTTP/1.1\r\nHost: {host_port}\r\nConnection: close\r\n\r\n".encode())
+    while True:
+        chunk = sock.recv(16 * 1024)
+        if not chunk:
+            break
+        time.sleep(len(chunk) / rate)
+    sock.close()
+
+
+def run_parallel(fn, clients, per_client):
+    threads = [threading.Thread(target=lambda: [fn() for _ in range(per_client)]) for _ in range(clients)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return time.perf_counter() - start
+
+
+def revisit(url_for_photo, photos, visits):
+    """Browser cache model: obey max-age/immutable, otherwise revalidate with If-None-Match."""
+    cache = {}
+    for _ in range(visits):
+        for name in photos:
+            url = url_for_photo(name)
+            cached = cache.get(url)
+            if cached and "immutable" in cached.headers.get("Cache-Control", ""):
+                continue
+            headers = {"If-None-Match": cached.headers["ETag"]} if cached and "ETag" in cached.headers else {}
+            response = requests.get(url, headers=headers)
+            if response.status_code == 200:
+                cache[url] = response
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    os.makedirs(UPLOAD_FOLDER, exist_ok=True)
+    photos = []
+    for i in range(24):
+        data = os.urandom(PHOTO_BYTES if i == 0 else 64 * 1024)
+        name = f"{hashlib.sha256(data).hexdigest()}.jpg"
+        with open(os.path.join(UPLOAD_FOLDER, name), "wb") as f:
+            f.write(data)
+        photos.append(name)
+
+    tmpdir = tempfile.mkdtemp()
+    log_path = os.path.join(tmpdir, "access.log")
+    base = f"http://127.0.0.1:{args.port}"
+    scenarios = [
+        ("before", "direct", lambda name: f"{base}/static/uploads/{name}"),
+        ("direct", "direct", lambda name: f"{base}/uploads/{name}"),
+        ("x-accel", "x-accel", lambda name: f"{base}/uploads/{name}"),
+    ]
+
+    print(f"{'scenario':<10}{'pattern':<10}{'requests':>9}{'worker ms/req':>15}{'worker s':>10}{'wall s':>8}")
+    try:
+        for label, mode, url_for_photo in scenarios:
+            proc = start_server(args.port, mode, log_path, os.path.join(tmpdir, "bench.db"))
+            try:
+                big = url_for_photo(photos[0])
+                for pattern, clients, per_client, download in (
+                    ("fast", 4, 10, lambda: fetch(big)),
+                    ("slow", 2, 1, lambda: fetch_slowly(big, 2 * 1024 * 1024)),
+                ):
+                    time.sleep(0.2)  # let gunicorn flush the access log
+                    busy_ms(log_path)
+                    wall = run_parallel(download, clients, per_client)
+                    time.sleep(0.2)
+                    total, count = busy_ms(log_path)
+                    print(f"{label:<10}{pattern:<10}{count:>9}{total / max(count, 1):>15.2f}{total / 1000:>10.2f}{wall:>8.2f}")
+
+                start = time.perf_counter()
+                revisit(url_for_photo, photos, visits=10)
+                wall = time.perf_counter() - start
+                time.sleep(0.2)
+                total, count = busy_ms(log_path)
+                print(f"{label:<10}{'revisits':<10}{count:>9}{total / max(count, 1):>15.2f}{total / 1000:>10.2f}{wall:>8.2f}")
+            finally:
+                stop_server(proc)
+    finally:
+        for name in photos:
+            os.remove(os.path.join(UPLOAD_FOLDER, name))
+        shutil.rmtree(tmpdir, ignore_errors=True)
+
+    print("\nx-accel responses carry no body here; in production nginx sends the bytes from disk.")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,87 @@
 import os
+import shutil
+import tempfile
 
-workers = 4
-worker_class = "sync"
+# Concurrency profiles (GUNICORN_PROFILE). Each sizes the workers and the
+# SQLAlchemy pool of each worker together: every request slot can get a
+# connection, and no worker opens connections it can never use.
+#   sync     one request per worker; 2 x CPUs + 1 workers
+#   gthread  GUNICORN_THREADS requests per worker; CPUs + 1 workers
+#   gevent   GUNICORN_WORKER_CONNECTIONS requests per worker; CPUs + 1 workers.
+#            An open order status stream (GET /api/orders/<id>/events) costs a
+#            greenlet rather than a whole worker; database work queues for the
+#            worker's GUNICORN_DB_POOL_SIZE connections.
+# WEB_CONCURRENCY overrides the worker count.
+PROFILES = ("sync", "gthread", "gevent")
+profile = os.getenv("GUNICORN_PROFILE", os.getenv("GUNICORN_WORKER_CLASS", "gevent"))
+if profile not in PROFILES:
+    raise RuntimeError(f"GUNICORN_PROFILE must be one of {', '.join(PROFILES)}, not {profile!r}")
+
+cpus = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else os.cpu_count() or 1
+worker_class = profile
+workers = int(os.getenv("WEB_CONCURRENCY", 2 * cpus + 1 if profile == "sync" else cpus + 1))
+threads = int(os.getenv("GUNICORN_THREADS", "8")) if profile == "gthread" else 1
+worker_connections = int(os.getenv("GUNICORN_WORKER_CONNECTIONS", "2000"))
 bind = f"0.0.0.0:{os.getenv('PORT', 8000)}"
-timeout = 900
-keepalive = 2
+# gthread and gevent workers keep heartbeating while a request runs, so this only
+# catches hung workers; a sync worker is busy for the whole of a request, streams included
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "330" if profile == "sync" else "60"))
+graceful_timeout = 30
+keepalive = int(os.getenv("GUNICORN_KEEPALIVE", "5"))
+# Load the app once in the master and fork it into the workers (faster start,
+# shared memory); app/__init__.py discards pooled connections after a fork
+preload_app = os.getenv("GUNICORN_PRELOAD", "false").lower() == "true"
+
+# Connections per worker: its request slots plus the app's background threads
+# (payment dispatchers and the order events broker, which holds a LISTEN connection)
+request_slots = {"sync": 1, "gthread": threads,
+                 "gevent": min(worker_connections, int(os.getenv("GUNICORN_DB_POOL_SIZE", "10")))}[profile]
+background = 2
+if os.getenv("PAYMENT_DISPATCH", "threads") == "threads":
+    background += int(os.getenv("PAYMENT_WORKERS", "4"))
+db_pool_size = request_slots + background
+# Stay under the database's connection limit, leaving room for migrations, cron jobs and psql
+db_max_connections = int(os.getenv("DB_MAX_CONNECTIONS", "90"))
+db_pool_capped = workers * db_pool_size > db_max_connections
+if db_pool_capped:
+    db_pool_size = max(2, db_max_connections // workers)
+# Read by app/config.py; explicit settings win
+os.environ.setdefault("DB_POOL_SIZE", str(db_pool_size))
+os.environ.setdefault("DB_MAX_OVERFLOW", "0")
+
+# Workers write request metrics here and /metrics adds them up (see app/metrics.py).
+# Must be set before the app imports prometheus_client.
+metrics_dir = os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR",
+                                    os.path.join(tempfile.gettempdir(), f"flora-metrics-{os.getpid()}"))
+
+
+def on_starting(server):
+    # Samples from a previous run would be summed into this one's
+    shutil.rmtree(metrics_dir, ignore_errors=True)
+    os.makedirs(metrics_dir, exist_ok=True)
+
+    pool = int(os.environ["DB_POOL_SIZE"]) + int(os.environ["DB_MAX_OVERFLOW"])
+    concurrency = worker_connections if profile == "gevent" else threads
+    server.log.info(f"Profile {profile}: {workers} workers x {concurrency} requests, "
+                    f"{pool} DB connections per worker, {workers * pool} at most")
+    if db_pool_capped:
+        server.log.warning(f"DB pool capped at {db_pool_size} per worker to stay under DB_MAX_CONNECTIONS="
+                           f"{db_max_connections}; requests will wait for connections")
+
+
+def child_exit(server, worker):
+    try:
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(worker.pid)
+    except ImportError:
+        pass
+
+
+def post_fork(server, worker):
+    if worker_class == "gevent":
+        try:
+            # Let Postgres queries yield to other greenlets instead of blocking the worker
+            from psycogreen.gevent import patch_psycopg
+            patch_psycopg()
+        except ImportError:
+            server.log.warning("psycogreen not installed: database calls will block gevent workers")
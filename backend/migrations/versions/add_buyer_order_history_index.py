@@ -0,0 +1,31 @@
+"""Add orders(buyer_id, created_at, id) index for paginated buyer order history
+
+Revision ID: add_buyer_order_history_index
+Revises: add_order_inbox_indexes
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+from sqlalchemy import inspect
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_buyer_order_history_index'
+down_revision = 'add_order_inbox_indexes'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    """
+    GET /api/orders/buyer pages with "WHERE buyer_id = ? AND (created_at, id) < cursor
+    ORDER BY created_at DESC, id DESC LIMIT n", a backwards range scan of this index.
+    """
+    inspector = inspect(op.get_context().bind)
+    existing = {ix['name'] for ix in inspector.get_indexes('orders')}
+    if 'ix_orders_buyer_id_created_at_id' not in existing:
+        op.create_index('ix_orders_buyer_id_created_at_id', 'orders', ['buyer_id', 'created_at', 'id'])
+
+
+def downgrade():
+    op.drop_index('ix_orders_buyer_id_created_at_id', table_name='orders')
@@ -0,0 +1,47 @@
+"""Add composite indexes for the keyset-paginated flower catalog
+
+Revision ID: add_catalog_indexes
+Revises: fix_production_schema
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+from sqlalchemy import inspect
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_catalog_indexes'
+down_revision = 'fix_production_schema'
+branch_labels = None
+depends_on = None
+
+
+CATALOG_INDEXES = {
+    'ix_flowers_price_id': ['price', 'id'],
+    'ix_flowers_florist_id_id': ['florist_id', 'id'],
+    'ix_flowers_stock_status_id': ['stock_status', 'id'],
+    'ix_flowers_stock_status_price_id': ['stock_status', 'price', 'id'],
+}
+
+
+def upgrade():
+    """
+    GET /api/flowers pages with "WHERE (sort key) > (cursor) ORDER BY sort key LIMIT n".
+    These indexes let every page - first or ten-thousandth - be a short index
+    range scan, optionally narrowed by florist or stock status.
+    """
+    inspector = inspect(op.get_context().bind)
+    existing = {ix['name'] for ix in inspector.get_indexes('flowers')}
+
+    for name, columns in CATALOG_INDEXES.items():
+        if name not in existing:
+            op.create_index(name, 'flowers', columns)
+
+
+def downgrade():
+    inspector = inspect(op.get_context().bind)
+    existing = {ix['name'] for ix in inspector.get_indexes('flowers')}
+
+    for name in CATALOG_INDEXES:
+        if name in existing:
+            op.drop_index(name, table_name='flowers')
@@ -0,0 +1,42 @@
+"""Add catalog_state table holding the catalog cache version
+
+Revision ID: add_catalog_state
+Revises: add_catalog_indexes
+Create Date: 2026-10-18
+
+"""
+from datetime import datetime
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy import inspect
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_catalog_state'
+down_revision = 'add_catalog_indexes'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    """
+    Single-row version counter shared by all workers. Flower writes bump it in
+    their own transaction; cached catalog responses keyed by an older version
+    are never served again.
+    """
+    inspector = inspect(op.get_context().bind)
+    if 'catalog_state' in inspector.get_table_names():
+        return
+
+    catalog_state = op.create_table('catalog_state',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('version', sa.Integer(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.bulk_insert(catalog_state, [{'id': 1, 'version': 1, 'updated_at': datetime.utcnow()}])
+
+
+def downgrade():
+    op.drop_table('catalog_state')
@@ -0,0 +1,29 @@
+"""Add full-text search index over flowers (FTS5 on SQLite, tsvector/GIN on PostgreSQL)
+
+Revision ID: add_flower_search
+Revises: add_catalog_state
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+
+from app.search import drop_search_index, install_search_index
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_flower_search'
+down_revision = 'add_catalog_state'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    """
+    Creates the flower_search table plus the triggers that keep it in sync
+    with flowers and florists' shop names, then indexes existing flowers.
+    """
+    install_search_index(op.get_bind())
+
+
+def downgrade():
+    drop_search_index(op.get_bind())
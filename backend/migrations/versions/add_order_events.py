@@ -0,0 +1,45 @@
+"""Add order_events log for streaming order status changes
+
+Revision ID: add_order_events
+Revises: add_payment_reconcile_index
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy import inspect
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_order_events'
+down_revision = 'add_payment_reconcile_index'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    """
+    Status changes are appended here in the writing transaction; each worker
+    process tails the table by id to feed GET /api/orders/<id>/events.
+    """
+    inspector = inspect(op.get_context().bind)
+    if 'order_events' in inspector.get_table_names():
+        return
+    op.create_table(
+        'order_events',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('order_id', sa.Integer(), sa.ForeignKey('orders.id'), nullable=False),
+        sa.Column('status', sa.String(length=50), nullable=True),
+        sa.Column('paid', sa.Boolean(), nullable=True),
+        sa.Column('payment_status', sa.String(length=20), nullable=True),
+        sa.Column('message', sa.String(length=255), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+    )
+    op.create_index('ix_order_events_order_id_id', 'order_events', ['order_id', 'id'])
+    op.create_index('ix_order_events_created_at', 'order_events', ['created_at'])
+
+
+def downgrade():
+    op.drop_index('ix_order_events_created_at', table_name='order_events')
+    op.drop_index('ix_order_events_order_id_id', table_name='order_events')
+    op.drop_table('order_events')
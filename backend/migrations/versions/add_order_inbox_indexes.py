@@ -0,0 +1,52 @@
+"""Add indexes for the paginated florist order inbox
+
+Revision ID: add_order_inbox_indexes
+Revises: add_flower_search
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+from sqlalchemy import inspect
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_order_inbox_indexes'
+down_revision = 'add_flower_search'
+branch_labels = None
+depends_on = None
+
+
+INBOX_INDEXES = {
+    'order_items': {
+        'ix_order_items_florist_id_order_id': ['florist_id', 'order_id'],
+        'ix_order_items_order_id': ['order_id'],
+    },
+    'orders': {
+        'ix_orders_created_at_id': ['created_at', 'id'],
+    },
+}
+
+
+def upgrade():
+    """
+    GET /api/orders/florist/inbox finds a florist's orders through order_items,
+    pages them newest first by (created_at, id) and loads each page's items
+    with a single "order_id IN (...)" select.
+    """
+    inspector = inspect(op.get_context().bind)
+
+    for table, indexes in INBOX_INDEXES.items():
+        existing = {ix['name'] for ix in inspector.get_indexes(table)}
+        for name, columns in indexes.items():
+            if name not in existing:
+                op.create_index(name, table, columns)
+
+
+def downgrade():
+    inspector = inspect(op.get_context().bind)
+
+    for table, indexes in INBOX_INDEXES.items():
+        existing = {ix['name'] for ix in inspector.get_indexes(table)}
+        for name in indexes:
+            if name in existing:
+                op.drop_index(name, table_name=table)
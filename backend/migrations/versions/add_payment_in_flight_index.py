@@ -0,0 +1,43 @@
+"""Allow one queued or sending payment attempt per order
+
+Revision ID: add_payment_in_flight_index
+Revises: add_primary_reads
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy import inspect
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_payment_in_flight_index'
+down_revision = 'add_primary_reads'
+branch_labels = None
+depends_on = None
+
+IN_FLIGHT = "status IN ('queued', 'sending')"
+
+
+def upgrade():
+    """
+    Two concurrent initialize calls could both find nothing in flight and
+    queue two STK pushes. The partial unique index makes the second insert
+    fail, and the route returns the first attempt instead.
+    """
+    inspector = inspect(op.get_context().bind)
+    existing = {ix['name'] for ix in inspector.get_indexes('payment_attempts')}
+    if 'uq_payment_attempts_order_in_flight' in existing:
+        return
+    # Older duplicates can't be told apart from a double prompt; close all but the newest
+    op.execute(sa.text(
+        f"UPDATE payment_attempts SET status = 'error', error = 'Superseded by a newer payment request' "
+        f"WHERE {IN_FLIGHT} AND id NOT IN ("
+        f"  SELECT max(id) FROM payment_attempts WHERE {IN_FLIGHT} GROUP BY order_id)"
+    ))
+    op.create_index('uq_payment_attempts_order_in_flight', 'payment_attempts', ['order_id'], unique=True,
+                    sqlite_where=sa.text(IN_FLIGHT), postgresql_where=sa.text(IN_FLIGHT))
+
+
+def downgrade():
+    op.drop_index('uq_payment_attempts_order_in_flight', table_name='payment_attempts')
@@ -0,0 +1,54 @@
+"""Turn payment_attempts into the STK push job queue
+
+Revision ID: add_payment_queue
+Revises: add_payment_attempts
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy import inspect
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_payment_queue'
+down_revision = 'add_payment_attempts'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    """
+    Queued attempts have no CheckoutRequestID until a dispatcher has sent the
+    push, so the column becomes nullable (the unique index still applies to
+    sent ones). Dispatchers claim the next due job through (status, run_after).
+    """
+    inspector = inspect(op.get_context().bind)
+    columns = {c['name'] for c in inspector.get_columns('payment_attempts')}
+    existing = {ix['name'] for ix in inspector.get_indexes('payment_attempts')}
+
+    # batch mode so SQLite can relax NOT NULL (it rebuilds the table)
+    with op.batch_alter_table('payment_attempts') as batch:
+        batch.alter_column('checkout_request_id', existing_type=sa.String(length=100), nullable=True)
+        if 'tries' not in columns:
+            batch.add_column(sa.Column('tries', sa.Integer(), nullable=False, server_default='0'))
+        if 'error' not in columns:
+            batch.add_column(sa.Column('error', sa.String(length=255), nullable=True))
+        if 'run_after' not in columns:
+            batch.add_column(sa.Column('run_after', sa.DateTime(), nullable=True))
+        if 'claimed_at' not in columns:
+            batch.add_column(sa.Column('claimed_at', sa.DateTime(), nullable=True))
+
+    if 'ix_payment_attempts_status_run_after' not in existing:
+        op.create_index('ix_payment_attempts_status_run_after', 'payment_attempts', ['status', 'run_after'])
+
+
+def downgrade():
+    op.drop_index('ix_payment_attempts_status_run_after', table_name='payment_attempts')
+    op.execute("DELETE FROM payment_attempts WHERE checkout_request_id IS NULL")
+    with op.batch_alter_table('payment_attempts') as batch:
+        batch.drop_column('claimed_at')
+        batch.drop_column('run_after')
+        batch.drop_column('error')
+        batch.drop_column('tries')
+        batch.alter_column('checkout_request_id', existing_type=sa.String(length=100), nullable=False)
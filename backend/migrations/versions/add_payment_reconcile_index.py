@@ -0,0 +1,32 @@
+"""Add payment_attempts(status, created_at, id) index for reconciliation
+
+Revision ID: add_payment_reconcile_index
+Revises: add_payment_queue
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+from sqlalchemy import inspect
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_payment_reconcile_index'
+down_revision = 'add_payment_queue'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    """
+    `flask payments reconcile` pages with "WHERE status = 'pending' AND created_at < cutoff
+    AND (created_at, id) > cursor ORDER BY created_at, id LIMIT n", a range scan of this index.
+    """
+    inspector = inspect(op.get_context().bind)
+    existing = {ix['name'] for ix in inspector.get_indexes('payment_attempts')}
+    if 'ix_payment_attempts_status_created_at_id' not in existing:
+        op.create_index('ix_payment_attempts_status_created_at_id', 'payment_attempts',
+                        ['status', 'created_at', 'id'])
+
+
+def downgrade():
+    op.drop_index('ix_payment_attempts_status_created_at_id', table_name='payment_attempts')
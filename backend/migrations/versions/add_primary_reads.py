@@ -0,0 +1,36 @@
+"""Add primary_reads for read-your-writes with a read replica
+
+Revision ID: add_primary_reads
+Revises: add_order_events
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy import inspect
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_primary_reads'
+down_revision = 'add_order_events'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    """
+    A write stamps the user's row; GET routes marked @read_replica read from
+    the primary while the stamp is in the future, on whichever worker.
+    """
+    inspector = inspect(op.get_context().bind)
+    if 'primary_reads' in inspector.get_table_names():
+        return
+    op.create_table(
+        'primary_reads',
+        sa.Column('user_id', sa.Integer(), primary_key=True, autoincrement=False),
+        sa.Column('until', sa.DateTime(), nullable=False),
+    )
+
+
+def downgrade():
+    op.drop_table('primary_reads')
@@ -1,6 +1,9 @@
 #!/usr/bin/env python
 """
 Database seeding script - runs safely and idempotently
+
+Seeds a small demo dataset with the same generator as `flask seed`; use that
+command directly for benchmark-sized data.
 """
 import os
 import sys
@@ -9,7 +12,8 @@ import sys
 sys.path.insert(0, os.path.dirname(__file__))
 
 from app import create_app, db
-from app.models import User, Flower, Order, OrderItem
+from app.models import User
+from app.seeding import PASSWORD, generate
 
 def seed_database():
     """Seed the database with initial data"""
@@ -25,43 +29,9 @@ def seed_database():
             return
         
         print("Seeding database...")
-        
-        # Create sample users
-        buyer = User(
-            name="Test Buyer",
-            email="buyer@example.com",
-            password_hash="hashed_password",
-            role="buyer"
-        )
-        
-        florist = User(
-            name="Test Florist",
-            email="florist@example.com",
-            password_hash="hashed_password",
-            role="florist",
-            shop_name="Beautiful Blooms",
-            shop_address="123 Flower Street",
-            shop_contact="+254712345678"
-        )
-        
-        db.session.add(buyer)
-        db.session.add(florist)
-        db.session.commit()
-        
-        # Create sample flowers
-        flower = Flower(
-            name="Red Roses",
-            description="Beautiful red roses",
-            price=2500,
-            category="Roses",
-            florist_id=florist.id,
-            stock_status="in_stock"
-        )
-        
-        db.session.add(flower)
-        db.session.commit()
-        
-        print("Database seeded successfully!")
+        counts = generate(buyers=20, florists=5, flowers=60, orders=200)
+        print(", ".join(f"{table} {count}" for table, count in counts.items()))
+        print(f"Database seeded successfully! Log in as florist1@seed.local or buyer6@seed.local / {PASSWORD}")
 
 if __name__ == "__main__":
     seed_database()
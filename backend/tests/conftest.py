@@ -0,0 +1,137 @@
+from collections import Counter
+from contextlib import contextmanager
+
+import pytest
+from flask_jwt_extended import create_access_token
+from sqlalchemy import event
+
+from app import create_app, db
+from app.cache import bump_catalog_version, catalog_cache
+from app.models import User, Flower, Order
+from app.search import install_search_index
+from app.users import user_cache
+
+
+@pytest.fixture
+def app_config():
+    """Extra config for the app fixture; override in a test module"""
+    return {}
+
+
+@pytest.fixture
+def app(tmp_path, app_config):
+    app = create_app({
+        "TESTING": True,
+        "SQLALCHEMY_DATABASE_URI": f"sqlite:///{tmp_path / 'test.db'}",
+        "UPLOAD_FOLDER": str(tmp_path / "uploads"),
+        "IMAGE_WORKERS": 0,
+        "PASSWORD_HASH_WORKERS": 0,
+        "PASSWORD_HASH_METHOD": "pbkdf2:sha256:1000",  # cheap hashes keep the suite fast
+        "PAYMENT_DISPATCH": "worker",  # tests drain the payment queue explicitly
+        "ORDER_EVENTS_POLL_INTERVAL": 0.05,
+        "ORDER_EVENTS_HEARTBEAT": 1,
+        **app_config,
+    })
+    catalog_cache.clear()
+    user_cache.clear()
+    with app.app_context():
+        db.create_all()
+        with db.engine.begin() as connection:
+            install_search_index(connection)
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def make_user(app):
+    def _make_user(email, role="buyer", **fields):
+        user = User(name=fields.pop("name", email.split("@")[0]), email=email, role=role, **fields)
+        user.set_password("password123")
+        db.session.add(user)
+        db.session.commit()
+        return user
+    return _make_user
+
+
+@pytest.fixture
+def make_flowers(app):
+    def _make_flowers(florist, count, **fields):
+        flowers = [
+            Flower(
+                name=f"Flower {i}",
+                price=fields.get("price", 100 + i),
+                description=f"Lovely flower number {i}",
+                image_url=f"flower_{i}.jpg",
+                stock_status=fields.get("stock_status", "in_stock"),
+                florist_id=florist.id,
+            )
+            for i in range(count)
+        ]
+        db.session.add_all(flowers)
+        bump_catalog_version()
+        db.session.commit()
+        return flowers
+    return _make_flowers
+
+
+@pytest.fixture
+def make_order(app):
+    def _make_order(buyer, total=1500, **fields):
+        order = Order(buyer_id=buyer.id, buyer_name=buyer.name, buyer_email=buyer.email,
+                      buyer_phone="0712345678", delivery_address="Westlands, Nairobi",
+                      total_price=total, **fields)
+        db.session.add(order)
+        db.session.commit()
+        return order
+    return _make_order
+
+
+@pytest.fixture
+def auth_headers(app):
+    def _auth_headers(user):
+        return {"Authorization": f"Bearer {create_access_token(identity=str(user.id))}"}
+    return _auth_headers
+
+
+@pytest.fixture
+def count_queries(app):
+    """Context manager counting the SQL statements executed inside it."""
+    class _Counter:
+        def __init__(self):
+            self.statements = []
+
+        def _record(self, conn, cursor, statement, parameters, context, executemany):
+            self.statements.append(statement)
+
+        def __enter__(self):
+            event.listen(db.engine, "before_cursor_execute", self._record)
+            return self
+
+        def __exit__(self, *exc):
+            event.remove(db.engine, "before_cursor_execute", self._record)
+
+        @property
+        def count(self):
+            return len(self.statements)
+
+    return _Counter
+
+
+@pytest.fixture
+def query_budget(count_queries):
+    """Context manager failing the test when the block runs more than ``limit`` SQL statements."""
+    @contextmanager
+    def _query_budget(limit):
+        with count_queries() as counter:
+            yield counter
+        if counter.count > limit:
+            repeated = "\n".join(f"  {times}x {' '.join(statement.split())[:200]}"
+                                 for statement, times in Counter(counter.statements).most_common(5))
+            pytest.fail(f"{counter.count} queries, over the budget of {limit}. Most repeated:\n{repeated}")
+    return _query_budget
@@ -0,0 +1,54 @@
+from app import db
+from app.models import User
+from app.passwords import hash_password, needs_rehash, verify_password
+
+
+def _login(client, email, password):
+    return client.post("/api/auth/login", json={"email": email, "password": password})
+
+
+def test_register_then_login(client):
+    response = client.post("/api/auth/register", json={
+        "name": "Wanjiru", "email": "wanjiru@example.com", "password": "s3cret!", "role": "buyer",
+    })
+    assert response.status_code == 201
+
+    assert _login(client, "wanjiru@example.com", "s3cret!").status_code == 200
+    assert _login(client, "wanjiru@example.com", "wrong").status_code == 401
+    assert _login(client, "nobody@example.com", "s3cret!").status_code == 401
+
+
+def test_login_upgrades_hash_made_with_old_cost(app, client, make_user):
+    app.config["PASSWORD_HASH_METHOD"] = "pbkdf2:sha256:500"
+    user = make_user("legacy@example.com")
+    old_hash = user.password_hash
+    assert old_hash.startswith("pbkdf2:sha256:500$")
+
+    app.config["PASSWORD_HASH_METHOD"] = "pbkdf2:sha256:1000"
+    assert user.password_needs_rehash()
+
+    # A failed login leaves the hash alone
+    assert _login(client, "legacy@example.com", "wrong").status_code == 401
+    assert db.session.get(User, user.id).password_hash == old_hash
+
+    assert _login(client, "legacy@example.com", "password123").status_code == 200
+    db.session.expire_all()
+    upgraded = db.session.get(User, user.id)
+    assert upgraded.password_hash.startswith("pbkdf2:sha256:1000$")
+    assert not upgraded.password_needs_rehash()
+    assert _login(client, "legacy@example.com", "password123").status_code == 200
+
+
+def test_defaulted_parameters_do_not_trigger_rehash(app):
+    app.config["PASSWORD_HASH_METHOD"] = "scrypt"
+    assert not needs_rehash("scrypt:32768:8:1$salt$hash")
+    assert needs_rehash("scrypt:16384:8:1$salt$hash")
+    assert needs_rehash("pbkdf2:sha256:600000$salt$hash")
+
+
+def test_hashing_in_worker_processes(app):
+    app.config["PASSWORD_HASH_WORKERS"] = 1
+    pwhash = hash_password("password123")
+    assert pwhash.startswith("pbkdf2:sha256:1000$")
+    assert verify_password(pwhash, "password123")
+    assert not verify_password(pwhash, "password124")
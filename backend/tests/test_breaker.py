@@ -0,0 +1,98 @@
+import time
+
+import pytest
+from sqlalchemy import create_engine
+
+from app.breaker import CLOSED, OPEN, CircuitOpenError, install_breaker
+
+
+@pytest.fixture
+def outage(tmp_path):
+    """An engine whose database directory is missing until restore() creates it"""
+    folder = tmp_path / "down"
+    engine = create_engine(f"sqlite:///{folder / 'db.sqlite'}")
+    breaker = install_breaker(engine, "test", {"DB_BREAKER_FAILURES": 2, "DB_BREAKER_RESET_SECONDS": 0.05})
+    yield engine, breaker, folder.mkdir
+    breaker.reset()
+    engine.dispose()
+
+
+def _connect(engine):
+    with engine.connect() as connection:
+        return connection.exec_driver_sql("SELECT 1").scalar()
+
+
+def test_opens_after_consecutive_failures_and_fails_fast(outage, monkeypatch):
+    engine, breaker, _ = outage
+    monkeypatch.setattr(breaker, "reset_seconds", 60)  # no probe during this test
+    for _ in range(2):
+        with pytest.raises(Exception) as failed:
+            _connect(engine)
+        assert not isinstance(failed.value, CircuitOpenError)
+
+    assert breaker.state == OPEN
+    started = time.perf_counter()
+    with pytest.raises(CircuitOpenError):
+        _connect(engine)
+    assert time.perf_counter() - started < 0.05
+    assert breaker.stats()["consecutive_failures"] == 2
+    assert "unable to open database file" in breaker.stats()["last_error"]
+
+
+def test_background_probe_closes_it_once_the_database_is_back(outage):
+    engine, breaker, restore = outage
+    for _ in range(2):
+        with pytest.raises(Exception):
+            _connect(engine)
+    restore()
+
+    deadline = time.monotonic() + 2
+    while breaker.state != CLOSED and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert breaker.state == CLOSED
+    assert _connect(engine) == 1
+
+
+def test_readiness_reports_only_states(app, client):
+    ready = client.get("/")
+    assert ready.status_code == 200
+    body = ready.get_json()
+    assert body["status"] == "online"
+    assert body["database"]["status"] == "ok"
+    assert body["database"]["breaker"] == "closed"
+    assert set(body["database"]) == {"status", "breaker", "latency_ms"}
+
+    breaker = app.extensions["db_breakers"]["primary"]
+    breaker.reset_seconds = 60
+    for _ in range(breaker.failure_threshold):
+        breaker.record_failure(ConnectionError("connection refused"))
+    try:
+        from app import db
+        db.session.remove()
+        db.engine.dispose()  # drop pooled connections so requests have to connect
+
+        down = client.get("/")
+        assert down.status_code == 503
+        assert down.get_json()["database"] == {"status": "unavailable", "breaker": "open"}
+        assert "connection refused" not in down.get_data(as_text=True)
+        flowers = client.get("/api/flowers")
+        assert flowers.status_code == 503
+        assert flowers.headers["Retry-After"] == "60"
+    finally:
+        breaker.reset()
+    assert client.get("/").status_code == 200
+
+
+def test_readiness_logs_errors_instead_of_returning_them(app, client, capsys, monkeypatch):
+    from app import db
+
+    def refuse(*args, **kwargs):
+        raise ConnectionError("could not connect to server at db.internal as user flowers")
+
+    monkeypatch.setattr(db.engine, "connect", refuse)
+    down = client.get("/")
+
+    assert down.status_code == 503
+    assert down.get_json()["database"] == {"status": "error", "breaker": "closed"}
+    assert "db.internal" not in down.get_data(as_text=True)
+    assert "db.internal" in capsys.readouterr().err
@@ -0,0 +1,103 @@
+import gzip
+import json
+import os
+
+import pytest
+from flask import Response
+
+from app import compression
+
+brotli_only = pytest.mark.skipif(compression.brotli is None, reason="Brotli not installed")
+
+
+@pytest.fixture
+def routes(app):
+    """Plain, streamed and SSE responses of a known body"""
+    body = json.dumps([{"id": i, "name": f"Flower {i}"} for i in range(2000)]).encode()
+    app.add_url_rule("/t/body", "t_body", lambda: Response(body, mimetype="application/json"))
+    app.add_url_rule("/t/small", "t_small", lambda: Response(b'{"ok": true}', mimetype="application/json"))
+    app.add_url_rule("/t/streamed", "t_streamed",
+                     lambda: Response(iter([body[:1000], body[1000:]]), mimetype="application/json"))
+    app.add_url_rule("/t/events", "t_events", lambda: Response(iter([b"data: 1\n\n"]), mimetype="text/event-stream"))
+    return body
+
+
+def _decode(response):
+    encoding = response.headers.get("Content-Encoding")
+    data = response.get_data()
+    if encoding == "br":
+        return compression.brotli.decompress(data)
+    return gzip.decompress(data) if encoding == "gzip" else data
+
+
+@brotli_only
+def test_negotiates_brotli_then_gzip(client, routes):
+    both = client.get("/t/body", headers={"Accept-Encoding": "gzip, deflate, br"})
+    gzip_only = client.get("/t/body", headers={"Accept-Encoding": "gzip"})
+    prefers_gzip = client.get("/t/body", headers={"Accept-Encoding": "br;q=0.5, gzip"})
+    identity = client.get("/t/body")
+
+    assert both.headers["Content-Encoding"] == "br"
+    assert gzip_only.headers["Content-Encoding"] == "gzip"
+    assert prefers_gzip.headers["Content-Encoding"] == "gzip"
+    assert "Content-Encoding" not in identity.headers
+    for response in (both, gzip_only, prefers_gzip, identity):
+        assert "Accept-Encoding" in response.headers["Vary"]
+        assert _decode(response) == routes
+    assert int(both.headers["Content-Length"]) == len(both.get_data()) < len(routes) / 4
+
+
+def test_small_bodies_and_other_types_are_sent_as_is(app, client, routes):
+    headers = {"Accept-Encoding": "gzip, br"}
+    assert "Content-Encoding" not in client.get("/t/small", headers=headers).headers
+
+    events = client.get("/t/events", headers=headers)
+    assert "Content-Encoding" not in events.headers
+    assert events.get_data() == b"data: 1\n\n"
+
+    os.makedirs(app.config["UPLOAD_FOLDER"], exist_ok=True)
+    with open(os.path.join(app.config["UPLOAD_FOLDER"], "notes.txt"), "wb") as f:
+        f.write(b"roses " * 1000)
+    upload = client.get("/uploads/notes.txt", headers=headers)
+    assert "Content-Encoding" not in upload.headers
+    assert upload.get_data() == b"roses " * 1000
+
+
+def test_large_and_streamed_bodies_are_compressed_in_chunks(app, client, routes):
+    app.config["COMPRESS_STREAM_SIZE"] = 4096
+    for path in ("/t/body", "/t/streamed"):
+        response = client.get(path, headers={"Accept-Encoding": "gzip"})
+        assert response.is_streamed
+        assert "Content-Length" not in response.headers
+        assert response.headers["Content-Encoding"] == "gzip"
+        assert gzip.decompress(response.get_data()) == routes
+
+
+def test_catalog_compressed_once_per_version(app, client, make_user, make_flowers, monkeypatch):
+    calls = []
+    real_compress = compression.compress
+    monkeypatch.setattr("app.cache.compress", lambda *args: calls.append(args[1:]) or real_compress(*args))
+    florist = make_user("florist@example.com", role="florist")
+    make_flowers(florist, 40)
+
+    first = client.get("/api/flowers", headers={"Accept-Encoding": "gzip"})
+    second = client.get("/api/flowers", headers={"Accept-Encoding": "gzip"})
+    revalidated = client.get("/api/flowers", headers={"Accept-Encoding": "gzip", "If-None-Match": first.headers["ETag"]})
+
+    assert calls == [("gzip", app.config["COMPRESS_CACHE_LEVEL"])]
+    assert first.get_data() == second.get_data()
+    assert first.headers["ETag"].endswith('-gzip"')
+    assert revalidated.status_code == 304
+    assert json.loads(gzip.decompress(first.get_data())) == client.get("/api/flowers").get_json()
+
+
+def test_order_history_is_compressed(client, make_user, make_order, auth_headers):
+    buyer = make_user("buyer@example.com")
+    for _ in range(30):
+        make_order(buyer)
+
+    plain = client.get("/api/orders/buyer", headers=auth_headers(buyer))
+    compressed = client.get("/api/orders/buyer", headers={**auth_headers(buyer), "Accept-Encoding": "gzip"})
+
+    assert compressed.headers["Content-Encoding"] == "gzip"
+    assert json.loads(gzip.decompress(compressed.get_data())) == plain.get_json()
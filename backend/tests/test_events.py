@@ -0,0 +1,133 @@
+import json
+import time
+
+import pytest
+from flask_jwt_extended import create_access_token
+
+from app import db
+from app.models import OrderItem, PaymentAttempt
+
+
+class _Stream:
+    """Reads an SSE response message by message, skipping keep-alive comments"""
+    def __init__(self, response):
+        self.response = response
+        self.chunks = iter(response.response)
+
+    def next_event(self):
+        for chunk in self.chunks:
+            text = chunk.decode()
+            if text.startswith("id:"):
+                fields = dict(line.split(": ", 1) for line in text.strip().splitlines())
+                return int(fields["id"]), json.loads(fields["data"])
+        raise AssertionError("stream ended")
+
+    def close(self):
+        self.response.close()
+
+
+@pytest.fixture
+def open_stream(client):
+    streams = []
+
+    def _open_stream(order_id, headers):
+        token = client.post(f"/api/orders/{order_id}/events/token", headers=headers).get_json()["token"]
+        response = client.get(f"/api/orders/{order_id}/events?jwt={token}", buffered=False)
+        assert response.status_code == 200, response.get_data(as_text=True)
+        assert response.mimetype == "text/event-stream"
+        streams.append(_Stream(response))
+        return streams[-1]
+    yield _open_stream
+    for stream in streams:
+        stream.close()
+
+
+def _token(user):
+    return create_access_token(identity=str(user.id))
+
+
+def test_stream_pushes_payment_and_status_changes(client, make_user, make_flowers, make_order,
+                                                  auth_headers, open_stream):
+    buyer = make_user("buyer@example.com")
+    florist = make_user("florist@example.com", role="florist")
+    flower = make_flowers(florist, 1)[0]
+    order = make_order(buyer)
+    db.session.add(OrderItem(order_id=order.id, flower_id=flower.id, florist_id=florist.id,
+                             flower_name=flower.name, florist_name=florist.name, quantity=1, unit_price=1500))
+    db.session.add(PaymentAttempt(order_id=order.id, checkout_request_id="ws_CO_1", amount=1500, status="pending"))
+    db.session.commit()
+    order_id = order.id
+
+    buyer_stream = open_stream(order_id, auth_headers(buyer))
+    florist_stream = open_stream(order_id, auth_headers(florist))
+    _, snapshot = buyer_stream.next_event()
+    assert snapshot == {"order_id": order_id, "status": "pending", "paid": False,
+                        "payment_status": "pending", "message": None}
+    florist_stream.next_event()
+
+    client.post("/api/payment/daraja/callback", json={"Body": {"stkCallback": {
+        "CheckoutRequestID": "ws_CO_1", "ResultCode": 0, "ResultDesc": "Processed"}}})
+    paid_id, paid = buyer_stream.next_event()
+    assert (paid["status"], paid["paid"], paid["payment_status"]) == ("paid", True, "succeeded")
+    assert florist_stream.next_event() == (paid_id, paid)
+
+    response = client.put(f"/api/orders/{order_id}/status", json={"status": "processing"},
+                          headers=auth_headers(florist))
+    assert response.status_code == 200
+    shipped_id, shipped = buyer_stream.next_event()
+    assert shipped_id > paid_id
+    assert (shipped["status"], shipped["paid"]) == ("processing", True)
+
+
+def test_stream_only_for_the_orders_buyer_and_florists(client, make_user, make_order, auth_headers):
+    buyer = make_user("buyer@example.com")
+    stranger = make_user("stranger@example.com")
+    order_id = make_order(buyer).id
+
+    def stream_token(user, order_id=order_id):
+        return client.post(f"/api/orders/{order_id}/events/token", headers=auth_headers(user))
+
+    assert stream_token(stranger).status_code == 403
+    assert stream_token(buyer, order_id + 1).status_code == 404
+    assert client.get(f"/api/orders/{order_id}/events").status_code == 401
+
+
+def test_stream_takes_only_its_own_short_lived_token(client, make_user, make_order, auth_headers):
+    buyer = make_user("buyer@example.com")
+    order_id, other_order_id = make_order(buyer).id, make_order(buyer).id
+    issued = client.post(f"/api/orders/{other_order_id}/events/token", headers=auth_headers(buyer)).get_json()
+    assert issued["expires_in"] == 60
+
+    # The login token never goes in the URL, and a stream token opens nothing else
+    assert client.get(f"/api/orders/{order_id}/events?jwt={_token(buyer)}").status_code == 403
+    assert client.get(f"/api/orders/{order_id}/events?jwt={issued['token']}").status_code == 403
+    assert client.get("/api/orders/buyer", headers={"Authorization": f"Bearer {issued['token']}"}).status_code == 403
+    assert client.get(f"/api/orders/{order_id}/events", headers=auth_headers(buyer)).status_code == 401
+
+
+def test_broker_survives_a_lost_listener_and_is_replaced_if_it_dies(app, monkeypatch):
+    from app import events
+
+    failures = []
+    real_wait = events.OrderEventBroker._wait
+
+    def flaky_wait(self, listener):
+        if not failures:
+            failures.append(listener)
+            raise OSError("server closed the connection unexpectedly")
+        real_wait(self, listener)
+
+    monkeypatch.setattr(events.OrderEventBroker, "_wait", flaky_wait)
+    broker = events.get_broker(app)
+    deadline = time.monotonic() + 2
+    while not failures and time.monotonic() < deadline:
+        time.sleep(0.01)
+    time.sleep(0.2)
+    assert failures and broker.thread.is_alive()
+    assert events.get_broker(app) is broker
+
+    broker.stop()
+    broker.thread.join(timeout=2)
+    replacement = events.get_broker(app)
+    assert replacement is not broker and replacement.thread.is_alive()
+    replacement.stop()
@@ -0,0 +1,188 @@
+from app.pagination import encode_cursor
+
+
+def _catalog_query_count(client, count_queries):
+    with count_queries() as counter:
+        response = client.get("/api/flowers")
+    assert response.status_code == 200
+    return counter.count, response.get_json()
+
+
+def test_catalog_lists_flowers_with_shop_name(client, make_user, make_flowers):
+    florist = make_user("florist@example.com", role="florist", name="Bloom Co")
+    make_flowers(florist, 2)
+
+    data = client.get("/api/flowers").get_json()
+
+    assert [f["name"] for f in data] == ["Flower 0", "Flower 1"]
+    assert data[0]["shop_name"] == "Bloom Co"
+    assert data[0]["florist_id"] == florist.id
+    assert data[0]["image_url"] == "http://localhost/uploads/flower_0.jpg"
+
+
+def test_catalog_query_count_does_not_grow_with_catalog_size(client, make_user, make_flowers, count_queries):
+    florists = [make_user(f"florist{i}@example.com", role="florist") for i in range(3)]
+    make_flowers(florists[0], 2)
+    small_count, small = _catalog_query_count(client, count_queries)
+
+    for florist in florists:
+        make_flowers(florist, 20)
+    large_count, large = _catalog_query_count(client, count_queries)
+
+    assert len(large) > len(small)
+    assert large_count == small_count
+
+
+def test_get_flower_uses_one_catalog_query(client, make_user, make_flowers, count_queries):
+    florist = make_user("florist@example.com", role="florist", name="Bloom Co")
+    flower_id = make_flowers(florist, 1)[0].id
+
+    with count_queries() as counter:
+        response = client.get(f"/api/flowers/{flower_id}")
+
+    assert response.status_code == 200
+    assert response.get_json()["shop_name"] == "Bloom Co"
+    assert counter.count == 2  # catalog version lookup + one joined SELECT
+
+
+def test_get_flower_not_found(client):
+    assert client.get("/api/flowers/999").status_code == 404
+
+
+def _walk_pages(client, query):
+    names, cursor = [], None
+    while True:
+        url = f"/api/flowers?{query}" + (f"&cursor={cursor}" if cursor else "")
+        page = client.get(url).get_json()
+        names.extend(f["name"] for f in page["items"])
+        cursor = page["next_cursor"]
+        if not cursor:
+            return names
+
+
+def test_catalog_keyset_pages_cover_every_flower_once(client, make_user, make_flowers):
+    florist = make_user("florist@example.com", role="florist")
+    make_flowers(florist, 7)
+
+    names = _walk_pages(client, "limit=3")
+
+    assert names == [f"Flower {i}" for i in reversed(range(7))]
+
+
+def test_catalog_price_sort_pages_with_ties(client, make_user, make_flowers):
+    florist = make_user("florist@example.com", role="florist")
+    make_flowers(florist, 5, price=50)
+    make_flowers(florist, 2, price=10)
+
+    page = client.get("/api/flowers?limit=100&sort=price_asc").get_json()
+    walked = _walk_pages(client, "limit=2&sort=price_asc")
+
+    assert walked == [f["name"] for f in page["items"]]
+    assert [f["price"] for f in page["items"]] == [10] * 2 + [50] * 5
+
+
+def test_catalog_filters(client, make_user, make_flowers):
+    alice = make_user("alice@example.com", role="florist")
+    bob = make_user("bob@example.com", role="florist")
+    make_flowers(alice, 5)
+    make_flowers(bob, 3, stock_status="out_of_stock")
+
+    by_florist = client.get(f"/api/flowers?florist_id={bob.id}&limit=50").get_json()["items"]
+    by_price = client.get("/api/flowers?min_price=101&max_price=103").get_json()
+    by_stock = client.get("/api/flowers?stock_status=in_stock").get_json()
+
+    assert {f["florist_id"] for f in by_florist} == {bob.id}
+    assert len(by_florist) == 3
+    assert sorted(f["price"] for f in by_price) == [101, 101, 102, 102, 103]
+    assert len(by_stock) == 5
+
+
+def test_catalog_rejects_bad_page_parameters(client):
+    assert client.get("/api/flowers?cursor=not-a-cursor").status_code == 400
+    assert client.get("/api/flowers?limit=abc").status_code == 400
+    assert client.get("/api/flowers?sort=random").status_code == 400
+
+
+def test_catalog_rejects_cursor_values_of_the_wrong_type(client, make_user, make_flowers):
+    make_flowers(make_user("florist@example.com", role="florist"), 3)
+    crafted = [("price_asc", [{}, 1]), ("price_asc", [100, "1"]), ("price_asc", [100, True]),
+               ("newest", [[1]]), ("newest", [1.5]), ("oldest", [None])]
+    for sort, values in crafted:
+        assert client.get(f"/api/flowers?sort={sort}&cursor={encode_cursor(values)}").status_code == 400
+
+    page = client.get(f"/api/flowers?sort=price_asc&cursor={encode_cursor([100, 0])}").get_json()
+    assert len(page["items"]) == 3
+    assert client.get("/api/flowers?min_price=cheap").status_code == 400
+
+
+def test_catalog_served_from_cache_until_a_write(client, make_user, make_flowers, auth_headers, count_queries):
+    florist = make_user("florist@example.com", role="florist")
+    make_flowers(florist, 3)
+    headers = auth_headers(florist)
+
+    first = client.get("/api/flowers")
+    with count_queries() as counter:
+        second = client.get("/api/flowers")
+
+    assert second.get_data() == first.get_data()
+    assert counter.count == 1  # only the catalog version lookup
+
+    client.post("/api/flowers", json={"name": "Tulip", "price": 90, "image_url": "tulip.jpg"}, headers=headers)
+    third = client.get("/api/flowers")
+
+    assert third.headers["ETag"] != first.headers["ETag"]
+    assert "Tulip" in [f["name"] for f in third.get_json()]
+
+
+def test_catalog_cache_ignores_unknown_query_parameters(client, make_user, make_flowers):
+    from app.cache import catalog_cache
+
+    make_flowers(make_user("florist@example.com", role="florist"), 3)
+    plain = client.get("/api/flowers")
+    for n in range(5):
+        junk = client.get(f"/api/flowers?junk={n}")
+        assert junk.get_data() == plain.get_data()
+        assert junk.headers["ETag"] == plain.headers["ETag"]
+    client.get("/api/flowers?sort=newest&limit=2")
+    client.get("/api/flowers?limit=2&sort=newest&utm_source=x")
+
+    assert len(catalog_cache._entries) == 2
+
+
+def test_if_none_match_star_does_not_revalidate_a_missing_flower(client, make_user, make_flowers):
+    flower_id = make_flowers(make_user("florist@example.com", role="florist"), 1)[0].id
+
+    assert client.get("/api/flowers/999", headers={"If-None-Match": "*"}).status_code == 404
+    assert client.get(f"/api/flowers/{flower_id}", headers={"If-None-Match": "*"}).status_code == 304
+
+
+def test_catalog_revalidates_with_etag_and_last_modified(client, make_user, make_flowers, auth_headers):
+    florist = make_user("florist@example.com", role="florist")
+    flower_id = make_flowers(florist, 1)[0].id
+
+    first = client.get(f"/api/flowers/{flower_id}")
+    etag, last_modified = first.headers["ETag"], first.headers["Last-Modified"]
+
+    assert client.get(f"/api/flowers/{flower_id}", headers={"If-None-Match": etag}).status_code == 304
+    assert client.get(f"/api/flowers/{flower_id}", headers={"If-Modified-Since": last_modified}).status_code == 304
+
+    client.put(f"/api/flowers/{flower_id}", json={"price": 500}, headers=auth_headers(florist))
+    changed = client.get(f"/api/flowers/{flower_id}", headers={"If-None-Match": etag})
+
+    assert changed.status_code == 200
+    assert changed.get_json()["price"] == 500
+
+
+def test_catalog_serves_precompressed_gzip(client, make_user, make_flowers):
+    import gzip
+    import json
+
+    florist = make_user("florist@example.com", role="florist")
+    make_flowers(florist, 5)
+
+    plain = client.get("/api/flowers")
+    compressed = client.get("/api/flowers", headers={"Accept-Encoding": "gzip"})
+
+    assert compressed.headers["Content-Encoding"] == "gzip"
+    assert "Accept-Encoding" in compressed.headers["Vary"]
+    assert json.loads(gzip.decompress(compressed.get_data())) == plain.get_json()
@@ -0,0 +1,72 @@
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+from sqlalchemy import text
+
+from app import db
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _load_config(**env):
+    """Import gunicorn_config.py in a fresh interpreter and return what it decided"""
+    env = {key: value for key, value in os.environ.items()
+           if not key.startswith(("GUNICORN_", "DB_", "WEB_CONCURRENCY", "PAYMENT_"))} | env
+    code = ("import json, os, gunicorn_config as c; print(json.dumps({'workers': c.workers, 'worker_class': "
+            "c.worker_class, 'threads': c.threads, 'pool': os.environ['DB_POOL_SIZE'], "
+            "'overflow': os.environ['DB_MAX_OVERFLOW']}))")
+    result = subprocess.run([sys.executable, "-c", code], cwd=BACKEND, env=env, capture_output=True, text=True)
+    if result.returncode:
+        raise RuntimeError(result.stderr)
+    return json.loads(result.stdout)
+
+
+def test_profiles_size_the_pool_to_the_request_slots():
+    # Each worker also runs 4 payment dispatcher threads and the events broker (2 connections)
+    sync = _load_config(GUNICORN_PROFILE="sync", WEB_CONCURRENCY="3")
+    gthread = _load_config(GUNICORN_PROFILE="gthread", WEB_CONCURRENCY="3", GUNICORN_THREADS="6")
+    gevent = _load_config(GUNICORN_PROFILE="gevent", WEB_CONCURRENCY="3", PAYMENT_DISPATCH="worker")
+
+    assert (sync["worker_class"], sync["threads"], sync["pool"], sync["overflow"]) == ("sync", 1, "7", "0")
+    assert (gthread["threads"], gthread["pool"]) == (6, "12")
+    assert (gevent["worker_class"], gevent["pool"]) == ("gevent", "12")
+
+
+def test_pool_is_capped_by_the_database_connection_limit():
+    config = _load_config(GUNICORN_PROFILE="gthread", WEB_CONCURRENCY="10", DB_MAX_CONNECTIONS="60")
+    assert config["pool"] == "6"
+    assert _load_config(GUNICORN_PROFILE="gthread", DB_POOL_SIZE="3")["pool"] == "3"
+
+
+def test_unknown_profile_is_rejected():
+    with pytest.raises(RuntimeError, match="GUNICORN_PROFILE must be one of"):
+        _load_config(GUNICORN_PROFILE="eventlet")
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="needs os.fork")
+def test_forked_child_does_not_reuse_parent_connections(app):
+    db.session.execute(text("SELECT 1"))
+    db.session.commit()
+    assert db.engine.pool.checkedin() == 1
+
+    read_end, write_end = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        try:
+            inherited = db.engine.pool.checkedin()
+            with db.engine.connect() as connection:
+                connection.execute(text("SELECT 1"))
+            os.write(write_end, str(inherited).encode())
+        finally:
+            os._exit(0)
+    os.close(write_end)
+    inherited = os.read(read_end, 16).decode()
+    os.waitpid(pid, 0)
+
+    assert inherited == "0"
+    # The parent's connection is still open and usable
+    assert db.engine.pool.checkedin() == 1
+    assert db.session.execute(text("SELECT 1")).scalar() == 1
@@ -0,0 +1,98 @@
+import io
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from PIL import Image
+
+from app import images
+from app.images import generate_variants, schedule_variants, variants_ready
+
+
+def _png(colour, size=(1600, 1200)):
+    buffer = io.BytesIO()
+    Image.new("RGB", size, colour).save(buffer, "PNG")
+    return buffer.getvalue()
+
+
+def _upload(client, headers, data, filename="photo.png"):
+    return client.post("/api/flowers", data={
+        "name": "Rose", "price": "100", "image_file": (io.BytesIO(data), filename),
+    }, headers=headers, content_type="multipart/form-data")
+
+
+def test_uploads_are_stored_once_per_content(app, client, make_user, auth_headers):
+    headers = auth_headers(make_user("florist@example.com", role="florist"))
+    red, blue = _png("red"), _png("blue")
+
+    _upload(client, headers, red, "photo.png")
+    _upload(client, headers, blue, "photo.png")
+    _upload(client, headers, red, "copy-of-red.png")
+
+    originals = sorted(f for f in os.listdir(app.config["UPLOAD_FOLDER"]) if "_" not in f)
+    image_urls = [f["image_url"] for f in client.get("/api/flowers").get_json()]
+
+    assert len(originals) == 2
+    assert image_urls[0] == image_urls[2] != image_urls[1]
+    assert image_urls[0].endswith(".png") and "photo" not in image_urls[0]
+
+
+def test_catalog_exposes_resized_variants(app, client, make_user, auth_headers):
+    headers = auth_headers(make_user("florist@example.com", role="florist"))
+    _upload(client, headers, _png("green"))
+
+    flower = client.get("/api/flowers").get_json()[0]
+    variants = flower["image_variants"]
+
+    assert set(variants) == {"thumb", "card", "detail"}
+    for name, longest in (("thumb", 200), ("card", 600), ("detail", 1200)):
+        path = os.path.join(app.config["UPLOAD_FOLDER"], variants[name].rsplit("/", 1)[1])
+        with Image.open(path) as image:
+            assert max(image.size) == longest
+
+
+def test_variants_generated_on_worker_pool(app, make_user):
+    app.config["IMAGE_WORKERS"] = 2
+    folder = app.config["UPLOAD_FOLDER"]
+    os.makedirs(folder)
+    filename = "a" * 64 + ".png"
+    with open(os.path.join(folder, filename), "wb") as f:
+        f.write(_png("white", size=(300, 300)))
+
+    schedule_variants(app, filename).result(timeout=10)
+
+    assert os.path.exists(os.path.join(folder, "a" * 64 + "_thumb.jpg"))
+    assert generate_variants(os.path.join(folder, filename)) is False  # idempotent
+
+
+def test_concurrent_generation_of_one_photo_leaves_whole_files(tmp_path):
+    filename = "b" * 64 + ".png"
+    (tmp_path / filename).write_bytes(_png("red", size=(800, 600)))
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        list(pool.map(generate_variants, [str(tmp_path / filename)] * 8))
+
+    variants = ["b" * 64 + f"_{name}.jpg" for name in ("card", "detail", "thumb")]
+    assert sorted(os.listdir(tmp_path)) == sorted([filename] + variants)
+    with Image.open(tmp_path / ("b" * 64 + "_detail.jpg")) as image:
+        assert image.size == (800, 600)
+
+
+def test_ready_digests_are_bounded(tmp_path, monkeypatch):
+    monkeypatch.setattr(images, "READY_DIGESTS_MAX", 2)
+    monkeypatch.setattr(images, "_ready_digests", images.OrderedDict())
+    for digest in ("c" * 64, "d" * 64, "e" * 64):
+        (tmp_path / f"{digest}_detail.jpg").write_bytes(b"")
+        assert variants_ready(f"{digest}.png", str(tmp_path))
+
+    assert list(images._ready_digests) == ["d" * 64, "e" * 64]
+
+
+def test_external_image_urls_have_no_variants(client, make_user, auth_headers):
+    headers = auth_headers(make_user("florist@example.com", role="florist"))
+    client.post("/api/flowers", json={"name": "Rose", "price": 1, "image_url": "https://cdn.example.com/rose.jpg"},
+                headers=headers)
+
+    flower = client.get("/api/flowers").get_json()[0]
+
+    assert flower["image_url"] == "https://cdn.example.com/rose.jpg"
+    assert flower["image_variants"] is None
@@ -0,0 +1,96 @@
+import pytest
+from prometheus_client import REGISTRY
+
+from app import create_app
+
+SCRAPE = {"Authorization": "Bearer scrape-token"}
+
+
+@pytest.fixture
+def app_config():
+    return {"METRICS_TOKEN": "scrape-token"}
+
+
+def _sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+
+def test_requests_are_recorded_per_route_template(client, make_user, auth_headers):
+    buyer = make_user("buyer@example.com")
+    route = "/api/orders/<int:order_id>/events/token"
+    before = _sample("http_requests_total", method="POST", route=route, status="404")
+    observed = _sample("http_request_duration_seconds_count", method="POST", route=route)
+
+    for order_id in (101, 102, 103):
+        assert client.post(f"/api/orders/{order_id}/events/token", headers=auth_headers(buyer)).status_code == 404
+
+    assert _sample("http_requests_total", method="POST", route=route, status="404") == before + 3
+    assert _sample("http_request_duration_seconds_count", method="POST", route=route) == observed + 3
+    assert _sample("http_requests_in_progress", method="POST", route=route) == 0
+
+
+def test_unknown_paths_share_one_label(client):
+    before = _sample("http_requests_total", method="GET", route="<unmatched>", status="404")
+    client.get("/wp-login.php")
+    client.get("/.env")
+    assert _sample("http_requests_total", method="GET", route="<unmatched>", status="404") == before + 2
+
+
+def test_metrics_endpoint_serves_prometheus_text(client):
+    client.get("/")
+    response = client.get("/metrics", headers=SCRAPE)
+    assert response.status_code == 200
+    assert response.content_type.startswith("text/plain")
+    body = response.get_data(as_text=True)
+    assert 'http_requests_total{method="GET",route="/",status="200"}' in body
+    assert "http_request_duration_seconds_bucket" in body
+
+
+def test_metrics_report_connection_pool_usage(app, client):
+    from app import db
+
+    client.get("/")
+    body = client.get("/metrics", headers=SCRAPE).get_data(as_text=True)
+    assert f'db_pool_size{{database="primary"}} {float(db.engine.pool.size())}' in body
+    assert 'db_pool_checked_out{database="primary"}' in body
+    assert 'db_pool_overflow{database="primary"}' in body
+
+    with db.engine.connect():
+        client.get("/")  # its own connection comes back; the one held here is still out
+        assert _sample("db_pool_checked_out", database="primary") >= 1
+    client.get("/")
+    assert "db_pool" not in client.get("/").get_data(as_text=True)
+
+
+def test_metrics_endpoint_refuses_other_clients(client):
+    assert client.get("/metrics").status_code == 403  # loopback too: behind a local proxy it's everyone
+    remote = {"REMOTE_ADDR": "203.0.113.9"}
+    assert client.get("/metrics", environ_base=remote).status_code == 403
+    assert client.get("/metrics", environ_base=remote, headers={"Authorization": "Bearer guess"}).status_code == 403
+
+
+def test_metrics_path_token_and_networks_are_configurable(tmp_path):
+    app = create_app({"TESTING": True, "SQLALCHEMY_DATABASE_URI": f"sqlite:///{tmp_path / 'test.db'}",
+                      "METRICS_PATH": "/internal/metrics", "METRICS_TOKEN": "s3cret",
+                      "METRICS_ALLOWED_IPS": "10.0.0.0/8, not-an-ip"})
+    client = app.test_client()
+
+    assert client.get("/metrics").status_code == 404
+    assert client.get("/internal/metrics").status_code == 403
+    assert client.get("/internal/metrics", environ_base={"REMOTE_ADDR": "10.1.2.3"}).status_code == 200
+    assert client.get("/internal/metrics", headers={"Authorization": "Bearer s3cret"}).status_code == 200
+
+
+def test_proxied_scrapes_are_allowed_by_address_only_through_proxy_fix(tmp_path):
+    config = {"TESTING": True, "SQLALCHEMY_DATABASE_URI": f"sqlite:///{tmp_path / 'test.db'}",
+              "METRICS_ALLOWED_IPS": "127.0.0.1, 10.0.0.0/8"}
+    from_internet = {"X-Forwarded-For": "203.0.113.9"}
+    from_scraper = {"X-Forwarded-For": "10.1.2.3"}
+
+    unresolved = create_app(config).test_client()
+    assert unresolved.get("/metrics", headers=from_internet).status_code == 403
+    assert unresolved.get("/metrics", headers=from_scraper).status_code == 403
+
+    resolved = create_app({**config, "PROXY_FIX_X_FOR": 1}).test_client()
+    assert resolved.get("/metrics", headers=from_internet).status_code == 403
+    assert resolved.get("/metrics", headers=from_scraper).status_code == 200
@@ -0,0 +1,163 @@
+from app.models import Order, OrderItem
+from app.pagination import encode_cursor
+
+
+def _checkout(client, headers, items):
+    return client.post("/api/orders/create", json={
+        "buyer_name": "Jane Buyer",
+        "buyer_phone": "0712345678",
+        "delivery_address": "Kilimani, Nairobi",
+        "items": items,
+    }, headers=headers)
+
+
+def test_create_order_across_florists(client, make_user, make_flowers, auth_headers):
+    buyer = make_user("buyer@example.com")
+    alice = make_user("alice@example.com", role="florist", shop_name="Alice Blooms")
+    bob = make_user("bob@example.com", role="florist")
+    rose = make_flowers(alice, 1, price=500)[0]
+    lily = make_flowers(bob, 1, price=300)[0]
+
+    response = _checkout(client, auth_headers(buyer), [
+        {"flower_id": rose.id, "quantity": 2},
+        {"flower_id": lily.id, "quantity": 1},
+    ])
+
+    assert response.status_code == 201
+    order = Order.query.get(response.get_json()["order_id"])
+    assert order.total_price == 1300
+    assert sorted((i.florist_name, i.quantity, i.unit_price) for i in order.items) == [
+        ("Alice Blooms", 2, 500), ("bob", 1, 300)
+    ]
+
+
+def test_create_order_query_count_is_constant(client, make_user, make_flowers, auth_headers, count_queries):
+    buyer = make_user("buyer@example.com")
+    headers = auth_headers(buyer)
+    florists = [make_user(f"florist{i}@example.com", role="florist") for i in range(5)]
+    flower_ids = [f.id for florist in florists for f in make_flowers(florist, 8)]
+    client.get("/api/orders/buyer", headers=headers)  # caches the user behind the token
+
+    with count_queries() as small:
+        assert _checkout(client, headers, [{"flower_id": flower_ids[0]}]).status_code == 201
+    with count_queries() as large:
+        assert _checkout(client, headers, [{"flower_id": fid, "quantity": 2} for fid in flower_ids]).status_code == 201
+
+    assert large.count == small.count
+    assert OrderItem.query.count() == 1 + len(flower_ids)
+
+
+def test_create_order_reports_every_unavailable_flower(client, make_user, make_flowers, auth_headers):
+    headers = auth_headers(make_user("buyer@example.com"))
+    florist = make_user("florist@example.com", role="florist")
+    available = make_flowers(florist, 1)[0].id
+    sold_out = [f.id for f in make_flowers(florist, 2, stock_status="out_of_stock")]
+
+    missing = _checkout(client, headers, [{"flower_id": available}, {"flower_id": 998}, {"flower_id": 999}])
+    unavailable = _checkout(client, headers, [{"flower_id": available}] + [{"flower_id": fid} for fid in sold_out])
+    invalid = _checkout(client, headers, [{"flower_id": available, "quantity": 0}])
+
+    assert missing.status_code == 404
+    assert missing.get_json()["missing"] == [998, 999]
+    assert unavailable.status_code == 409
+    assert unavailable.get_json()["out_of_stock"] == sold_out
+    assert invalid.status_code == 400
+    assert Order.query.count() == 0
+
+
+def _order_for(client, headers, flowers):
+    return _checkout(client, headers, [{"flower_id": f.id, "quantity": 1} for f in flowers])
+
+
+def test_florist_inbox_lists_only_own_items(client, make_user, make_flowers, auth_headers):
+    buyer = make_user("buyer@example.com")
+    alice = make_user("alice@example.com", role="florist")
+    bob = make_user("bob@example.com", role="florist")
+    alice_rose, = make_flowers(alice, 1, price=500)
+    bob_lily, = make_flowers(bob, 1, price=300)
+    _order_for(client, auth_headers(buyer), [alice_rose, bob_lily])
+
+    inbox = client.get("/api/orders/florist/inbox", headers=auth_headers(alice)).get_json()
+    legacy = client.get("/api/orders/florist", headers=auth_headers(bob)).get_json()
+
+    assert [i["flower_name"] for i in inbox["items"][0]["items"]] == [alice_rose.name]
+    assert inbox["items"][0]["florist_total"] == 500
+    assert inbox["items"][0]["total_price"] == 800
+    assert [i["flower_name"] for i in legacy[0]["items"]] == [bob_lily.name]
+
+
+def test_florist_inbox_pages_filters_and_counts(app, client, make_user, make_flowers, auth_headers, count_queries):
+    from app import db
+    from app.models import Order
+
+    buyer = make_user("buyer@example.com")
+    florist = make_user("florist@example.com", role="florist")
+    headers = auth_headers(florist)
+    flowers = make_flowers(florist, 2)
+    for _ in range(7):
+        _order_for(client, auth_headers(buyer), flowers)
+    orders = Order.query.order_by(Order.id).all()
+    orders[0].status, orders[0].paid = "paid", True
+    orders[1].status = "delivered"
+    db.session.commit()
+    client.get("/api/orders/florist/inbox", headers=headers)  # caches the user behind the token
+
+    seen, cursor = [], None
+    while True:
+        url = "/api/orders/florist/inbox?limit=3" + (f"&cursor={cursor}" if cursor else "")
+        with count_queries() as counter:
+            page = client.get(url, headers=headers).get_json()
+        assert counter.count == 3  # counts, page of orders, their items
+        seen.extend(o["id"] for o in page["items"])
+        cursor = page["next_cursor"]
+        if not cursor:
+            break
+
+    pending = client.get("/api/orders/florist/inbox?status=pending", headers=headers).get_json()
+    paid = client.get("/api/orders/florist/inbox?paid=true", headers=headers).get_json()
+
+    assert seen == [o.id for o in reversed(orders)]
+    assert page["counts"]["pending"] == 5
+    assert page["counts"]["delivered"] == 1
+    assert len(pending["items"]) == 5
+    assert [o["id"] for o in paid["items"]] == [orders[0].id]
+    assert paid["counts"] == {"pending": 0, "paid": 1, "processing": 0, "delivered": 0, "failed": 0}
+    assert page["totals"]["pending"] == 5 * (flowers[0].price + flowers[1].price)
+
+
+def test_florist_inbox_rejects_bad_parameters(client, make_user, auth_headers):
+    headers = auth_headers(make_user("florist@example.com", role="florist"))
+
+    assert client.get("/api/orders/florist/inbox?paid=maybe", headers=headers).status_code == 400
+    assert client.get("/api/orders/florist/inbox?cursor=abc", headers=headers).status_code == 400
+    for values in ([{}, 1], ["2026-01-01T00:00:00", "1"], ["yesterday", 1], [1, 1]):
+        url = f"/api/orders/florist/inbox?cursor={encode_cursor(values)}"
+        assert client.get(url, headers=headers).status_code == 400
+
+
+def test_buyer_history_pages_with_fixed_query_count(client, make_user, make_flowers, auth_headers, count_queries):
+    buyer = make_user("buyer@example.com")
+    headers = auth_headers(buyer)
+    florist = make_user("florist@example.com", role="florist")
+    flowers = make_flowers(florist, 3)
+    for n in range(1, 8):
+        _order_for(client, headers, flowers[: 1 + n % 3])
+    other = make_user("other@example.com")
+    _order_for(client, auth_headers(other), flowers)
+
+    pages, cursor = [], None
+    while True:
+        url = "/api/orders/buyer?limit=3" + (f"&cursor={cursor}" if cursor else "")
+        with count_queries() as counter:
+            page = client.get(url, headers=headers).get_json()
+        assert counter.count == 2  # one page of orders, one batched select of their items
+        pages.append(page["items"])
+        cursor = page["next_cursor"]
+        if not cursor:
+            break
+
+    legacy = client.get("/api/orders/buyer", headers=headers).get_json()
+
+    assert [len(p) for p in pages] == [3, 3, 1]
+    assert [o["id"] for p in pages for o in p] == [o["id"] for o in legacy]
+    assert [len(o["items"]) for o in legacy] == [1 + n % 3 for n in reversed(range(1, 8))]
@@ -0,0 +1,301 @@
+from datetime import datetime
+
+import pytest
+import requests
+from urllib3.exceptions import MaxRetryError, NewConnectionError
+
+from app import db
+from app.models import Order, OrderEvent, PaymentAttempt
+from app import payment_queue
+from app.payment import DarajaPayment, TOKEN_REFRESH_MARGIN, daraja
+from app.payment_queue import process_queued_pushes
+
+
+@pytest.fixture(autouse=True)
+def mock_daraja(monkeypatch):
+    monkeypatch.setattr(daraja, "mock_mode", True)
+
+
+def _callback(client, checkout_id, result_code=0, receipt="QK12ABC345"):
+    callback = {"CheckoutRequestID": checkout_id, "ResultCode": result_code, "ResultDesc": "Processed"}
+    if result_code == 0:
+        callback["CallbackMetadata"] = {"Item": [
+            {"Name": "Amount", "Value": 1500},
+            {"Name": "MpesaReceiptNumber", "Value": receipt},
+        ]}
+    return client.post("/api/payment/daraja/callback", json={"Body": {"stkCallback": callback}})
+
+
+def _initialize(client, headers, order_id):
+    """Queue a push, run the dispatcher, return the CheckoutRequestID it got"""
+    response = client.post("/api/payment/daraja/initialize", json={"order_id": order_id}, headers=headers)
+    assert response.status_code == 202, response.get_json()
+    process_queued_pushes(client.application)
+    status = client.get(f"/api/payment/daraja/check-status/{order_id}", headers=headers).get_json()
+    assert status["payment_attempt"]["id"] == response.get_json()["attempt_id"]
+    return status["payment_attempt"]["checkout_request_id"]
+
+
+def test_initialize_records_a_pending_attempt(client, make_user, make_order, auth_headers):
+    buyer = make_user("buyer@example.com")
+    headers = auth_headers(buyer)
+    order_id = make_order(buyer).id
+
+    first = _initialize(client, headers, order_id)
+    second = _initialize(client, headers, order_id)
+
+    assert first != second
+    attempts = PaymentAttempt.query.filter_by(order_id=order_id).all()
+    assert sorted(a.checkout_request_id for a in attempts) == sorted([first, second])
+    assert {a.status for a in attempts} == {"pending"}
+    assert Order.query.get(order_id).pesapal_reference == second
+
+
+def test_initialize_returns_before_the_push_is_sent(client, make_user, make_order, auth_headers, monkeypatch):
+    buyer = make_user("buyer@example.com")
+    headers = auth_headers(buyer)
+    order_id = make_order(buyer).id
+    outcomes = [{"success": False, "error": "Connection refused", "reached": False},
+                {"success": True, "CheckoutRequestID": "ws_CO_RETRIED"}]
+    monkeypatch.setattr(daraja, "trigger_stk_push", lambda *args: outcomes.pop(0))
+    monkeypatch.setattr(payment_queue, "RETRY_BACKOFF", 0)
+
+    queued = client.post("/api/payment/daraja/initialize", json={"order_id": order_id}, headers=headers)
+    again = client.post("/api/payment/daraja/initialize", json={"order_id": order_id}, headers=headers)
+
+    assert queued.status_code == again.status_code == 202
+    assert queued.get_json()["attempt_id"] == again.get_json()["attempt_id"]
+    assert queued.get_json()["status"] == "queued"
+
+    def progress():
+        return client.get(f"/api/payment/daraja/check-status/{order_id}", headers=headers).get_json()["payment_attempt"]
+
+    assert progress()["status"] == "queued"
+    # The first push never reaches Daraja, so the job is retried rather than failed
+    assert process_queued_pushes(client.application) == 2
+    attempt = progress()
+    assert (attempt["status"], attempt["tries"], attempt["checkout_request_id"]) == ("pending", 2, "ws_CO_RETRIED")
+    assert Order.query.get(order_id).pesapal_reference == "ws_CO_RETRIED"
+
+
+def test_concurrent_initialize_queues_one_push(client, make_user, make_order, auth_headers, monkeypatch):
+    buyer = make_user("buyer@example.com")
+    order = make_order(buyer)
+    # The other request's attempt commits after this one checked for an in-flight push
+    first = payment_queue.enqueue_stk_push(order)
+    db.session.commit()
+    checks = [None]
+    real_check = payment_queue.in_flight_attempt
+    monkeypatch.setattr("app.routes.payment.in_flight_attempt",
+                        lambda order_id: checks.pop() if checks else real_check(order_id))
+
+    racing = client.post("/api/payment/daraja/initialize", json={"order_id": order.id}, headers=auth_headers(buyer))
+
+    assert racing.status_code == 202
+    assert racing.get_json()["attempt_id"] == first.id
+    assert PaymentAttempt.query.filter_by(order_id=order.id).count() == 1
+
+
+def test_no_transaction_is_open_while_the_push_is_in_flight(client, make_user, make_order, auth_headers,
+                                                            monkeypatch):
+    buyer = make_user("buyer@example.com")
+    order_id = make_order(buyer).id
+    during_push = []
+
+    def push(*args):
+        during_push.append(db.session().in_transaction())
+        return {"success": True, "CheckoutRequestID": "ws_CO_SHORT"}
+
+    monkeypatch.setattr(daraja, "trigger_stk_push", push)
+    client.post("/api/payment/daraja/initialize", json={"order_id": order_id}, headers=auth_headers(buyer))
+    process_queued_pushes(client.application)
+
+    assert during_push == [False]
+    assert PaymentAttempt.query.filter_by(order_id=order_id).one().status == "pending"
+
+
+def test_rejected_and_interrupted_pushes_are_reported(client, make_user, make_order, auth_headers, monkeypatch):
+    buyer = make_user("buyer@example.com")
+    headers = auth_headers(buyer)
+    rejected, interrupted = make_order(buyer).id, make_order(buyer).id
+    monkeypatch.setattr(daraja, "trigger_stk_push", lambda *args: {
+        "success": False, "CustomerMessage": "Invalid phone number", "raw_response": {"ResponseCode": "1"}})
+
+    client.post("/api/payment/daraja/initialize", json={"order_id": rejected}, headers=headers)
+    process_queued_pushes(client.application)
+    client.post("/api/payment/daraja/initialize", json={"order_id": interrupted}, headers=headers)
+    PaymentAttempt.query.filter_by(order_id=interrupted).update({"status": "sending", "claimed_at": datetime(2020, 1, 1)})
+    db.session.commit()
+    monkeypatch.setattr(payment_queue, "_last_expiry", 0.0)
+    process_queued_pushes(client.application)
+
+    def progress(order_id):
+        return client.get(f"/api/payment/daraja/check-status/{order_id}", headers=headers).get_json()["payment_attempt"]
+
+    failed = progress(rejected)
+    assert (failed["status"], failed["error"]) == ("error", "Invalid phone number")
+    assert progress(interrupted)["status"] == "error"
+    event = OrderEvent.query.filter_by(order_id=interrupted).order_by(OrderEvent.id.desc()).first()
+    assert (event.payment_status, event.message) == ("error", "Payment request was interrupted, please try again")
+    # A fresh attempt can be started after an error
+    retry = client.post("/api/payment/daraja/initialize", json={"order_id": rejected}, headers=headers)
+    assert retry.get_json()["attempt_id"] != failed["id"]
+    assert retry.get_json()["status"] == "queued"
+
+
+def test_callback_marks_order_paid_once(client, make_user, make_order, auth_headers, count_queries):
+    buyer = make_user("buyer@example.com")
+    order_id = make_order(buyer).id
+    checkout_id = _initialize(client, auth_headers(buyer), order_id)
+
+    first = _callback(client, checkout_id)
+    assert first.status_code == 200
+    assert first.get_json()["duplicate"] is False
+    assert first.get_json()["status"] == "paid"
+    attempt = PaymentAttempt.query.filter_by(checkout_request_id=checkout_id).one()
+    assert (attempt.status, attempt.mpesa_receipt) == ("succeeded", "QK12ABC345")
+    paid_at = Order.query.get(order_id).updated_at
+    db.session.remove()
+
+    with count_queries() as replay:
+        again = _callback(client, checkout_id)
+    assert again.status_code == 200
+    assert again.get_json()["duplicate"] is True
+    assert not any(s.lstrip().upper().startswith(("UPDATE", "INSERT")) for s in replay.statements)
+    assert Order.query.get(order_id).updated_at == paid_at
+
+
+def test_late_failure_does_not_undo_payment(client, make_user, make_order, auth_headers):
+    buyer = make_user("buyer@example.com")
+    headers = auth_headers(buyer)
+    order_id = make_order(buyer).id
+    paid = _initialize(client, headers, order_id)
+    abandoned = _initialize(client, headers, order_id)
+
+    assert _callback(client, paid).get_json()["status"] == "paid"
+    late = _callback(client, abandoned, result_code=1032)
+
+    assert late.get_json()["duplicate"] is False
+    order = Order.query.get(order_id)
+    assert (order.paid, order.status) == (True, "paid")
+    assert PaymentAttempt.query.filter_by(checkout_request_id=abandoned).one().status == "failed"
+
+
+def test_callback_adopts_legacy_reference(client, make_user, make_order):
+    buyer = make_user("buyer@example.com")
+    order_id = make_order(buyer, pesapal_reference="ws_CO_LEGACY").id
+
+    assert _callback(client, "ws_CO_LEGACY", result_code=1032).get_json()["status"] == "failed"
+    assert _callback(client, "ws_CO_LEGACY").get_json()["duplicate"] is True
+    assert Order.query.get(order_id).status == "failed"
+    assert _callback(client, "ws_CO_UNKNOWN").status_code == 404
+
+
+class _Response:
+    def __init__(self, status_code, body):
+        self.status_code = status_code
+        self._body = body
+
+    def json(self):
+        return self._body
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise RuntimeError(f"HTTP {self.status_code}")
+
+
+class _FakeDarajaSession:
+    """Stands in for the pooled requests.Session; revokes tokens on demand"""
+    def __init__(self, expires_in=3599):
+        self.expires_in = expires_in
+        self.issued = []
+        self.revoked = set()
+        self.posts = 0
+        self.post_error = None  # raised by post() when set
+
+    def get(self, url, auth, timeout):
+        self.issued.append(f"token-{len(self.issued)}")
+        return _Response(200, {"access_token": self.issued[-1], "expires_in": str(self.expires_in)})
+
+    def post(self, url, json, headers, timeout):
+        self.posts += 1
+        if self.post_error is not None:
+            raise self.post_error
+        if headers["Authorization"].removeprefix("Bearer ") in self.revoked:
+            return _Response(401, {"errorMessage": "Invalid Access Token"})
+        return _Response(200, {"ResponseCode": "0", "CheckoutRequestID": "ws_CO_1", "CustomerMessage": "ok"})
+
+
+@pytest.fixture
+def live_client(monkeypatch, tmp_path):
+    """DarajaPayment with credentials configured, talking to a fake session"""
+    for name, value in {"DARAJA_KEY": "key", "DARAJA_SECRET": "secret", "DARAJA_PASSKEY": "pass",
+                        "DARAJA_SHORTCODE": "174379", "DARAJA_TOKEN_CACHE": str(tmp_path / "token.json")}.items():
+        monkeypatch.setenv(name, value)
+    session = _FakeDarajaSession()
+
+    def _live_client():
+        client = DarajaPayment()
+        client._get_session = lambda: session
+        return client
+    _live_client.session = session
+    return _live_client
+
+
+def test_access_token_is_shared_until_near_expiry(live_client):
+    first, second = live_client(), live_client()
+
+    assert first.trigger_stk_push("0712345678", 100, 1)["success"]
+    assert first.trigger_stk_push("0712345678", 100, 2)["success"]
+    assert second.trigger_stk_push("0712345678", 100, 3)["success"]
+    assert live_client.session.issued == ["token-0"]
+
+
+def test_access_token_is_refreshed_before_expiry(live_client):
+    first, second = live_client(), live_client()
+    live_client.session.expires_in = TOKEN_REFRESH_MARGIN - 1
+
+    assert first.get_access_token() == "token-0"
+    assert second.get_access_token() == "token-1"
+
+    live_client.session.expires_in = 3599
+    assert first.get_access_token() == "token-2"
+    assert second.get_access_token() == "token-2"
+
+
+def test_revoked_token_is_refreshed_once(live_client):
+    client = live_client()
+    assert client.get_access_token() == "token-0"
+    live_client.session.revoked.add("token-0")
+
+    assert client.trigger_stk_push("0712345678", 100, 1)["success"]
+    assert live_client.session.issued == ["token-0", "token-1"]
+
+
+def test_push_that_may_have_reached_daraja_is_not_resent(client, make_user, make_order, auth_headers, live_client,
+                                                        monkeypatch):
+    buyer = make_user("buyer@example.com")
+    headers = auth_headers(buyer)
+    monkeypatch.setattr(daraja, "trigger_stk_push", live_client().trigger_stk_push)
+    monkeypatch.setattr(payment_queue, "RETRY_BACKOFF", 0)
+    session = live_client.session
+
+    refused = requests.exceptions.ConnectionError(MaxRetryError(None, "/", NewConnectionError(None, "refused")))
+    session.post_error = refused
+    order_id = make_order(buyer).id
+    client.post("/api/payment/daraja/initialize", json={"order_id": order_id}, headers=headers)
+    process_queued_pushes(client.application, limit=1)
+    # Refused before connecting: queued again
+    assert PaymentAttempt.query.filter_by(order_id=order_id).one().status == "queued"
+
+    session.post_error = requests.exceptions.ReadTimeout("Read timed out")
+    process_queued_pushes(client.application)
+    attempt = PaymentAttempt.query.filter_by(order_id=order_id).one()
+    assert (attempt.status, attempt.tries, session.posts) == ("error", 2, 2)
+
+    session.post_error = None
+    session.revoked.update(f"token-{i}" for i in range(5))  # every push answered 401, then an HTTP error
+    rejected = make_order(buyer).id
+    client.post("/api/payment/daraja/initialize", json={"order_id": rejected}, headers=headers)
+    process_queued_pushes(client.application)
+    assert PaymentAttempt.query.filter_by(order_id=rejected).one().status == "error"
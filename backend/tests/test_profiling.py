@@ -0,0 +1,97 @@
+import logging
+
+import pytest
+
+from app import db
+from app.models import Flower, User
+
+
+@pytest.fixture
+def profiled_app(app):
+    app.config.update(SQL_REPEAT_THRESHOLD=3)
+
+    @app.route("/test/florists")
+    def florists_one_by_one():
+        # The N+1 shape: one lookup per flower
+        return {"florists": [db.session.get(User, f.florist_id).email for f in Flower.query.all()]}
+
+    return app
+
+
+def test_repeated_statement_is_reported_as_n_plus_one(profiled_app, make_user, make_flowers, caplog):
+    for i in range(4):
+        make_flowers(make_user(f"florist{i}@example.com", role="florist"), 1)
+    db.session.expunge_all()  # make every get() hit the database
+
+    with caplog.at_level(logging.WARNING, logger="app.profiling"):
+        assert profiled_app.test_client().get("/test/florists").status_code == 200
+
+    warnings = [r.getMessage() for r in caplog.records if "[N+1]" in r.getMessage()]
+    assert len(warnings) == 1
+    assert "GET /test/florists ran the same statement 4 times" in warnings[0]
+
+
+def test_slow_queries_are_logged_with_their_plan(app, client, make_user, make_flowers, caplog):
+    make_flowers(make_user("florist@example.com", role="florist"), 3)
+    app.config["SQL_SLOW_QUERY_MS"] = 0
+
+    with caplog.at_level(logging.WARNING, logger="app.profiling"):
+        assert client.get("/api/flowers").status_code == 200
+
+    slow = [r.getMessage() for r in caplog.records if "[SLOW] GET /api/flowers" in r.getMessage()]
+    assert slow
+    assert any("plan:\n" in message and ("SCAN" in message or "SEARCH" in message) for message in slow)
+
+
+def test_slow_writes_are_logged_without_their_parameters(app, client, caplog):
+    app.config["SQL_SLOW_QUERY_MS"] = 0
+
+    with caplog.at_level(logging.WARNING, logger="app.profiling"):
+        assert client.post("/api/auth/register", json={"name": "Jane", "email": "jane@example.com",
+                                                       "password": "hunter22", "role": "buyer"}).status_code == 201
+
+    messages = [r.getMessage() for r in caplog.records if "[SLOW]" in r.getMessage()]
+    inserts = [message for message in messages if "INSERT INTO users" in message]
+    assert inserts
+    assert all("parameters: (redacted)" in message for message in inserts)
+    assert not any("pbkdf2" in message for message in inserts)
+    assert any("parameters: (redacted)" not in message for message in messages)  # SELECTs keep theirs
+
+
+def test_profile_headers(app, client, make_user, make_flowers):
+    make_flowers(make_user("florist@example.com", role="florist"), 3)
+    assert "X-DB-Queries" not in client.get("/api/flowers").headers
+
+    app.config["SQL_PROFILE_HEADERS"] = True
+    response = app.test_client().get("/api/flowers?limit=2")
+    assert int(response.headers["X-DB-Queries"]) >= 1
+    assert response.headers["Server-Timing"].startswith("db;dur=")
+
+
+def test_hot_routes_stay_within_query_budgets(client, make_user, make_flowers, make_order, auth_headers,
+                                               query_budget):
+    buyer = make_user("buyer@example.com")
+    florists = [make_user(f"florist{i}@example.com", role="florist") for i in range(5)]
+    for florist in florists:
+        make_flowers(florist, 6)
+    for _ in range(10):
+        make_order(buyer)
+    buyer_headers, florist_headers = auth_headers(buyer), auth_headers(florists[0])
+
+    with query_budget(2):
+        assert client.get("/api/flowers").status_code == 200
+    with query_budget(3):
+        assert client.get("/api/orders/buyer", headers=buyer_headers).status_code == 200
+    with query_budget(3):
+        assert client.get("/api/orders/florist", headers=florist_headers).status_code == 200
+    with query_budget(3):
+        assert client.get("/api/flowers/florist/my-flowers", headers=florist_headers).status_code == 200
+
+
+def test_query_budget_fails_with_the_repeated_statements(make_user, query_budget):
+    user = make_user("buyer@example.com")
+    with pytest.raises(pytest.fail.Exception, match=r"3 queries, over the budget of 2(.|\n)*3x SELECT"):
+        with query_budget(2):
+            for _ in range(3):
+                db.session.expire(user)
+                user.email
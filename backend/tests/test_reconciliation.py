@@ -0,0 +1,72 @@
+from datetime import datetime, timedelta
+
+from app import db
+from app.models import Order, PaymentAttempt
+from app.payment import daraja
+from app.reconciliation import reconcile_pending
+
+# CheckoutRequestID -> what the STK query reports
+FATES = {
+    "ws_CO_PAID": {"done": True, "ResultCode": 0, "ResultDesc": "The service request is processed successfully."},
+    "ws_CO_CANCELLED": {"done": True, "ResultCode": 1032, "ResultDesc": "Request cancelled by user"},
+    "ws_CO_WAITING": {"done": False, "error": "The transaction is being processed"},
+}
+
+
+def _pending_attempt(order, checkout_id, age):
+    attempt = PaymentAttempt(order_id=order.id, checkout_request_id=checkout_id, amount=order.total_price,
+                             status="pending", created_at=datetime.utcnow() - timedelta(seconds=age))
+    db.session.add(attempt)
+    db.session.commit()
+    return attempt
+
+
+def test_reconcile_settles_old_pending_attempts(app, make_user, make_order, monkeypatch):
+    buyer = make_user("buyer@example.com")
+    orders = {checkout_id: make_order(buyer) for checkout_id in [*FATES, "ws_CO_RECENT"]}
+    for checkout_id, order in orders.items():
+        _pending_attempt(order, checkout_id, age=30 if checkout_id == "ws_CO_RECENT" else 600)
+    queried = []
+    monkeypatch.setattr(daraja, "query_stk_status", lambda checkout_id: queried.append(checkout_id) or FATES[checkout_id])
+
+    stats = reconcile_pending(app, older_than=120, concurrency=2, rate=0, batch_size=2)
+
+    assert sorted(queried) == sorted(FATES)
+    assert stats == {"checked": 3, "paid": 1, "failed": 1, "unresolved": 1, "already_settled": 0}
+    status = {checkout_id: (db.session.get(Order, order.id).status,
+                            PaymentAttempt.query.filter_by(checkout_request_id=checkout_id).one().status)
+              for checkout_id, order in orders.items()}
+    assert status == {
+        "ws_CO_PAID": ("paid", "succeeded"),
+        "ws_CO_CANCELLED": ("failed", "failed"),
+        "ws_CO_WAITING": ("pending", "pending"),
+        "ws_CO_RECENT": ("pending", "pending"),
+    }
+
+
+def test_reconcile_and_callback_settle_once(app, client, make_user, make_order, monkeypatch):
+    buyer = make_user("buyer@example.com")
+    order_id = make_order(buyer).id
+    _pending_attempt(db.session.get(Order, order_id), "ws_CO_PAID", age=600)
+
+    def query_then_callback(checkout_id):
+        # The late callback lands while the reconciler is waiting on Daraja
+        client.post("/api/payment/daraja/callback", json={"Body": {"stkCallback": {
+            "CheckoutRequestID": checkout_id, "ResultCode": 1032, "ResultDesc": "Request cancelled by user"}}})
+        return FATES["ws_CO_PAID"]
+    monkeypatch.setattr(daraja, "query_stk_status", query_then_callback)
+
+    stats = reconcile_pending(app, older_than=120, concurrency=1, rate=0)
+
+    assert stats["already_settled"] == 1
+    db.session.expire_all()
+    assert db.session.get(Order, order_id).status == "failed"
+
+
+def test_reconcile_command_refuses_to_run_without_credentials(app, monkeypatch):
+    monkeypatch.setattr(daraja, "mock_mode", True)
+
+    result = app.test_cli_runner().invoke(args=["payments", "reconcile"])
+
+    assert result.exit_code != 0
+    assert "Daraja credentials are not set" in result.output
@@ -0,0 +1,96 @@
+import shutil
+from datetime import datetime
+
+import pytest
+
+from app import create_app, db
+from app.cache import bump_catalog_version
+from app.models import PrimaryRead
+
+
+@pytest.fixture
+def app_config(tmp_path):
+    return {"SQLALCHEMY_REPLICA_URI": f"sqlite:///{tmp_path / 'replica.db'}"}
+
+
+@pytest.fixture
+def replicate(app, tmp_path):
+    """Copy the primary to the replica: a replica that has caught up to this point"""
+    def _replicate():
+        db.session.commit()
+        app.extensions["replica"].dispose()
+        shutil.copyfile(tmp_path / "test.db", tmp_path / "replica.db")
+    return _replicate
+
+
+@pytest.fixture
+def other_worker(app):
+    """A second app instance on the same databases, standing in for another gunicorn worker"""
+    return create_app({name: app.config[name] for name in (
+        "TESTING", "SQLALCHEMY_DATABASE_URI", "SQLALCHEMY_REPLICA_URI", "UPLOAD_FOLDER", "IMAGE_WORKERS",
+        "PASSWORD_HASH_WORKERS", "PAYMENT_DISPATCH")})
+
+
+def _expire_windows():
+    PrimaryRead.query.update({"until": datetime(2020, 1, 1)})
+    db.session.commit()
+
+
+def test_reads_go_to_the_replica_and_writers_stick_to_the_primary(client, make_user, make_flowers, auth_headers,
+                                                                 replicate, other_worker):
+    florist = make_user("florist@example.com", role="florist")
+    flower = make_flowers(florist, 1, price=100)[0]
+    replicate()
+    flower.price = 200  # committed on the primary, not replicated yet
+    bump_catalog_version()
+    db.session.commit()
+
+    assert client.get(f"/api/flowers/{flower.id}").get_json()["price"] == 100
+    assert client.get("/api/flowers").get_json()[0]["price"] == 100
+
+    headers = auth_headers(florist)
+    assert client.put(f"/api/flowers/{flower.id}", json={"price": 300}, headers=headers).status_code == 200
+    # The florist reads their own write; an anonymous visitor still gets the replica
+    assert client.get(f"/api/flowers/{flower.id}", headers=headers).get_json()["price"] == 300
+    assert other_worker.test_client().get(f"/api/flowers/{flower.id}").get_json()["price"] == 100
+
+    _expire_windows()
+    assert client.get(f"/api/flowers/{flower.id}", headers=headers).get_json()["price"] == 100
+
+
+def test_read_your_writes_across_workers(client, make_user, make_flowers, auth_headers, replicate, other_worker):
+    buyer = make_user("buyer@example.com")
+    rose = make_flowers(make_user("florist@example.com", role="florist"), 1)[0]
+    replicate()
+    headers = auth_headers(buyer)
+
+    created = client.post("/api/orders/create", json={
+        "buyer_name": "Jane Buyer", "buyer_phone": "0712345678", "delivery_address": "Kilimani, Nairobi",
+        "items": [{"flower_id": rose.id, "quantity": 1}],
+    }, headers=headers)
+    assert created.status_code == 201
+
+    assert len(other_worker.test_client().get("/api/orders/buyer", headers=headers).get_json()) == 1
+    _expire_windows()
+    assert other_worker.test_client().get("/api/orders/buyer", headers=headers).get_json() == []
+
+
+def test_primary_window_is_written_outside_the_request_session(app, client, make_user, auth_headers):
+    from flask_jwt_extended import jwt_required
+
+    from app.models import Flower
+
+    florist = make_user("florist@example.com", role="florist")
+
+    @app.route("/t/unfinished", methods=["POST"])
+    @jwt_required()
+    def unfinished():
+        db.session.add(Flower(name="Draft", price=1, florist_id=florist.id))  # never committed
+        return {"ok": True}, 200
+
+    assert client.post("/t/unfinished", headers=auth_headers(florist)).status_code == 200
+
+    with db.engine.connect() as connection:
+        assert connection.execute(db.select(PrimaryRead.user_id)).scalars().all() == [florist.id]
+        assert connection.execute(db.select(Flower.id).where(Flower.name == "Draft")).first() is None
+    assert any(f.name == "Draft" for f in db.session.new)  # still pending, not rolled back
@@ -0,0 +1,91 @@
+from sqlalchemy import insert
+
+from app import db, search
+from app.models import Flower
+
+
+def _search(client, q):
+    response = client.get("/api/flowers/search", query_string={"q": q})
+    assert response.status_code == 200
+    return [f["name"] for f in response.get_json()["items"]]
+
+
+def _add(florist, name, description):
+    flower = Flower(name=name, description=description, price=100, florist_id=florist.id)
+    db.session.add(flower)
+    db.session.commit()
+    return flower
+
+
+def test_search_ranks_name_matches_first(client, make_user):
+    florist = make_user("florist@example.com", role="florist", shop_name="Petal House")
+    _add(florist, "Sunflower Bunch", "Pairs well with a red rose")
+    _add(florist, "Red Rose Bouquet", "A dozen long stems")
+
+    assert _search(client, "rose") == ["Red Rose Bouquet", "Sunflower Bunch"]
+
+
+def test_search_matches_prefixes_and_shop_name(client, make_user):
+    petal = make_user("petal@example.com", role="florist", shop_name="Petal House")
+    other = make_user("other@example.com", role="florist", shop_name="Nairobi Blooms")
+    _add(petal, "Lily Basket", "White lilies")
+    _add(other, "Orchid Pot", "Purple orchid")
+
+    assert _search(client, "li") == ["Lily Basket"]
+    assert _search(client, "petal") == ["Lily Basket"]
+    assert _search(client, "nairobi orch") == ["Orchid Pot"]
+
+
+def test_search_index_follows_updates_and_deletes(client, make_user, auth_headers):
+    florist = make_user("florist@example.com", role="florist")
+    headers = auth_headers(florist)
+    flower = _add(florist, "Tulip Vase", "Spring stems")
+    flower_id = flower.id
+
+    client.put(f"/api/flowers/{flower_id}", json={"name": "Peony Vase"}, headers=headers)
+    assert _search(client, "tulip vase") == []
+    assert _search(client, "peony") == ["Peony Vase"]
+
+    client.delete(f"/api/flowers/{flower_id}", headers=headers)
+    assert _search(client, "peony") == []
+
+
+def test_search_treats_operators_literally(client, make_user):
+    florist = make_user("florist@example.com", role="florist")
+    _add(florist, "Daisy Chain", "Field daisies")
+
+    assert _search(client, 'daisy" OR "x') == []
+    assert _search(client, "daisy*") == ["Daisy Chain"]
+    assert client.get("/api/flowers/search?q=%20").status_code == 400
+
+
+def test_old_name_match_outranks_many_newer_description_matches(client, make_user):
+    florist = make_user("florist@example.com", role="florist")
+    _add(florist, "Peony Crown", "Our first bouquet")
+    db.session.execute(insert(Flower), [
+        {"name": f"Bouquet {i}", "description": "Pairs well with a peony", "price": 100, "florist_id": florist.id}
+        for i in range(2100)  # more than the 2000 newest hits the ranking used to be limited to
+    ])
+    db.session.commit()
+
+    assert _search(client, "peony")[0] == "Peony Crown"
+
+
+def test_search_falls_back_to_like_on_other_databases(client, make_user, monkeypatch):
+    real_apply_search = search.apply_search
+    monkeypatch.setattr("app.routes.flowers.apply_search",
+                        lambda query, column, terms, dialect, limit: real_apply_search(
+                            query, column, terms, "mysql", limit))
+    petal = make_user("petal@example.com", role="florist", shop_name="Petal House")
+    other = make_user("other@example.com", role="florist", shop_name="Nairobi Blooms")
+    _add(petal, "Sunflower Bunch", "Pairs well with a red rose")
+    _add(petal, "Red Rose Bouquet", "A dozen long stems")
+    _add(other, "Orchid Pot", "Purple orchid")
+    _add(other, "Snap_dragon", "Tall spikes")
+
+    assert _search(client, "rose") == ["Red Rose Bouquet", "Sunflower Bunch"]
+    assert _search(client, "petal") == ["Red Rose Bouquet", "Sunflower Bunch"]
+    assert _search(client, "nairobi orch") == ["Orchid Pot"]
+    assert _search(client, "ose") == []
+    assert _search(client, "snap_") == ["Snap_dragon"]
+    assert _search(client, "s_ap") == []
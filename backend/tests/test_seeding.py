@@ -0,0 +1,49 @@
+from datetime import date
+
+from sqlalchemy import func, select
+
+from app import db
+from app.models import Flower, Order, OrderItem, PaymentAttempt, User
+from app.seeding import generate
+
+VOLUMES = {"buyers": 30, "florists": 4, "flowers": 40, "orders": 300}
+
+
+def _snapshot():
+    # Everything but the password hash, whose salt is random
+    return [db.session.execute(select(*(c for c in model.__table__.c if c.name != "password_hash"))
+                               .order_by(model.id)).all()
+            for model in (User, Flower, Order, OrderItem, PaymentAttempt)]
+
+
+def test_seed_command_generates_consistent_data(app):
+    result = app.test_cli_runner().invoke(args=["seed", "--buyers", "30", "--florists", "4", "--flowers", "40",
+                                                "--orders", "300", "--batch-size", "70"])
+
+    assert result.exit_code == 0, result.output
+    assert "orders 300" in result.output
+    assert Order.query.count() == 300
+    assert db.session.execute(select(func.count(func.distinct(OrderItem.order_id)))).scalar() == 300
+    mismatched = db.session.execute(
+        select(Order.id).join(OrderItem).group_by(Order.id)
+        .having(func.abs(Order.total_price - func.sum(OrderItem.quantity * OrderItem.unit_price)) > 0.01)
+    ).all()
+    assert mismatched == []
+    paid = db.session.execute(select(Order.paid, PaymentAttempt.status).join(PaymentAttempt)).all()
+    assert all(status == "succeeded" for is_paid, status in paid if is_paid)
+    assert {status for _, status in paid} == {"succeeded", "failed", "pending"}
+    assert User.query.filter_by(email="buyer5@seed.local").one().check_password("password123")
+
+
+def test_same_seed_generates_the_same_rows(app):
+    generate(**VOLUMES, seed=7, until=date(2026, 1, 31))
+    first = _snapshot()
+    db.drop_all()
+    db.create_all()
+    generate(**VOLUMES, seed=7, until=date(2026, 1, 31))
+    assert _snapshot() == first
+
+    # Another run appends after the existing ids
+    generate(**VOLUMES, seed=8, until=date(2026, 1, 31))
+    assert Order.query.count() == 600
+    assert User.query.filter_by(email="florist35@seed.local").one().role == "florist"
@@ -0,0 +1,82 @@
+import json
+import uuid
+from datetime import datetime
+from decimal import Decimal
+
+import pytest
+from flask.json.provider import DefaultJSONProvider
+
+from app import json_provider, serializers
+from app.models import Flower, db
+
+SAMPLE = {
+    "zeta": [1, 2.5, None, True],
+    "alpha": {"when": datetime(2026, 3, 1, 12, 30), "price": Decimal("1500.50")},
+    "counts": {8: "eight", 7: "seven"},
+    "id": uuid.UUID("12345678-1234-5678-1234-567812345678"),
+    "name": "Maua ya Waridi 🌹",
+}
+
+
+@pytest.mark.skipif(json_provider.orjson is None, reason="orjson not installed")
+def test_orjson_output_matches_the_default_provider(app):
+    default = DefaultJSONProvider(app)
+    assert json.loads(app.json.dumps(SAMPLE)) == json.loads(default.dumps(SAMPLE))
+    assert list(json.loads(app.json.dumps({"b": 1, "a": 2}))) == ["a", "b"]
+    assert app.json.dumps({"big": 2 ** 70}) == default.dumps({"big": 2 ** 70})  # beyond orjson: stdlib
+
+    with app.test_request_context():
+        response = app.json.response(SAMPLE["alpha"])
+    assert response.mimetype == "application/json"
+    assert response.get_data().endswith(b"\n")
+    assert json.loads(response.get_data()) == json.loads(default.dumps(SAMPLE["alpha"]))
+    assert app.json.loads(b'{"a": [1, "\\u00e9"]}') == {"a": [1, "é"]}
+
+
+def test_stdlib_fallback_without_orjson(app, client, monkeypatch):
+    monkeypatch.setattr(json_provider, "orjson", None)
+    assert json.loads(app.json.dumps({"b": 1, "a": SAMPLE["alpha"]["when"]})) == {
+        "a": "Sun, 01 Mar 2026 12:30:00 GMT", "b": 1}
+    assert client.get("/").get_json()["status"] == "online"
+
+
+def test_invalid_json_body_is_still_a_bad_request(app):
+    @app.route("/test/echo", methods=["POST"])
+    def echo():
+        from flask import request
+        return request.get_json()
+
+    response = app.test_client().post("/test/echo", data="{not json", content_type="application/json")
+    assert response.status_code == 400
+
+
+def test_images_are_resolved_once_per_distinct_url(client, make_user, monkeypatch):
+    florist = make_user("florist@example.com", role="florist")
+    db.session.add_all([Flower(name=f"Rose {i}", price=100, florist_id=florist.id, stock_status="in_stock",
+                               image_url="shared.jpg" if i % 2 else f"own_{i}.jpg") for i in range(6)])
+    db.session.commit()
+    checked = []
+    real = serializers.variants_ready
+    monkeypatch.setattr(serializers, "variants_ready", lambda name, folder: checked.append(name) or real(name, folder))
+
+    flowers = client.get("/api/flowers").get_json()
+
+    assert len(flowers) == 6
+    assert sorted(checked) == ["own_0.jpg", "own_2.jpg", "own_4.jpg", "shared.jpg"]
+    assert {f["image_url"] for f in flowers if f["name"] in ("Rose 1", "Rose 3")} == {
+        "http://localhost/uploads/shared.jpg"}
+
+
+def test_my_flowers_reads_only_serialized_columns(client, make_user, make_flowers, auth_headers, count_queries):
+    florist = make_user("florist@example.com", role="florist")
+    make_flowers(florist, 3)
+    headers = auth_headers(florist)
+    client.get("/api/flowers/florist/my-flowers", headers=headers)  # caches the user behind the token
+
+    with count_queries() as counter:
+        flowers = client.get("/api/flowers/florist/my-flowers", headers=headers).get_json()
+
+    assert [f["name"] for f in flowers] == ["Flower 0", "Flower 1", "Flower 2"]
+    assert set(flowers[0]) == {"id", "name", "price", "image_url", "image_variants", "description", "stock_status"}
+    (statement,) = counter.statements
+    assert "user_id" not in statement and "created_at" not in statement
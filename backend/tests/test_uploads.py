@@ -0,0 +1,60 @@
+import os
+
+import pytest
+
+DIGEST = "b" * 64
+
+
+@pytest.fixture
+def stored(app):
+    folder = app.config["UPLOAD_FOLDER"]
+    os.makedirs(folder, exist_ok=True)
+    data = bytes(range(256)) * 40
+    for name in (f"{DIGEST}.jpg", "legacy.jpg"):
+        with open(os.path.join(folder, name), "wb") as f:
+            f.write(data)
+    return data
+
+
+def test_content_addressed_uploads_are_immutable(client, stored):
+    response = client.get(f"/uploads/{DIGEST}.jpg")
+
+    assert response.status_code == 200
+    assert response.get_data() == stored
+    assert response.headers["ETag"] == f'"{DIGEST}"'
+    assert "immutable" in response.headers["Cache-Control"]
+    assert "max-age=31536000" in response.headers["Cache-Control"]
+
+
+def test_legacy_uploads_are_not_immutable(client, stored):
+    response = client.get("/uploads/legacy.jpg")
+
+    assert response.status_code == 200
+    assert "immutable" not in response.headers["Cache-Control"]
+
+
+def test_range_and_conditional_requests(client, stored):
+    partial = client.get(f"/uploads/{DIGEST}.jpg", headers={"Range": "bytes=100-199"})
+    revalidated = client.get(f"/uploads/{DIGEST}.jpg", headers={"If-None-Match": f'"{DIGEST}"'})
+
+    assert partial.status_code == 206
+    assert partial.get_data() == stored[100:200]
+    assert partial.headers["Content-Range"] == f"bytes 100-199/{len(stored)}"
+    assert revalidated.status_code == 304
+
+
+def test_proxy_offload_modes(app, client, stored):
+    app.config["UPLOAD_SERVE_MODE"] = "x-accel"
+    accel = client.get(f"/uploads/{DIGEST}.jpg")
+    app.config["UPLOAD_SERVE_MODE"] = "x-sendfile"
+    sendfile = client.get(f"/uploads/{DIGEST}.jpg")
+
+    assert accel.headers["X-Accel-Redirect"] == f"/protected-uploads/{DIGEST}.jpg"
+    assert accel.get_data() == b""
+    assert sendfile.headers["X-Sendfile"] == os.path.join(app.config["UPLOAD_FOLDER"], f"{DIGEST}.jpg")
+    assert "immutable" in sendfile.headers["Cache-Control"]
+
+
+def test_missing_and_traversal_paths_are_404(client, stored):
+    assert client.get("/uploads/missing.jpg").status_code == 404
+    assert client.get("/uploads/../config.py").status_code == 404
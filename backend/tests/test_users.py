@@ -0,0 +1,84 @@
+from app import db
+from app.models import User
+
+
+def _user_lookups(statements):
+    return [s for s in statements if s.lstrip().upper().startswith("SELECT") and "FROM users" in s
+            and "JOIN" not in s]
+
+
+def test_user_loaded_once_then_served_from_cache(client, make_user, auth_headers, count_queries):
+    buyer = make_user("buyer@example.com")
+    headers = auth_headers(buyer)
+
+    with count_queries() as first:
+        assert client.get("/api/orders/buyer", headers=headers).status_code == 200
+    assert len(_user_lookups(first.statements)) == 1
+
+    with count_queries() as second:
+        assert client.get("/api/orders/buyer", headers=headers).status_code == 200
+    assert _user_lookups(second.statements) == []
+
+
+def test_cached_user_expires(app, client, make_user, auth_headers, count_queries):
+    app.config["USER_CACHE_TTL"] = 0
+    buyer = make_user("buyer@example.com")
+    headers = auth_headers(buyer)
+    for _ in range(2):
+        with count_queries() as counter:
+            client.get("/api/orders/buyer", headers=headers)
+        assert len(_user_lookups(counter.statements)) == 1
+
+
+def test_token_for_deleted_user_is_rejected(client, make_user, auth_headers):
+    buyer = make_user("gone@example.com")
+    headers = auth_headers(buyer)
+    db.session.delete(buyer)
+    db.session.commit()
+
+    response = client.get("/api/orders/buyer", headers=headers)
+    assert response.status_code == 401
+    assert response.get_json() == {"error": "User not found"}
+
+
+def test_shop_change_is_written_despite_a_stale_cached_florist(client, make_user, make_flowers, auth_headers):
+    florist = make_user("florist@example.com", role="florist", shop_name="A")
+    flower = make_flowers(florist, 1)[0]
+    headers = auth_headers(florist)
+    assert client.get("/api/flowers/florist/my-flowers", headers=headers).status_code == 200  # caches "A"
+    # Another worker renames the shop; this worker's cached user still says "A"
+    User.query.filter_by(id=florist.id).update({"shop_name": "B"})
+    db.session.commit()
+
+    response = client.put(f"/api/flowers/{flower.id}", headers=headers, data={"shop_name": "A"})
+    assert response.status_code == 200
+    db.session.expire_all()
+    assert db.session.get(User, florist.id).shop_name == "A"
+
+
+def test_shop_change_invalidates_cached_florist(client, make_user, make_flowers, auth_headers):
+    florist = make_user("florist@example.com", role="florist", shop_name="Old Name")
+    buyer = make_user("buyer@example.com")
+    flower = make_flowers(florist, 1)[0]
+    headers = auth_headers(florist)
+    # Warm the cache with the old shop name
+    assert client.get("/api/flowers/florist/my-flowers", headers=headers).status_code == 200
+
+    response = client.put(f"/api/flowers/{flower.id}", headers=headers,
+                          data={"name": "Renamed", "shop_name": "New Name"})
+    assert response.status_code == 200
+    db.session.expire_all()
+    assert db.session.get(User, florist.id).shop_name == "New Name"
+
+    # Switching back must be written too, whatever name the cached user holds
+    response = client.put(f"/api/flowers/{flower.id}", headers=headers,
+                          data={"name": "Renamed again", "shop_name": "Old Name"})
+    assert response.status_code == 200
+    db.session.expire_all()
+    assert db.session.get(User, florist.id).shop_name == "Old Name"
+
+    order = client.post("/api/orders/create", headers=auth_headers(buyer), json={
+        "buyer_name": "Buyer", "buyer_phone": "0712345678", "delivery_address": "Nairobi",
+        "items": [{"flower_id": flower.id, "quantity": 1}],
+    })
+    assert order.status_code == 201
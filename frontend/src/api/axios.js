@@ -42,8 +42,37 @@ async function request(method, endpoint, data = null) {
   } catch (error) { throw error; }
 }
 
+// EventSource cannot send headers, so each connection opens with a short-lived
+// token scoped to this stream (POST <endpoint>/token), never the login token.
+// listeners: { eventName: handler }. Returns { close }.
+function events(endpoint, listeners) {
+  const cleanEndpoint = endpoint.replace(/^\//, "");
+  let source = null;
+  let closed = false;
+
+  async function connect() {
+    const { data } = await request("POST", `${cleanEndpoint}/token`);
+    if (closed) return;
+    source = new EventSource(`${baseURL}/${cleanEndpoint}?jwt=${encodeURIComponent(data.token)}`);
+    Object.entries(listeners).forEach(([name, handler]) => source.addEventListener(name, handler));
+    // The server recycles streams; reconnecting with an expired token is refused, so fetch a new one
+    source.onerror = () => {
+      if (source.readyState === EventSource.CLOSED && !closed) connect().catch(() => {});
+    };
+  }
+
+  connect().catch((error) => console.error("Event stream error:", error));
+  return {
+    close: () => {
+      closed = true;
+      if (source) source.close();
+    },
+  };
+}
+
 const api = {
   get: (endpoint) => request("GET", endpoint),
+  events,
   post: (endpoint, data) => request("POST", endpoint, data),
   setAuthToken: (token) => token ? localStorage.setItem("token", token) : localStorage.removeItem("token")
 };
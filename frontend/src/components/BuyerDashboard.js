@@ -6,6 +6,7 @@ import { useCart } from "../context/CartContext";
 
 export default function BuyerDashboard({ user }) {
   const [orders, setOrders] = useState([]);
+  const [ordersCursor, setOrdersCursor] = useState(null);
   const [flowers, setFlowers] = useState([]);
   const [loading, setLoading] = useState(true);
   const [flowersLoading, setFlowersLoading] = useState(true);
@@ -19,10 +20,13 @@ export default function BuyerDashboard({ user }) {
     fetchFeaturedFlowers();
   }, []);
 
-  const fetchOrders = async () => {
+  // Order history is paginated newest-first so long histories stay fast
+  const fetchOrders = async (cursor = null) => {
     try {
-      const res = await api.get("orders/buyer");
-      setOrders(Array.isArray(res.data) ? res.data : []);
+      const res = await api.get(`orders/buyer?limit=10${cursor ? `&cursor=${encodeURIComponent(cursor)}` : ""}`);
+      const items = Array.isArray(res.data?.items) ? res.data.items : [];
+      setOrders((prev) => (cursor ? [...prev, ...items] : items));
+      setOrdersCursor(res.data?.next_cursor || null);
     } catch (err) {
       console.error("Failed to fetch orders:", err);
     } finally {
@@ -32,9 +36,9 @@ export default function BuyerDashboard({ user }) {
 
   const fetchFeaturedFlowers = async () => {
     try {
-      const res = await api.get("flowers");
-      // Curating the top 4 for a clean, editorial grid
-      setFlowers(Array.isArray(res.data) ? res.data.slice(0, 4) : []);
+      // Curating the newest 4 for a clean, editorial grid
+      const res = await api.get("flowers?limit=4");
+      setFlowers(Array.isArray(res.data?.items) ? res.data.items : []);
     } catch (err) {
       console.error("Failed to fetch flowers:", err);
     } finally {
@@ -89,7 +93,7 @@ export default function BuyerDashboard({ user }) {
               <div key={flower.id} className="flower-card-hairline">
                 <div className="flower-img-wrapper" style={{ height: '420px', background: '#F9F9F9', overflow: 'hidden' }}>
                   <img 
-                    src={flower.image_url || "https://placehold.co/400x600"} 
+                    src={flower.image_variants?.card || flower.image_url || "https://placehold.co/400x600"} 
                     alt={flower.name} 
                     style={{ width: '100%', height: '100%', objectFit: 'cover', transition: 'transform 0.5s ease' }} 
                   />
@@ -144,6 +148,11 @@ export default function BuyerDashboard({ user }) {
                 </div>
               </div>
             ))}
+            {ordersCursor && (
+              <button className="btn-fora btn-outline" style={{ marginTop: '30px', fontSize: '10px' }} onClick={() => fetchOrders(ordersCursor)}>
+                Earlier Acquisitions
+              </button>
+            )}
           </div>
         )}
       </section>
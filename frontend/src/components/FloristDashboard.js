@@ -6,19 +6,31 @@ import api from "../api/axios";
 export default function FloristDashboard({ user }) {
   const navigate = useNavigate();
   const [orders, setOrders] = useState([]);
+  const [counts, setCounts] = useState({});
+  const [totals, setTotals] = useState({});
+  const [statusFilter, setStatusFilter] = useState("");
+  const [nextCursor, setNextCursor] = useState(null);
   const [loading, setLoading] = useState(false);
 
   useEffect(() => {
     const token = localStorage.getItem("token");
     if (token) api.setAuthToken(token);
     fetchOrders();
-  }, []);
+  }, [statusFilter]);
 
-  const fetchOrders = async () => {
+  // The inbox is paginated newest-first; counts cover every status for the tabs
+  const fetchOrders = async (cursor = null) => {
     setLoading(true);
     try {
-      const res = await api.get("/orders/florist");
-      setOrders(Array.isArray(res.data) ? res.data : []);
+      let query = "limit=20";
+      if (statusFilter) query += `&status=${statusFilter}`;
+      if (cursor) query += `&cursor=${encodeURIComponent(cursor)}`;
+      const res = await api.get(`/orders/florist/inbox?${query}`);
+      const items = Array.isArray(res.data?.items) ? res.data.items : [];
+      setOrders((prev) => (cursor ? [...prev, ...items] : items));
+      setCounts(res.data?.counts || {});
+      setTotals(res.data?.totals || {});
+      setNextCursor(res.data?.next_cursor || null);
     } catch (err) {
       console.error("Sync Error:", err);
     } finally {
@@ -36,8 +48,9 @@ export default function FloristDashboard({ user }) {
   };
 
   // --- ANALYTICS LOGIC (No Libraries Needed) ---
-  const totalRevenue = orders.reduce((acc, curr) => acc + Number(curr.total_price || 0), 0);
-  const pendingOrders = orders.filter(o => o.status === 'pending').length;
+  const totalRevenue = Object.values(totals).reduce((acc, n) => acc + Number(n || 0), 0);
+  const pendingOrders = counts.pending || 0;
+  const totalOrders = Object.values(counts).reduce((acc, n) => acc + n, 0);
   
   // Get top 3 flowers by counting occurrences in orders
   const flowerCounts = {};
@@ -104,7 +117,7 @@ export default function FloristDashboard({ user }) {
         <div style={{ padding: '30px', border: '1px solid #EEE' }}>
           <span className="text-uppercase" style={{ fontSize: '9px', color: '#717171' }}>Order Pulse</span>
           <h2 style={{ fontSize: '2rem', margin: '10px 0' }}>{pendingOrders} <span style={{ fontSize: '14px', fontWeight: '400' }}>New</span></h2>
-          <p className="bd-email-small">{orders.length} total curated orders.</p>
+          <p className="bd-email-small">{totalOrders} total curated orders.</p>
         </div>
 
       </section>
@@ -112,6 +125,18 @@ export default function FloristDashboard({ user }) {
       {/* ORDER LIST */}
       <section style={{ marginTop: '60px' }}>
         <h2 className="text-uppercase" style={{ fontSize: '11px', letterSpacing: '0.2em', marginBottom: '30px' }}>Live Manifests</h2>
+        <div style={{ display: 'flex', gap: '10px', marginBottom: '20px', flexWrap: 'wrap' }}>
+          {["", "pending", "paid", "processing", "delivered"].map(status => (
+            <button
+              key={status || "all"}
+              className={`btn-fora ${statusFilter === status ? "" : "btn-outline"}`}
+              style={{ fontSize: '10px', padding: '5px 10px' }}
+              onClick={() => setStatusFilter(status)}
+            >
+              {status || "All"} ({status ? counts[status] || 0 : totalOrders})
+            </button>
+          ))}
+        </div>
         <div className="order-list-seamless">
           {orders.map(order => (
             <div key={order.id} className="order-row-hairline" style={{ display: 'flex', justifyContent: 'space-between', padding: '20px 0', borderBottom: '1px solid #F5F5F5' }}>
@@ -121,7 +146,7 @@ export default function FloristDashboard({ user }) {
                 <span className={`status-tag ${order.status}`}>{order.status}</span>
               </div>
               <div style={{ textAlign: 'right' }}>
-                <p style={{ fontWeight: '600', marginBottom: '10px' }}>KSh {formatKSh(order.total_price)}</p>
+                <p style={{ fontWeight: '600', marginBottom: '10px' }}>KSh {formatKSh(order.florist_total)}</p>
                 {order.status !== 'delivered' && (
                   <button 
                     className="btn-fora btn-outline" 
@@ -135,6 +160,11 @@ export default function FloristDashboard({ user }) {
             </div>
           ))}
         </div>
+        {nextCursor && (
+          <button className="btn-fora btn-outline" style={{ marginTop: '30px' }} disabled={loading} onClick={() => fetchOrders(nextCursor)}>
+            {loading ? "Syncing..." : "Older Manifests"}
+          </button>
+        )}
       </section>
     </div>
   );
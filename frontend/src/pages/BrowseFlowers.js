@@ -3,16 +3,27 @@ import { Link } from "react-router-dom";
 import api from "../api/axios";
 import { useCart } from "../context/CartContext"; // 1. Import the hook
 
+const PAGE_SIZE = 24;
+
 export default function BrowseFlowers() {
   const [flowers, setFlowers] = useState([]);
   const [loading, setLoading] = useState(true);
+  const [nextCursor, setNextCursor] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
   const { addToCart } = useCart(); // 2. Grab the function
 
+  // The catalog is cursor-paginated: each page tells us where the next one starts
+  const fetchPage = async (cursor = null) => {
+    const query = `limit=${PAGE_SIZE}` + (cursor ? `&cursor=${encodeURIComponent(cursor)}` : "");
+    const res = await api.get(`/flowers?${query}`);
+    setFlowers((prev) => (cursor ? [...prev, ...res.data.items] : res.data.items));
+    setNextCursor(res.data.next_cursor);
+  };
+
   useEffect(() => {
     const fetchFlowers = async () => {
       try {
-        const res = await api.get("/flowers");
-        setFlowers(res.data);
+        await fetchPage();
       } catch (err) {
         console.error("Error fetching flowers:", err);
       } finally {
@@ -22,6 +33,17 @@ export default function BrowseFlowers() {
     fetchFlowers();
   }, []);
 
+  const loadMore = async () => {
+    setLoadingMore(true);
+    try {
+      await fetchPage(nextCursor);
+    } catch (err) {
+      console.error("Error fetching more flowers:", err);
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   return (
     <div className="browse-page">
       <header className="browse-header">
@@ -41,7 +63,7 @@ export default function BrowseFlowers() {
                 {/* Image & Details Link */}
                 <Link to={`/flower-details/${flower.id}`} className="editorial-card">
                   <div className="img-wrapper">
-                    <img src={flower.image_url || "https://placehold.co/600x800?text=No+Image"} alt={flower.name} />
+                    <img src={flower.image_variants?.card || flower.image_url || "https://placehold.co/600x800?text=No+Image"} alt={flower.name} />
                   </div>
                   <span className="card-category">{flower.shop_name || "Boutique Exclusive"}</span>
                   <div className="card-meta">
@@ -72,6 +94,14 @@ export default function BrowseFlowers() {
             ))}
           </div>
         )}
+
+        {!loading && nextCursor && (
+          <div style={{ textAlign: "center", marginTop: "60px" }}>
+            <button className="btn-fora btn-outline" onClick={loadMore} disabled={loadingMore}>
+              {loadingMore ? "Sourcing More..." : "View More Blooms"}
+            </button>
+          </div>
+        )}
       </main>
     </div>
   );
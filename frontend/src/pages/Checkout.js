@@ -43,12 +43,11 @@ export default function Checkout({ user }) {
 
       const orderId = orderRes.data.order_id;
 
-      // Use M-Pesa Daraja initialization route
+      // Use M-Pesa Daraja initialization route; the STK push itself is queued
       const paymentRes = await api.post("/payment/daraja/initialize", { order_id: orderId });
-      const checkoutRequestId = paymentRes.data.checkout_request_id;
       const message = paymentRes.data.message;
 
-      localStorage.setItem("mpesa_checkout_request_id", checkoutRequestId);
+      localStorage.setItem("mpesa_attempt_id", paymentRes.data.attempt_id);
       localStorage.setItem("order_id", orderId);
       clearCart();
 
@@ -56,21 +55,24 @@ export default function Checkout({ user }) {
       setPaymentStatus("pending");
       setPaymentPrompt(message || "STK Push has been sent to your phone. Complete the payment prompt.");
 
-      const polling = setInterval(async () => {
-        try {
-          const statusRes = await api.get(`/payment/daraja/check-status/${orderId}`);
-          if (statusRes.data.paid) {
-            clearInterval(polling);
-            setPaymentStatus("success");
-            setTimeout(() => navigate("/buyer-dashboard"), 2500);
-          }
-        } catch (err) {
-          console.warn("Could not check payment status", err);
+      // Status changes are pushed by the server instead of polled
+      const stream = api.events(`/orders/${orderId}/events`, { status: (event) => {
+        const update = JSON.parse(event.data);
+        if (update.paid) {
+          stream.close();
+          setPaymentStatus("success");
+          setTimeout(() => navigate("/buyer-dashboard"), 2500);
+        } else if (update.payment_status === "error" || update.payment_status === "failed") {
+          stream.close();
+          setPaymentStatus("failed");
+          setPaymentPrompt(update.message || "The M-Pesa payment did not complete. Please try again.");
+        } else if (update.payment_status === "pending") {
+          setPaymentPrompt("STK Push has been sent to your phone. Complete the payment prompt.");
         }
-      }, 6000);
+      } });
 
-      // Stop polling after 2 minutes
-      setTimeout(() => clearInterval(polling), 120000);
+      // Stop listening after 2 minutes
+      setTimeout(() => stream.close(), 120000);
 
     } catch (err) {
       console.error("Checkout error:", err);
@@ -91,6 +93,13 @@ export default function Checkout({ user }) {
         </div>
       )}
 
+      {paymentStatus === "failed" && (
+        <div className="auth-error-box" style={{ marginBottom: '20px' }}>
+          <p>{paymentPrompt}</p>
+          <p>Your order #{checkoutOrder} has been saved but is not yet paid.</p>
+        </div>
+      )}
+
       {paymentStatus === "success" && (
         <div className="auth-success-box" style={{ marginBottom: '20px' }}>
           <p>✅ Payment confirmed! Redirecting to your dashboard...</p>
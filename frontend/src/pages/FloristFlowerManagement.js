@@ -101,7 +101,7 @@ export default function FloristFlowerManagement({ user }) {
               <div key={flower.id} className="flower-card-hairline">
                 <div className="flower-img-wrapper" style={{ height: '400px', overflow: 'hidden', background: '#F9F9F9' }}>
                   <img 
-                    src={flower.image_url} 
+                    src={flower.image_variants?.card || flower.image_url} 
                     alt={flower.name} 
                     style={{ width: '100%', height: '100%', objectFit: 'cover' }} 
                   />
@@ -55,7 +55,7 @@ export default function FlowerDetails() {
 
       <div className="flower-details-grid" style={{ display: 'grid', gridTemplateColumns: '1fr 1fr', gap: '40px' }}>
         <div>
-          <img src={flower.image_url} alt={flower.name} style={{ width: '100%', height: 'auto', borderRadius: '10px' }} />
+          <img src={flower.image_variants?.detail || flower.image_url} alt={flower.name} style={{ width: '100%', height: 'auto', borderRadius: '10px' }} />
         </div>
         <div>
           <h1>{flower.name}</h1>
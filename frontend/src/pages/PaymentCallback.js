@@ -1,4 +1,4 @@
-import React, { useEffect, useState, useCallback } from "react";
+import React, { useEffect, useState } from "react";
 import { useNavigate, useLocation } from "react-router-dom";
 import api from "../api/axios";
 
@@ -10,40 +10,42 @@ export default function PaymentCallback() {
 
   // Helper to get params from the URL
   const queryParams = new URLSearchParams(location.search);
-  const trackingId = queryParams.get("OrderTrackingId");
   const merchantRef = queryParams.get("OrderMerchantReference");
 
-  const verifyPayment = useCallback(async () => {
-    try {
-      const orderId = merchantRef || localStorage.getItem("order_id");
+  useEffect(() => {
+    const orderId = merchantRef || localStorage.getItem("order_id");
+    if (!orderId) {
+      setStatus("error");
+      setLoading(false);
+      return undefined;
+    }
 
-      if (!orderId) {
+    // The stream opens with the order's current state, then pushes each payment change
+    const stream = api.events(`/orders/${orderId}/events`, { status: (event) => {
+      const update = JSON.parse(event.data);
+      if (update.paid) {
+        stream.close();
+        setStatus("success");
+        setLoading(false);
+        setTimeout(() => navigate("/buyer-dashboard"), 3000);
+      } else if (update.status === "failed" || update.payment_status === "error" || update.payment_status === "failed") {
+        stream.close();
         setStatus("error");
         setLoading(false);
-        return;
       }
+    } });
 
-      const res = await api.get(`/payment/daraja/check-status/${orderId}`);
+    // Still unresolved after 2 minutes: the dashboard shows the order once it settles
+    const giveUp = setTimeout(() => {
+      stream.close();
+      navigate("/buyer-dashboard");
+    }, 120000);
 
-      if (res.data.paid) {
-        setStatus("success");
-        setTimeout(() => navigate("/buyer-dashboard"), 3000);
-      } else if (res.data.status === "pending") {
-        setStatus("pending");
-        setTimeout(() => navigate("/buyer-dashboard"), 3000);
-      } else {
-        setStatus("error");
-      }
-    } catch (err) {
-      console.error("Verification error:", err);
-      setStatus("error");
-    } finally {
-      setLoading(false);
-    }
+    return () => {
+      clearTimeout(giveUp);
+      stream.close();
+    };
   }, [navigate, merchantRef]);
-  useEffect(() => {
-    verifyPayment();
-  }, [verifyPayment]);
 
   // Clean, Editorial UI matching your Dashboard
   return (